@@ -1,6 +1,17 @@
 # ── Word Builder words ───────────────────────────────
-from gtts import gTTS
+# Synthesises through tts_engine.backends, so it falls back to the offline
+# engine when gTTS is unreachable (run: python generate_audio.py)
 import os
+import sys
+
+import django
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'wordwand'))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'wordwand.settings')
+django.setup()
+
+from django.conf import settings  # noqa: E402
+from tts_engine.backends import synthesize_file  # noqa: E402
 
 word_builder_words = [
     'cat', 'dog', 'sun', 'hat', 'big', 'map', 'run', 'top',
@@ -9,8 +20,7 @@ word_builder_words = [
     'splash', 'strong', 'flight'
 ]
 
-os.makedirs('media/words/audio', exist_ok=True)
+audio_dir = os.path.join(settings.MEDIA_ROOT, 'words', 'audio')
 for word in word_builder_words:
-    tts = gTTS(word, lang='en')
-    tts.save(f'media/words/audio/{word}.mp3')
-    print(f'✅ word: {word}.mp3')
+    path = synthesize_file(word, os.path.join(audio_dir, word))
+    print(f'✅ word: {os.path.basename(path)}')
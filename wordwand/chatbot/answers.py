@@ -0,0 +1,279 @@
+"""
+Reusing Wanda's answers to the questions children ask again and again.
+
+"How do I play Word Builder?" gets asked many times a day, and each one
+used to be a full model round trip. Complete replies are kept in memory
+per web process and served straight back:
+
+- Key: the message normalised (lower case, punctuation, emojis and filler
+  such as "please" or "Wanda" dropped) plus, verbatim, every earlier
+  message the model is sent with it (llm.history_messages). The cache is
+  shared by all children, and a reply can use anything in that history
+  (a name, say), so it is only reused in exactly the same conversation:
+  in practice a first question, or one after answers that themselves
+  came from the cache. A follow-up such as "and the next one?" is never
+  answered out of turn either.
+- Exact tier: a dict lookup on that key.
+- Similar tier: otherwise the message is compared with the cached
+  questions of the same context by TF-IDF cosine similarity
+  (scikit-learn), and the closest one's answer is reused at or above
+  CHATBOT_CACHE_SIMILARITY. Words, not characters, are compared, single
+  letters count and words no cached question has weigh most, so "what
+  sound does d make" never borrows the answer about b. The index is
+  refitted on a background thread once the cache has changed, at most
+  every REFIT_SECONDS; lookups never wait for it and use the last index
+  meanwhile (skipping entries gone since), so a new answer reaches the
+  similar tier a moment after it is stored.
+- Entries expire CHATBOT_CACHE_TTL seconds after they were stored; past
+  CHATBOT_CACHE_SIZE answers the least recently used go first.
+
+Only replies the model finished are stored (not errors, nor streams the
+child left), and only model replies ever enter the cache, so a cached
+answer is always one Wanda gave under the current persona.
+
+`stats()` reports hits per tier, the hit rate, and how long hits and
+model replies took; the staff-only chatbot/stats/ view returns it.
+"""
+
+import json
+import logging
+import re
+import threading
+import time
+from collections import OrderedDict, deque
+
+from django.conf import settings
+
+from .llm import history_messages
+
+logger = logging.getLogger(__name__)
+
+# Words that change nothing about the question
+FILLER = frozenset({'please', 'pls', 'wanda', 'hi', 'hey', 'hello', 'um', 'umm', 'so', 'ok', 'okay'})
+
+# Recent latencies kept per outcome for the percentiles in stats()
+LATENCY_SAMPLES = 1000
+
+# Least time between two fits of the similarity index
+REFIT_SECONDS = 2.0
+
+_WORD = re.compile(r'[a-z0-9]+')
+
+
+def normalise(text):
+    """Lower-case words only, filler dropped: 'Hi Wanda!! How do I play?' → 'how do i play'."""
+    words = _WORD.findall(str(text).lower().replace("'", ''))
+    return ' '.join(w for w in words if w not in FILLER)
+
+
+def _context(history):
+    # Exactly what the model sees besides the message
+    return json.dumps(history_messages(history), ensure_ascii=False)
+
+
+class Question:
+    """A message and its context, normalised; `key` is the exact-tier key."""
+
+    __slots__ = ('text', 'context', 'key', 'started')
+
+    def __init__(self, message, history):
+        self.text = normalise(message)
+        self.context = _context(history)
+        self.key = (self.context, self.text)
+        self.started = time.perf_counter()
+
+
+class _Entry:
+    __slots__ = ('text', 'context', 'reply', 'expires')
+
+    def __init__(self, question, reply, expires):
+        self.text = question.text
+        self.context = question.context
+        self.reply = reply
+        self.expires = expires
+
+
+def _percentiles(samples):
+    samples = sorted(samples)
+    if not samples:
+        return {'p50_ms': None, 'p95_ms': None, 'samples': 0}
+    pick = lambda f: round(samples[min(len(samples) - 1, int(len(samples) * f))] * 1000, 2)
+    return {'p50_ms': pick(0.5), 'p95_ms': pick(0.95), 'samples': len(samples)}
+
+
+# ─── Cache ────────────────────────────────────────────────────────────────────
+
+class AnswerCache:
+    """An LRU of complete replies with a TTL, an exact and a similar tier."""
+
+    def __init__(self, size, ttl, similarity):
+        self.size = size
+        self.ttl = ttl
+        self.similarity = similarity
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        # Bumped on every change; the similarity index is fitted per version
+        self._version = 0
+        self._index = None
+        self._fitted_at = float('-inf')
+        self._refitting = None
+        self.counts = {'exact_hits': 0, 'similar_hits': 0, 'misses': 0,
+                       'stored': 0, 'expired': 0, 'evicted': 0}
+        self._latency = {'hit': deque(maxlen=LATENCY_SAMPLES),
+                         'model': deque(maxlen=LATENCY_SAMPLES)}
+
+    def lookup(self, question):
+        """The cached reply for `question`, or None (a miss)."""
+        if not self.size or not question.text:
+            return None
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(question.key)
+            if entry is not None and entry.expires <= now:
+                self._drop(question.key)
+                self.counts['expired'] += 1
+                entry = None
+            if entry is not None:
+                self._entries.move_to_end(question.key)
+                self.counts['exact_hits'] += 1
+                self._latency['hit'].append(time.perf_counter() - question.started)
+                return entry.reply
+
+        entry = self._similar(question, now) if self.similarity > 0 else None
+        with self._lock:
+            key = entry and (entry.context, entry.text)
+            # The index may predate the entry's eviction or replacement
+            if entry is None or self._entries.get(key) is not entry:
+                self.counts['misses'] += 1
+                return None
+            self._entries.move_to_end(key)
+            self.counts['similar_hits'] += 1
+            self._latency['hit'].append(time.perf_counter() - question.started)
+            return entry.reply
+
+    def store(self, question, reply):
+        """Keep a complete model reply to `question`."""
+        with self._lock:
+            self._latency['model'].append(time.perf_counter() - question.started)
+            if not self.size or not question.text or not reply.strip():
+                return
+            self._entries[question.key] = _Entry(question, reply, time.monotonic() + self.ttl)
+            self._entries.move_to_end(question.key)
+            self.counts['stored'] += 1
+            while len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+                self.counts['evicted'] += 1
+            self._version += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._index = None
+            self._version += 1
+
+    def _drop(self, key):
+        del self._entries[key]
+        self._version += 1
+
+    # ─── Similar tier ─────────────────────────────────────────────────────────
+
+    def _similar(self, question, now):
+        index = self._get_index()
+        if index is None:
+            return None
+        version, vectorizer, matrix, entries = index
+        scores = (matrix @ vectorizer.transform([question.text]).T).toarray().ravel()
+        best, best_score = None, self.similarity
+        for i in scores.argsort()[::-1]:
+            if scores[i] < best_score:
+                break
+            entry = entries[i]
+            if entry.context == question.context and entry.expires > now:
+                best = entry
+                break
+        return best
+
+    def _get_index(self):
+        """The last fitted index (or None); starts a refit if it is out of date."""
+        with self._lock:
+            if (self._refitting is None and self._entries
+                    and (self._index is None or self._index[0] != self._version)
+                    and time.monotonic() - self._fitted_at >= REFIT_SECONDS):
+                self._refitting = threading.Thread(
+                    target=self._refit, name='answer-cache-refit', daemon=True)
+                self._refitting.start()
+            return self._index
+
+    def _refit(self):
+        """Runs on its own thread, one at a time."""
+        try:
+            with self._lock:
+                version = self._version
+                entries = list(self._entries.values())
+            if not entries:
+                with self._lock:
+                    self._index = None
+                return
+            from sklearn.feature_extraction.text import HashingVectorizer, TfidfTransformer
+            from sklearn.pipeline import make_pipeline
+
+            # Hashed rather than a fitted vocabulary, so a word no cached question
+            # has (the "d", a different name) still counts against the match, with
+            # the highest IDF. Rows are L2-normalised, so the dot product with a
+            # transformed question is the cosine similarity
+            vectorizer = make_pipeline(
+                HashingVectorizer(token_pattern=r'(?u)\b\w+\b', ngram_range=(1, 2),
+                                  alternate_sign=False, norm=None),
+                TfidfTransformer(sublinear_tf=True))
+            matrix = vectorizer.fit_transform([e.text for e in entries])
+            with self._lock:
+                self._index = (version, vectorizer, matrix, entries)
+        except Exception:
+            logger.exception('Answer cache: similarity index refit failed')
+        finally:
+            with self._lock:
+                self._fitted_at = time.monotonic()
+                self._refitting = None
+
+    # ─── Metrics ──────────────────────────────────────────────────────────────
+
+    def stats(self):
+        with self._lock:
+            counts = dict(self.counts)
+            size = len(self._entries)
+            hit, model = list(self._latency['hit']), list(self._latency['model'])
+        hits = counts['exact_hits'] + counts['similar_hits']
+        lookups = hits + counts['misses']
+        return {
+            **counts,
+            'entries':  size,
+            'capacity': self.size,
+            'hit_rate': round(hits / lookups, 4) if lookups else None,
+            'latency':  {'hit': _percentiles(hit), 'model': _percentiles(model)},
+        }
+
+
+_cache = None
+_lock = threading.Lock()
+
+
+def get_cache():
+    global _cache
+    with _lock:
+        if _cache is None:
+            _cache = AnswerCache(settings.CHATBOT_CACHE_SIZE, settings.CHATBOT_CACHE_TTL,
+                                 settings.CHATBOT_CACHE_SIMILARITY)
+    return _cache
+
+
+def lookup(question):
+    return get_cache().lookup(question)
+
+
+def store(question, reply):
+    get_cache().store(question, reply)
+
+
+def stats():
+    """Hit counts, hit rate and latencies since start (this process)."""
+    return get_cache().stats()
@@ -0,0 +1,237 @@
+"""
+Talking to the language model behind Wanda.
+
+Replies come from the configured provider (providers.py: an
+OpenAI-compatible endpoint such as Groq, or a local Ollama server):
+
+- One requests.Session per process keeps its connections alive and reuses
+  them, so a message does not pay for a new TCP and TLS handshake.
+- Replies are streamed: `open_reply()` returns as soon as the endpoint has
+  accepted the request, and the Reply it returns yields the text piece by
+  piece as tokens arrive. The view forwards them to the browser as
+  server-sent events, so the child sees the first words instead of
+  waiting for the whole reply.
+- At most CHATBOT_MAX_CONCURRENT replies are generated at once per
+  process; past that `ChatBusy` is raised at once. The view is
+  synchronous, so a waiting message would hold a worker thread: the
+  optional queue (CHATBOT_QUEUE_SIZE messages waiting up to
+  CHATBOT_QUEUE_TIMEOUT seconds) is off by default and must stay within
+  the server's spare threads. A burst of children chatting therefore never
+  ties up more than those workers, and the rest of the site keeps
+  answering.
+"""
+
+import threading
+
+import requests as http
+from django.conf import settings
+
+from .providers import ProviderError, get_provider
+
+SYSTEM_PROMPT = """You are Wanda, a friendly and encouraging reading assistant for children
+learning to read. You work inside WordWand, an educational app with 7 games:
+1. Sound Match - match sounds to letters
+2. Word Builder - drag letters to build words
+3. Sight Word Tap - memorise and tap sight words
+4. Letter Fix - tell apart b/d/p/q
+5. Syllable Breaker - split words into syllables
+6. Listen & Type - hear a word and spell it
+7. Story Builder - read stories and tap words to hear them
+
+Your personality:
+- Warm, patient, and encouraging, never critical
+- Use simple language suitable for young children (ages 5-10)
+- Use emojis occasionally to keep things fun
+- Keep answers short and clear (2-4 sentences max)
+- Celebrate effort and progress enthusiastically
+- If a child is struggling, offer a gentle tip
+- Help with reading, spelling, phonics, and using the games
+- If asked something unrelated to learning/reading, kindly redirect
+
+Never say you are an AI or mention Groq/Meta/Llama. You are Wanda!"""
+
+# Earlier messages sent along with each new one
+HISTORY_MESSAGES = 10
+
+MAX_TOKENS = 300
+TEMPERATURE = 0.8
+
+
+class ChatError(Exception):
+    """The model could not produce a reply; the message is shown to the child."""
+
+
+class ChatBusy(ChatError):
+    """Every reply slot and queue place is taken."""
+
+
+def history_messages(history):
+    """The earlier messages sent to the model along with a new one."""
+    return [{'role': msg['role'], 'content': msg['content']}
+            for msg in history[-HISTORY_MESSAGES:]
+            if isinstance(msg, dict) and msg.get('role') in ('user', 'assistant') and msg.get('content')]
+
+
+def build_messages(message, history):
+    """
+    The chat message list for a new message and its history. The persona
+    always comes first and never varies, so providers can reuse its cached
+    prompt prefix (see providers.py).
+    """
+    return ([{'role': 'system', 'content': SYSTEM_PROMPT}]
+            + history_messages(history)
+            + [{'role': 'user', 'content': message}])
+
+
+# ─── Concurrency ──────────────────────────────────────────────────────────────
+
+class _Gate:
+    """`slots` holders at once, at most `queue_size` more waiting."""
+
+    def __init__(self, slots, queue_size):
+        self._cond = threading.Condition()
+        self.slots = slots
+        self.queue_size = queue_size
+        self.active = 0
+        self.waiting = 0
+        self.rejected = 0
+
+    def acquire(self, timeout):
+        with self._cond:
+            if self.active >= self.slots:
+                if self.waiting >= self.queue_size:
+                    self.rejected += 1
+                    raise ChatBusy('Wanda is talking to lots of friends right now. Try again in a moment! 🙂')
+                self.waiting += 1
+                try:
+                    free = self._cond.wait_for(lambda: self.active < self.slots, timeout)
+                finally:
+                    self.waiting -= 1
+                if not free:
+                    self.rejected += 1
+                    raise ChatBusy('Wanda is still busy. Try again in a moment! 🙂')
+            self.active += 1
+
+    def release(self):
+        with self._cond:
+            self.active -= 1
+            self._cond.notify()
+
+    def status(self):
+        with self._cond:
+            return {'active': self.active, 'waiting': self.waiting,
+                    'slots': self.slots, 'queue_size': self.queue_size,
+                    'rejected': self.rejected}
+
+
+_gate = None
+_session = None
+_lock = threading.Lock()
+
+
+def _get_gate():
+    global _gate
+    with _lock:
+        if _gate is None:
+            _gate = _Gate(settings.CHATBOT_MAX_CONCURRENT, settings.CHATBOT_QUEUE_SIZE)
+    return _gate
+
+
+def _get_session():
+    global _session
+    with _lock:
+        if _session is None:
+            # One pooled connection per slot; never more are in use at once
+            adapter = http.adapters.HTTPAdapter(
+                pool_connections=1, pool_maxsize=settings.CHATBOT_MAX_CONCURRENT)
+            session = http.Session()
+            session.mount('https://', adapter)
+            session.mount('http://', adapter)
+            _session = session
+    return _session
+
+
+def status():
+    """Slots in use, queued messages and rejections since start (this process)."""
+    return _get_gate().status()
+
+
+# ─── Replies ──────────────────────────────────────────────────────────────────
+
+class Reply:
+    """
+    A reply being streamed: iterate for its text pieces. Holds a slot and a
+    connection until exhausted or closed; close() is safe to call twice.
+    """
+
+    def __init__(self, response, gate, provider):
+        self._response = response
+        self._gate = gate
+        self._provider = provider
+        self._closed = False
+
+    def __iter__(self):
+        try:
+            # Read to the end: only a fully read response goes back to the
+            # pool; close() drops a half-read connection
+            for line in self._response.iter_lines():
+                try:
+                    piece = self._provider.piece(line)
+                except ValueError:
+                    continue
+                if piece:
+                    yield piece
+        except (http.exceptions.RequestException, ProviderError):
+            raise ChatError('Wanda lost her train of thought. Please try again.')
+        finally:
+            self.close()
+
+    def text(self):
+        """The whole reply at once."""
+        return ''.join(self)
+
+    def close(self):
+        if not self._closed:
+            self._closed = True
+            self._response.close()
+            self._gate.release()
+
+
+def open_reply(messages):
+    """
+    Start a reply to `messages`. Raises ChatBusy or ChatError before
+    anything is sent to the child; close the Reply if it is not read.
+    """
+    try:
+        provider = get_provider()
+    except ProviderError as e:
+        raise ChatError(str(e))
+    url, payload, headers = provider.request(messages, MAX_TOKENS, TEMPERATURE)
+    gate = _get_gate()
+    gate.acquire(settings.CHATBOT_QUEUE_TIMEOUT)
+    try:
+        response = _get_session().post(
+            url, json=payload, headers=headers,
+            timeout=settings.CHATBOT_TIMEOUT, stream=True)
+        if response.status_code != 200:
+            error = f'API error {response.status_code}: {response.text}'
+            response.close()
+            raise ChatError(error)
+    except http.exceptions.Timeout:
+        gate.release()
+        raise ChatError('Request timed out. Please try again.')
+    except http.exceptions.ConnectionError:
+        gate.release()
+        raise ChatError('Could not connect. Check your internet connection.')
+    except http.exceptions.RequestException as e:
+        gate.release()
+        raise ChatError(str(e))
+    except BaseException:
+        gate.release()
+        raise
+    return Reply(response, gate, provider)
+
+
+def warm():
+    """Have the provider load its model and the persona ahead of the first message."""
+    get_provider().warm(_get_session(), [{'role': 'system', 'content': SYSTEM_PROMPT}])
@@ -0,0 +1,167 @@
+"""
+Management command: python manage.py benchmark_chatbot [--provider openai|ollama] [--clients N] [--messages N] [--url URL]
+
+Sends --messages chat messages from each of --clients concurrent children
+and times Wanda's replies. With --provider openai (the default) it
+compares two ways of getting them:
+
+  before   a new connection per message, whole reply at once (the old view)
+  after    chatbot/llm.py: pooled keep-alive connections, streamed reply,
+           CHATBOT_MAX_CONCURRENT slots (plus CHATBOT_QUEUE_SIZE, if set)
+
+With --provider ollama it runs llm.py against a local model twice:
+
+  cold     the model is not loaded (as after Ollama's default five idle
+           minutes); the first messages wait for it
+  warm     after llm.warm() (python manage.py chatbot_warm)
+
+reporting per mode:
+
+  first p50/p95   ms until the child sees the first words
+  full p50        ms until the reply is complete
+  replies/s       completed replies per second over the whole run
+  busy            messages turned away by the queue
+  conns           connections the endpoint saw        ┐
+  loads           times the model was loaded          ├ stub only
+  tok/reply       prompt tokens evaluated per reply,  ┘
+                  the rest came from the prefix cache
+
+By default the endpoint is a local stub (chatbot/stub.py) started
+in-process with --first-token-ms and --token-ms; --url benchmarks a real
+endpoint instead (the chat completions URL, or the Ollama server).
+"""
+
+import threading
+import time
+
+from django.core.management.base import BaseCommand
+
+
+QUESTIONS = [
+    'How do I play Word Builder?',
+    'What sound does b make?',
+    'Is it b or d in the word dog?',
+    'How many syllables are in butterfly?',
+    'Can you help me spell because?',
+    'I finished a story!',
+]
+
+
+def _percentile(samples, fraction):
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * fraction))] * 1000 if samples else 0.0
+
+
+class Command(BaseCommand):
+    help = 'Benchmarks chatbot time-to-first-token and concurrent throughput'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--provider', choices=['openai', 'ollama'], default='openai')
+        parser.add_argument('--clients', type=int, default=8)
+        parser.add_argument('--messages', type=int, default=5,
+                            help='Messages sent one after another by each client')
+        parser.add_argument('--url', default=None,
+                            help='Endpoint to benchmark (default: an in-process stub)')
+        parser.add_argument('--first-token-ms', type=float, default=300)
+        parser.add_argument('--token-ms', type=float, default=20)
+
+    def handle(self, *args, **options):
+        import requests as http
+        from django.conf import settings
+        from django.test.utils import override_settings
+
+        from chatbot import llm
+        from chatbot.stub import StubServer
+
+        lock = threading.Lock()
+        stub = None
+        url = options['url']
+        if url is None:
+            stub = StubServer(first_token=options['first_token_ms'] / 1000,
+                              token_interval=options['token_ms'] / 1000).start()
+            url = stub.url if options['provider'] == 'openai' else stub.base_url
+        sent = []
+
+        def next_messages():
+            # Different questions, so only the persona prefix repeats
+            with lock:
+                sent.append(1)
+                return llm.build_messages(QUESTIONS[len(sent) % len(QUESTIONS)], [])
+
+        def before():
+            messages = next_messages()
+            start = time.perf_counter()
+            response = http.post(
+                url,
+                json={'model': settings.CHATBOT_MODEL, 'max_tokens': llm.MAX_TOKENS,
+                      'temperature': llm.TEMPERATURE, 'messages': messages},
+                headers={'Authorization': f'Bearer {settings.GROQ_API_KEY}'},
+                timeout=settings.CHATBOT_TIMEOUT)
+            response.raise_for_status()
+            response.json()['choices'][0]['message']['content']
+            elapsed = time.perf_counter() - start
+            return elapsed, elapsed
+
+        def after():
+            messages = next_messages()
+            start = time.perf_counter()
+            first = None
+            for _ in llm.open_reply(messages):
+                if first is None:
+                    first = time.perf_counter() - start
+            return first or 0.0, time.perf_counter() - start
+
+        if options['provider'] == 'openai':
+            modes = [('before', before, None), ('after', after, None)]
+        else:
+            modes = [('cold', after, None), ('warm', after, llm.warm)]
+
+        self.stdout.write(f'{options["provider"]}: {options["clients"]} clients × '
+                          f'{options["messages"]} messages, {settings.CHATBOT_MAX_CONCURRENT} slots, '
+                          f'queue {settings.CHATBOT_QUEUE_SIZE}, '
+                          f'persona ~{len(llm.SYSTEM_PROMPT.split())} words\n')
+        self.stdout.write(f'{"mode":<8} {"first p50":>10} {"first p95":>10} {"full p50":>9} '
+                          f'{"replies/s":>10} {"busy":>5} {"conns":>6} {"loads":>6} {"tok/reply":>10}')
+        overrides = {'CHATBOT_PROVIDER': options['provider'],
+                     'CHATBOT_API_URL': url, 'CHATBOT_OLLAMA_URL': url}
+        with override_settings(**overrides):
+            for name, send, setup in modes:
+                if setup is not None:
+                    setup()
+                firsts, fulls, busy = [], [], []
+
+                def client():
+                    for _ in range(options['messages']):
+                        try:
+                            first, full = send()
+                        except llm.ChatBusy:
+                            with lock:
+                                busy.append(1)
+                            continue
+                        with lock:
+                            firsts.append(first)
+                            fulls.append(full)
+
+                counts = dict(stub.counts) if stub else {}
+                threads = [threading.Thread(target=client) for _ in range(options['clients'])]
+                start = time.perf_counter()
+                for thread in threads:
+                    thread.start()
+                for thread in threads:
+                    thread.join()
+                elapsed = time.perf_counter() - start
+
+                if stub:
+                    conns = stub.counts['connections'] - counts['connections']
+                    loads = stub.counts['loads'] - counts['loads']
+                    tokens = (stub.counts['prompt_tokens'] - counts['prompt_tokens']) / max(1, len(fulls))
+                    stub_columns = f'{conns:>6} {loads:>6} {tokens:>10.0f}'
+                else:
+                    stub_columns = f'{"-":>6} {"-":>6} {"-":>10}'
+                self.stdout.write(
+                    f'{name:<8} {_percentile(firsts, 0.5):>10.0f} {_percentile(firsts, 0.95):>10.0f} '
+                    f'{_percentile(fulls, 0.5):>9.0f} {len(fulls) / elapsed:>10.1f} '
+                    f'{len(busy):>5} {stub_columns}')
+        if stub:
+            stub.shutdown()
+            stub.server_close()
@@ -0,0 +1,36 @@
+"""
+Management command: python manage.py chatbot_stub [--port 8765] [--first-token-ms 300] [--token-ms 20]
+
+Runs the local stand-in chat endpoint (chatbot/stub.py) until interrupted,
+for trying the chatbot without a Groq key or network:
+
+    CHATBOT_API_URL=http://127.0.0.1:8765/v1/chat/completions
+"""
+
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = 'Serves a local OpenAI-compatible stub for the chatbot'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='127.0.0.1')
+        parser.add_argument('--port', type=int, default=8765)
+        parser.add_argument('--first-token-ms', type=float, default=300)
+        parser.add_argument('--token-ms', type=float, default=20)
+
+    def handle(self, *args, **options):
+        from chatbot.stub import StubServer
+
+        server = StubServer(options['host'], options['port'],
+                            first_token=options['first_token_ms'] / 1000,
+                            token_interval=options['token_ms'] / 1000)
+        self.stdout.write(self.style.SUCCESS(f'✅  Chat stub on {server.url} (Ctrl+C to stop)'))
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+            self.stdout.write(f"Served {server.counts['requests']} requests "
+                              f"over {server.counts['connections']} connections")
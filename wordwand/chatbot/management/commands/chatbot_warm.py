@@ -0,0 +1,31 @@
+"""
+Management command: python manage.py chatbot_warm
+
+Loads the chatbot's model and evaluates the Wanda persona ahead of the
+first message (chatbot/providers.py), e.g. after a deploy or a restart of
+the local Ollama server. Requests keep it loaded afterwards. Nothing to do
+for hosted providers.
+"""
+
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = 'Loads the chatbot model and caches the persona prompt'
+
+    def handle(self, *args, **options):
+        import requests as http
+        from django.conf import settings
+
+        from chatbot import llm
+        from chatbot.providers import ProviderError
+
+        start = time.perf_counter()
+        try:
+            llm.warm()
+        except (http.exceptions.RequestException, ProviderError) as e:
+            raise CommandError(f'Could not warm {settings.CHATBOT_PROVIDER}: {e}')
+        self.stdout.write(self.style.SUCCESS(
+            f'✅  {settings.CHATBOT_PROVIDER} ready in {time.perf_counter() - start:.1f}s'))
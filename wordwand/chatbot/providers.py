@@ -0,0 +1,137 @@
+"""
+Interchangeable chat model providers for Wanda (CHATBOT_PROVIDER).
+
+  openai  — an OpenAI-compatible chat completions endpoint, Groq unless
+            configured otherwise (CHATBOT_API_URL, CHATBOT_MODEL)
+  ollama  — a local Ollama server (CHATBOT_OLLAMA_URL, CHATBOT_OLLAMA_MODEL),
+            so children's messages never leave the machine
+
+Both stream over llm.py's pooled session behind its concurrency gate; a
+provider only knows how to phrase the request and read the stream.
+
+Keeping a local model fast:
+
+- Warm: every request asks Ollama to keep the model loaded for
+  CHATBOT_OLLAMA_KEEP_ALIVE after it, and `warm()` (python manage.py
+  chatbot_warm, e.g. after a deploy) loads it and evaluates the persona
+  before the first child arrives.
+- Prefix cache: the persona is always the first message, byte for byte,
+  and the model options never change between requests. Ollama keeps each
+  parallel slot's KV cache and only evaluates the tokens after the
+  longest prefix it has already seen, so the persona is tokenised and
+  evaluated once per slot, not once per message. (Changing options such
+  as num_ctx would reload the model and drop the cache.) Hosted providers
+  that cache prompts key on the same stable prefix.
+- Batching: Ollama batches the prompts it runs at the same time, up to
+  OLLAMA_NUM_PARALLEL on the server. Set CHATBOT_MAX_CONCURRENT to the
+  same number so the gate sends exactly that many together; the rest
+  queue here, where they can be turned away, rather than on the server.
+"""
+
+import json
+
+from django.conf import settings
+
+
+class ProviderError(Exception):
+    """The provider is not configured, or reported an error in the middle of a reply."""
+
+
+class ChatProvider:
+    name = ""
+
+    def request(self, messages, max_tokens, temperature):
+        """(url, json payload, headers) for a streamed reply."""
+        raise NotImplementedError
+
+    def piece(self, line):
+        """
+        The reply text in one line of the stream (bytes), or None. Raises
+        ProviderError for an error line and ValueError for one that is not JSON.
+        """
+        raise NotImplementedError
+
+    def warm(self, session, messages):
+        """Prepare the model to answer quickly (no-op unless overridden)."""
+
+
+class OpenAIProvider(ChatProvider):
+    name = "openai"
+
+    def request(self, messages, max_tokens, temperature):
+        return settings.CHATBOT_API_URL, {
+            'model':       settings.CHATBOT_MODEL,
+            'max_tokens':  max_tokens,
+            'temperature': temperature,
+            'messages':    messages,
+            'stream':      True,
+        }, {'Authorization': f'Bearer {settings.GROQ_API_KEY}'}
+
+    def piece(self, line):
+        # Server-sent events: "data: {chunk}" lines, then "data: [DONE]"
+        if not line.startswith(b'data:'):
+            return None
+        data = line[5:].strip()
+        if data == b'[DONE]':
+            return None
+        chunk = json.loads(data)
+        if 'error' in chunk:
+            raise ProviderError(chunk['error'])
+        choices = chunk.get('choices') or [{}]
+        return (choices[0].get('delta') or {}).get('content')
+
+
+class OllamaProvider(ChatProvider):
+    name = "ollama"
+
+    def _options(self, max_tokens, temperature):
+        # Kept identical on every request: other values reload the model
+        return {
+            'num_ctx':     settings.CHATBOT_OLLAMA_NUM_CTX,
+            'num_predict': max_tokens,
+            'temperature': temperature,
+        }
+
+    def request(self, messages, max_tokens, temperature):
+        return f'{settings.CHATBOT_OLLAMA_URL.rstrip("/")}/api/chat', {
+            'model':      settings.CHATBOT_OLLAMA_MODEL,
+            'messages':   messages,
+            'stream':     True,
+            'keep_alive': settings.CHATBOT_OLLAMA_KEEP_ALIVE,
+            'options':    self._options(max_tokens, temperature),
+        }, {}
+
+    def piece(self, line):
+        # One JSON object per line, the last with "done": true
+        if not line.strip():
+            return None
+        chunk = json.loads(line)
+        if 'error' in chunk:
+            raise ProviderError(chunk['error'])
+        return (chunk.get('message') or {}).get('content')
+
+    def warm(self, session, messages):
+        # A one-token reply to the persona alone: loads the model and leaves
+        # the persona in a slot's KV cache. num_predict does not reload.
+        url, payload, headers = self.request(messages, 1, 0.0)
+        payload['stream'] = False
+        response = session.post(url, json=payload, headers=headers,
+                                timeout=settings.CHATBOT_OLLAMA_LOAD_TIMEOUT)
+        response.raise_for_status()
+
+
+PROVIDER_CLASSES = {
+    OpenAIProvider.name: OpenAIProvider,
+    OllamaProvider.name: OllamaProvider,
+}
+
+# Providers hold no state, so one of each serves every request
+_providers = {name: cls() for name, cls in PROVIDER_CLASSES.items()}
+
+
+def get_provider():
+    """The configured provider."""
+    try:
+        return _providers[settings.CHATBOT_PROVIDER]
+    except KeyError:
+        raise ProviderError(f"Unknown chatbot provider: {settings.CHATBOT_PROVIDER}")
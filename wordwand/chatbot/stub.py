@@ -0,0 +1,223 @@
+"""
+A local stand-in for the chatbot's model providers (providers.py).
+
+It answers every message with the same short Wanda-style reply, one word
+per token — the first after `first_token` seconds, the rest every
+`token_interval` seconds — on two routes:
+
+  /v1/chat/completions   OpenAI-compatible: chunked server-sent events
+                         when the request asks for "stream", JSON otherwise
+  /api/chat              Ollama: newline-delimited JSON chunks, with a
+                         simulated local model (below)
+
+The Ollama route behaves like a local server where it matters for
+latency: the model takes `load_time` to load, stays loaded for the
+request's keep_alive, and reloads when num_ctx changes. Each of its
+`parallel` slots keeps the tokens of the last prompt it ran, and a new
+prompt only pays `prompt_token_time` per token after the longest prefix a
+slot already holds (a "token" here is a word).
+
+It speaks keep-alive HTTP/1.1 and counts connections, requests, model
+loads and prompt tokens evaluated or reused from cache.
+
+    python manage.py chatbot_stub --port 8765
+    CHATBOT_API_URL=http://127.0.0.1:8765/v1/chat/completions
+    CHATBOT_OLLAMA_URL=http://127.0.0.1:8765
+
+benchmark_chatbot starts one in-process. Nothing leaves the machine.
+"""
+
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+REPLY = ('Great question! 🌟 Try saying each sound slowly, then blend them '
+         'together like a train. You are doing so well!')
+
+CHAT_PATH = '/v1/chat/completions'
+OLLAMA_CHAT_PATH = '/api/chat'
+
+_DURATION = re.compile(r'^(-?\d+(?:\.\d+)?)([smh]?)$')
+
+
+def _keep_alive_seconds(value):
+    """Ollama keep_alive ("30m", "1h", "10s", seconds; negative = forever)."""
+    match = _DURATION.match(str(value if value is not None else '5m').strip())
+    if not match:
+        return 300.0
+    seconds = float(match.group(1)) * {'': 1, 's': 1, 'm': 60, 'h': 3600}[match.group(2)]
+    return float('inf') if seconds < 0 else seconds
+
+
+def _common_prefix(a, b):
+    n = 0
+    for x, y in zip(a, b):
+        if x != y:
+            break
+        n += 1
+    return n
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def setup(self):
+        super().setup()
+        self.server.count('connections')
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        try:
+            body = json.loads(self.rfile.read(int(self.headers.get('Content-Length') or 0)) or b'{}')
+        except ValueError:
+            return self._send_json(400, {'error': {'message': 'Invalid JSON'}})
+        route = {CHAT_PATH: self._openai, OLLAMA_CHAT_PATH: self._ollama}.get(self.path.rstrip('/'))
+        if route is None:
+            return self._send_json(404, {'error': {'message': f'No route {self.path}'}})
+
+        self.server.count('requests')
+        words = REPLY.split(' ')
+        try:
+            route(body, words)
+        except (BrokenPipeError, ConnectionResetError):
+            # The client hung up mid-reply
+            self.close_connection = True
+
+    # ─── OpenAI-compatible ────────────────────────────────────────────────────
+
+    def _openai(self, body, words):
+        time.sleep(self.server.first_token)
+        if not body.get('stream'):
+            # Generated just as slowly, only sent at the end
+            time.sleep(self.server.token_interval * (len(words) - 1))
+            return self._send_json(200, {
+                'object':  'chat.completion',
+                'model':   body.get('model', 'stub'),
+                'choices': [{'index': 0, 'finish_reason': 'stop',
+                             'message': {'role': 'assistant', 'content': REPLY}}],
+            })
+        self._start_chunked('text/event-stream')
+        for i, word in enumerate(words):
+            if i:
+                time.sleep(self.server.token_interval)
+            chunk = {'object': 'chat.completion.chunk',
+                     'choices': [{'index': 0, 'delta': {'content': word if not i else ' ' + word}}]}
+            self._chunk(f'data: {json.dumps(chunk)}\n\n')
+        self._chunk('data: [DONE]\n\n')
+        self._end_chunked()
+
+    # ─── Ollama ───────────────────────────────────────────────────────────────
+
+    def _ollama(self, body, words):
+        prompt = ' '.join(f"{m.get('role')}: {m.get('content')}" for m in body.get('messages', [])).split()
+        evaluated = self.server.prepare(prompt, body)
+        time.sleep(self.server.first_token + evaluated * self.server.prompt_token_time)
+
+        model = body.get('model', 'stub')
+        final = {'model': model, 'done': True, 'done_reason': 'stop',
+                 'prompt_eval_count': evaluated, 'eval_count': len(words)}
+        if not body.get('stream', True):
+            time.sleep(self.server.token_interval * (len(words) - 1))
+            return self._send_json(200, {**final, 'message': {'role': 'assistant', 'content': REPLY}})
+        self._start_chunked('application/x-ndjson')
+        for i, word in enumerate(words):
+            if i:
+                time.sleep(self.server.token_interval)
+            chunk = {'model': model, 'done': False,
+                     'message': {'role': 'assistant', 'content': word if not i else ' ' + word}}
+            self._chunk(json.dumps(chunk) + '\n')
+        self._chunk(json.dumps({**final, 'message': {'role': 'assistant', 'content': ''}}) + '\n')
+        self._end_chunked()
+
+    # ─── Responses ────────────────────────────────────────────────────────────
+
+    def _send_json(self, status, payload):
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _start_chunked(self, content_type):
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+
+    def _chunk(self, text):
+        data = text.encode()
+        self.wfile.write(b'%x\r\n%s\r\n' % (len(data), data))
+        self.wfile.flush()
+
+    def _end_chunked(self):
+        self.wfile.write(b'0\r\n\r\n')
+        self.wfile.flush()
+
+
+class StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # Bursts of clients connecting at once
+    request_queue_size = 128
+
+    def __init__(self, host='127.0.0.1', port=0, first_token=0.3, token_interval=0.02,
+                 load_time=2.0, prompt_token_time=0.002, parallel=4):
+        super().__init__((host, port), _Handler)
+        self.first_token = first_token
+        self.token_interval = token_interval
+        self.load_time = load_time
+        self.prompt_token_time = prompt_token_time
+        self.counts = {'connections': 0, 'requests': 0, 'loads': 0,
+                       'prompt_tokens': 0, 'cached_tokens': 0}
+        self._lock = threading.Lock()
+        # The simulated Ollama model
+        self._loaded_until = 0.0
+        self._ready_at = 0.0
+        self._num_ctx = None
+        self._slots = [[] for _ in range(parallel)]
+
+    def count(self, name, n=1):
+        with self._lock:
+            self.counts[name] += n
+
+    def prepare(self, prompt, body):
+        """Load the model if needed and pick a slot; returns prompt tokens to evaluate."""
+        num_ctx = (body.get('options') or {}).get('num_ctx')
+        with self._lock:
+            now = time.monotonic()
+            if now >= self._loaded_until or num_ctx != self._num_ctx:
+                self.counts['loads'] += 1
+                self._num_ctx = num_ctx
+                self._slots = [[] for _ in self._slots]
+                # Requests arriving meanwhile wait for the same load
+                self._ready_at = now + self.load_time
+                self._loaded_until = float('inf')
+            wait = self._ready_at - now
+            slot = max(self._slots, key=lambda s: _common_prefix(s, prompt))
+            cached = _common_prefix(slot, prompt)
+            slot[:] = prompt
+            self.counts['prompt_tokens'] += len(prompt) - cached
+            self.counts['cached_tokens'] += cached
+        if wait > 0:
+            time.sleep(wait)
+        with self._lock:
+            self._loaded_until = time.monotonic() + _keep_alive_seconds(body.get('keep_alive'))
+        return len(prompt) - cached
+
+    @property
+    def base_url(self):
+        host, port = self.server_address[:2]
+        return f'http://{host}:{port}'
+
+    @property
+    def url(self):
+        return self.base_url + CHAT_PATH
+
+    def start(self):
+        """Serve on a daemon thread; returns self."""
+        threading.Thread(target=self.serve_forever, name='chatbot-stub', daemon=True).start()
+        return self
@@ -1,3 +1,290 @@
-from django.test import TestCase
+import io
+import json
+import time
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.core.signals import request_finished
+from django.db import close_old_connections
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from . import answers, llm, providers
+from .stub import REPLY, StubServer
+
+
+def _close(response):
+    """Close a streaming response as Django does when the client leaves (keeping the test's DB connection)."""
+    request_finished.disconnect(close_old_connections)
+    try:
+        response.close()
+    finally:
+        request_finished.connect(close_old_connections)
+
+
+class StubTestCase(TestCase):
+    """Runs a local stub of the model endpoints (stub.py) for the class."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.stub = StubServer(first_token=0.01, token_interval=0.001, load_time=0.05).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.stub.shutdown()
+        cls.stub.server_close()
+        super().tearDownClass()
+
+    def provider_settings(self):
+        return {'CHATBOT_PROVIDER': 'openai', 'CHATBOT_API_URL': self.stub.url}
+
+    def setUp(self):
+        self.enterContext(override_settings(
+            CHATBOT_MAX_CONCURRENT=2, CHATBOT_QUEUE_SIZE=0, **self.provider_settings()))
+        # Rebuilt from the settings above on first use
+        llm._gate = None
+        answers._cache = None
+        self.user = User.objects.create_user('reader', password='pw')
+        self.client.force_login(self.user)
+
+    def _post(self, message, stream=True):
+        headers = {'HTTP_ACCEPT': 'text/event-stream'} if stream else {}
+        return self.client.post(reverse('chatbot_message'),
+                                json.dumps({'message': message, 'history': []}),
+                                content_type='application/json', **headers)
+
+    def _events(self, response):
+        body = b''.join(response.streaming_content).decode()
+        _close(response)
+        self.assertTrue(body.endswith('\n\n'))
+        frames = body[:-2].split('\n\n')
+        self.assertTrue(all(frame.startswith('data: ') for frame in frames), frames)
+        return [json.loads(frame[len('data: '):]) for frame in frames]
+
+    def assertSlotsFree(self):
+        self.assertEqual(llm.status()['active'], 0)
+
+
+class ChatbotMessageTests(StubTestCase):
+    """chatbot_message against the stub's OpenAI-compatible route."""
+
+    def test_streams_server_sent_events(self):
+        response = self._post('What sound does m make?')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/event-stream'))
+        self.assertEqual(response['Cache-Control'], 'no-cache')
+
+        events = self._events(response)
+        self.assertGreater(len(events), 2)
+        self.assertEqual(events[-1], {'done': True})
+        self.assertEqual(''.join(event['delta'] for event in events[:-1]), REPLY)
+        self.assertSlotsFree()
+
+    def test_json_when_not_streaming(self):
+        response = self._post('How many syllables are in rabbit?', stream=False)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {'reply': REPLY})
+        self.assertSlotsFree()
+
+    def test_busy_when_every_slot_is_taken(self):
+        held = [llm.open_reply(llm.build_messages(f'Question {i}', [])) for i in range(2)]
+        try:
+            response = self._post('Can you help me spell friend?')
+            self.assertEqual(response.status_code, 503)
+            self.assertIn('error', response.json())
+            self.assertEqual(llm.status()['rejected'], 1)
+        finally:
+            for reply in held:
+                reply.close()
+        self.assertSlotsFree()
+        self.assertEqual(self._post('Can you help me spell friend?', stream=False).status_code, 200)
+
+    def test_slot_released_when_child_leaves(self):
+        response = self._post('Tell me about Letter Fix')
+        self.assertEqual(llm.status()['active'], 1)
+        _close(response)
+        self.assertSlotsFree()
+
+    def test_slot_released_on_api_error(self):
+        with override_settings(CHATBOT_API_URL=self.stub.base_url + '/v1/missing'):
+            response = self._post('How do I play Sound Match?')
+        self.assertEqual(response.status_code, 502)
+        self.assertIn('API error 404', response.json()['error'])
+        self.assertSlotsFree()
+
+    def test_slot_released_on_connection_error(self):
+        # A port nothing listens on any more
+        probe = StubServer()
+        closed_url = probe.url
+        probe.server_close()
+        with override_settings(CHATBOT_API_URL=closed_url):
+            response = self._post('How do I play Word Builder?')
+        self.assertEqual(response.status_code, 502)
+        self.assertSlotsFree()
+
+    @override_settings(CHATBOT_PROVIDER='no-such-provider')
+    def test_unknown_provider(self):
+        response = self._post('What sound does s make?', stream=False)
+        self.assertEqual(response.status_code, 502)
+        self.assertIn('no-such-provider', response.json()['error'])
+        self.assertSlotsFree()
+
+    def test_rejects_empty_message(self):
+        self.assertEqual(self._post('  ', stream=False).status_code, 400)
+        self.assertSlotsFree()
+
+
+class OllamaTests(StubTestCase):
+    """The Ollama provider against the stub's simulated local model."""
+
+    def provider_settings(self):
+        return {'CHATBOT_PROVIDER': 'ollama', 'CHATBOT_OLLAMA_URL': self.stub.base_url,
+                'CHATBOT_OLLAMA_KEEP_ALIVE': '1h'}
+
+    def setUp(self):
+        super().setUp()
+        # A fresh model: unloaded, slots empty
+        self.stub._loaded_until = 0.0
+        self.stub.counts.update(loads=0, prompt_tokens=0, cached_tokens=0)
+
+    def test_streams_through_the_view(self):
+        response = self._post('What sound does m make?')
+        self.assertEqual(response.status_code, 200)
+        events = self._events(response)
+        self.assertEqual(events[-1], {'done': True})
+        self.assertEqual(''.join(event['delta'] for event in events[:-1]), REPLY)
+        self.assertSlotsFree()
+
+    def test_json_when_not_streaming(self):
+        response = self._post('How many syllables are in rabbit?', stream=False)
+        self.assertEqual(response.json(), {'reply': REPLY})
+        self.assertSlotsFree()
+
+    def test_warm_loads_the_model_and_persona(self):
+        llm.warm()
+        self.assertEqual(self.stub.counts['loads'], 1)
+        persona = self.stub.counts['prompt_tokens']
+        self.assertGreater(persona, 0)
+
+        self._post('What sound does s make?', stream=False)
+        # Still loaded, and the persona came from the slot's cache
+        self.assertEqual(self.stub.counts['loads'], 1)
+        self.assertGreaterEqual(self.stub.counts['cached_tokens'], persona)
+
+    def test_warm_command(self):
+        out = io.StringIO()
+        call_command('chatbot_warm', stdout=out)
+        self.assertIn('ollama ready', out.getvalue())
+
+    def test_warm_command_reports_a_missing_server(self):
+        probe = StubServer()
+        closed_url = probe.base_url
+        probe.server_close()
+        with override_settings(CHATBOT_OLLAMA_URL=closed_url):
+            with self.assertRaises(CommandError):
+                call_command('chatbot_warm', stdout=io.StringIO())
+
+    def test_piece(self):
+        provider = providers.OllamaProvider()
+        self.assertEqual(provider.piece(b'{"message": {"role": "assistant", "content": "Hi"}, "done": false}\n'), 'Hi')
+        self.assertEqual(provider.piece(b'{"message": {"content": ""}, "done": true}'), '')
+        self.assertIsNone(provider.piece(b'  \n'))
+        with self.assertRaises(providers.ProviderError):
+            provider.piece(b'{"error": "model \'llama3.2:3b\' not found"}')
+        with self.assertRaises(ValueError):
+            provider.piece(b'not json')
+
+    def test_error_line_mid_stream(self):
+        reply = llm.open_reply(llm.build_messages('Hello', []))
+        with mock.patch.object(providers.OllamaProvider, 'piece',
+                               side_effect=providers.ProviderError('out of memory')):
+            with self.assertRaises(llm.ChatError):
+                reply.text()
+        self.assertSlotsFree()
+
+
+class AnswerCacheTests(SimpleTestCase):
+    """Reused replies (answers.py): both tiers, expiry and eviction."""
+
+    def setUp(self):
+        # Refit as soon as asked, so each test can wait for its index
+        self.enterContext(mock.patch.object(answers, 'REFIT_SECONDS', 0))
+        self.cache = answers.AnswerCache(size=10, ttl=60, similarity=0.8)
+
+    def _store(self, message, reply, history=()):
+        self.cache.store(answers.Question(message, list(history)), reply)
+
+    def _lookup(self, message, history=()):
+        # Fit the similarity index for what is stored now, then look up
+        self.cache._get_index()
+        if self.cache._refitting is not None:
+            self.cache._refitting.join()
+        return self.cache.lookup(answers.Question(message, list(history)))
+
+    def test_normalise(self):
+        self.assertEqual(answers.normalise('Hi Wanda!! How do I play? 🎮'), 'how do i play')
+        self.assertEqual(answers.normalise("What's   B, please"), 'whats b')
+
+    def test_exact_tier(self):
+        self._store('How do I play Word Builder?', 'Drag the letters.')
+        self.assertEqual(self._lookup('hey wanda, how do i play word builder'), 'Drag the letters.')
+        self.assertEqual(self.cache.stats()['exact_hits'], 1)
+
+    def test_similar_tier(self):
+        self._store('How do I play the Word Builder game?', 'Drag the letters.')
+        self.assertEqual(self._lookup('how do I play word builder game'), 'Drag the letters.')
+        self.assertEqual(self.cache.stats()['similar_hits'], 1)
+
+    def test_similar_tier_keeps_letters_and_names_apart(self):
+        self._store('What sound does b make?', 'B says buh.')
+        self._store('How do you spell Tim?', 'T-I-M.')
+        self.assertIsNone(self._lookup('What sound does d make?'))
+        self.assertIsNone(self._lookup('How do you spell Tom?'))
+        self.assertEqual(self.cache.stats()['misses'], 2)
+
+    def test_history_is_part_of_the_key(self):
+        tim = [{'role': 'user', 'content': 'My name is Tim'},
+               {'role': 'assistant', 'content': 'Hello Tim!'}]
+        tom = [{'role': 'user', 'content': 'My name is Tom'},
+               {'role': 'assistant', 'content': 'Hello Tom!'}]
+        self._store('What is my name?', 'Your name is Tim.', tim)
+        self.assertEqual(self._lookup('What is my name?', tim), 'Your name is Tim.')
+        self.assertIsNone(self._lookup('What is my name?', tom))
+        self.assertIsNone(self._lookup('What is my name?'))
+
+    def test_expired_entries_are_not_served(self):
+        self._store('How do I play Sound Match?', 'Tap the picture.')
+        with mock.patch.object(answers.time, 'monotonic', return_value=time.monotonic() + 61):
+            self.assertIsNone(self.cache.lookup(answers.Question('how do i play sound match', [])))
+        self.assertEqual(self.cache.stats()['expired'], 1)
+
+    def test_least_recently_used_is_evicted(self):
+        cache = self.cache = answers.AnswerCache(size=2, ttl=60, similarity=0)
+        self._store('one', '1')
+        self._store('two', '2')
+        self._lookup('one')
+        self._store('three', '3')
+        self.assertEqual(self._lookup('one'), '1')
+        self.assertIsNone(self._lookup('two'))
+        self.assertEqual(self._lookup('three'), '3')
+        self.assertEqual(cache.stats()['evicted'], 1)
+
+    def test_stale_index_skips_evicted_entries(self):
+        cache = self.cache = answers.AnswerCache(size=1, ttl=60, similarity=0.5)
+        self._store('How do I play the Word Builder game?', 'Drag the letters.')
+        self._lookup('nothing like it')
+        self._store('What sound does m make?', 'Mmm.')
+        # No refit yet: the index still holds the evicted entry
+        with mock.patch.object(answers, 'REFIT_SECONDS', 3600):
+            cache._fitted_at = time.monotonic()
+            self.assertIsNone(cache.lookup(answers.Question('how do i play word builder game', [])))
+
+    def test_lookups_never_fit(self):
+        self._store('How do I play Letter Fix?', 'Pick the right letter.')
+        with mock.patch.object(answers.AnswerCache, '_refit') as refit:
+            self.cache.lookup(answers.Question('how do i play letter fix game', []))
+            self.cache._refitting.join()
+        refit.assert_called_once()
@@ -4,4 +4,5 @@ from . import views
 urlpatterns = [
     path('chatbot/',         views.chatbot,         name='chatbot'),
     path('chatbot/message/', views.chatbot_message, name='chatbot_message'),
+    path('chatbot/stats/',   views.chatbot_stats,   name='chatbot_stats'),
 ]
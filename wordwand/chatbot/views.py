@@ -1,21 +1,60 @@
 import json
-import requests as http
 
-from django.conf import settings
+from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib.auth.decorators import login_required
-from django.http import JsonResponse
+from django.http import JsonResponse, StreamingHttpResponse
 from django.shortcuts import render
 from django.views.decorators.http import require_POST
 
+from . import answers, llm
+
 
 @login_required
 def chatbot(request):
     return render(request, 'chatbot/chatbot.html')
 
 
+def _event(data):
+    return f'data: {json.dumps(data)}\n\n'
+
+
+class _ReplyEvents:
+    """
+    A Reply as server-sent events: {"delta": text} per piece, then
+    {"done": true} or {"error": message}. Django closes it when the
+    response ends or the child leaves, which frees the model slot. A reply
+    that streamed to the end is stored in the answer cache.
+    """
+
+    def __init__(self, reply, question):
+        self.reply = reply
+        self.question = question
+
+    def __iter__(self):
+        pieces = []
+        try:
+            for piece in self.reply:
+                pieces.append(piece)
+                yield _event({'delta': piece})
+        except llm.ChatError as e:
+            yield _event({'error': str(e)})
+            return
+        answers.store(self.question, ''.join(pieces))
+        yield _event({'done': True})
+
+    def close(self):
+        self.reply.close()
+
+
 @login_required
 @require_POST
 def chatbot_message(request):
+    """
+    Streams Wanda's reply as server-sent events when the client accepts
+    text/event-stream; otherwise returns {"reply": ...} once it is complete.
+    Answers already in the cache (answers.py) come back as {"reply": ...}
+    at once either way.
+    """
     try:
         data = json.loads(request.body)
         user_msg = data.get('message', '').strip()
@@ -25,64 +64,37 @@ def chatbot_message(request):
 
     if not user_msg:
         return JsonResponse({'error': 'Empty message'}, status=400)
+    if not isinstance(history, list):
+        history = []
 
-    system_prompt = """You are Wanda, a friendly and encouraging reading assistant for children
-learning to read. You work inside WordWand, an educational app with 7 games:
-1. Sound Match - match sounds to letters
-2. Word Builder - drag letters to build words
-3. Sight Word Tap - memorise and tap sight words
-4. Letter Fix - tell apart b/d/p/q
-5. Syllable Breaker - split words into syllables
-6. Listen & Type - hear a word and spell it
-7. Story Builder - read stories and tap words to hear them
-
-Your personality:
-- Warm, patient, and encouraging, never critical
-- Use simple language suitable for young children (ages 5-10)
-- Use emojis occasionally to keep things fun
-- Keep answers short and clear (2-4 sentences max)
-- Celebrate effort and progress enthusiastically
-- If a child is struggling, offer a gentle tip
-- Help with reading, spelling, phonics, and using the games
-- If asked something unrelated to learning/reading, kindly redirect
-
-Never say you are an AI or mention Groq/Meta/Llama. You are Wanda!"""
-
-    # Build message list — Groq uses OpenAI-compatible format
-    messages = [{'role': 'system', 'content': system_prompt}]
-    for msg in history[-10:]:
-        if msg.get('role') in ('user', 'assistant') and msg.get('content'):
-            messages.append({'role': msg['role'], 'content': msg['content']})
-    messages.append({'role': 'user', 'content': user_msg})
+    question = answers.Question(user_msg, history)
+    cached = answers.lookup(question)
+    if cached is not None:
+        return JsonResponse({'reply': cached, 'cached': True})
 
     try:
-        response = http.post(
-            'https://api.groq.com/openai/v1/chat/completions',
-            json={
-                'model':       'llama-3.3-70b-versatile',
-                'max_tokens':  300,
-                'temperature': 0.8,
-                'messages':    messages,
-            },
-            headers={
-                'Authorization': f'Bearer {settings.GROQ_API_KEY}',
-            },
-            timeout=20
-        )
-
-        if response.status_code != 200:
-            return JsonResponse(
-                {'error': f'API error {response.status_code}: {response.text}'},
-                status=502
-            )
-
-        reply = response.json()['choices'][0]['message']['content']
-
-    except http.exceptions.Timeout:
-        return JsonResponse({'error': 'Request timed out. Please try again.'}, status=502)
-    except http.exceptions.ConnectionError:
-        return JsonResponse({'error': 'Could not connect. Check your internet connection.'}, status=502)
-    except Exception as e:
+        reply = llm.open_reply(llm.build_messages(user_msg, history))
+    except llm.ChatBusy as e:
+        return JsonResponse({'error': str(e)}, status=503)
+    except llm.ChatError as e:
         return JsonResponse({'error': str(e)}, status=502)
 
-    return JsonResponse({'reply': reply})
+    if 'text/event-stream' not in request.headers.get('Accept', ''):
+        try:
+            text = reply.text()
+        except llm.ChatError as e:
+            return JsonResponse({'error': str(e)}, status=502)
+        answers.store(question, text)
+        return JsonResponse({'reply': text})
+
+    response = StreamingHttpResponse(_ReplyEvents(reply, question), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    # Stop nginx buffering the stream
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+@staff_member_required
+def chatbot_stats(request):
+    """Answer cache hits and latencies, and the model slots in use (this process)."""
+    return JsonResponse({'cache': answers.stats(), 'model': llm.status()})
@@ -0,0 +1,215 @@
+"""
+Automatic activity capture: time-on-task from games and the reader.
+
+Every answered game round (its response time, or a story's time spent)
+and every finished reader document (its estimated listening time) is an
+activity event. Events are added to an in-process buffer that coalesces
+them per (source, user, day), so a burst of taps is one dictionary update
+each and one row per child-day at flush time.
+
+A daemon thread flushes the buffer every DASHBOARD_ACTIVITY_FLUSH_SECONDS,
+or sooner once DASHBOARD_ACTIVITY_MAX_PENDING events are waiting, and at
+interpreter exit. Those two settings bound what a crashed process loses.
+A flush writes each source's DailyActivity rows (the "WordWand Games" and
+"WordWand Reader" courses, created on first use) with a fixed number of
+statements per chunk of WRITE_CHUNK child-days — create the missing rows,
+read their ids, add every delta in one UPDATE … CASE — and then refreshes
+the flushed days of the heatmap, since bulk writes send no signals. The
+increments are done in SQL, so any number of processes can flush at once.
+A failed flush puts its events back in the buffer.
+
+With DASHBOARD_ACTIVITY_FLUSH_SECONDS = 0 every event is written at once.
+`python manage.py benchmark_activity` measures the trade-off.
+"""
+
+import atexit
+import logging
+import threading
+from collections import defaultdict
+from datetime import date, timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import Case, F, FloatField, Value, When
+
+from . import heatmap
+from .models import Course, DailyActivity
+
+logger = logging.getLogger(__name__)
+
+# Activity sources -> the course their time is recorded under
+SOURCES = {
+    'games':  'WordWand Games',
+    'reader': 'WordWand Reader',
+}
+
+# Child-days written per statement group
+WRITE_CHUNK = 500
+
+
+# ─── Writing ──────────────────────────────────────────────────────────────────
+
+_course_ids = {}
+
+
+def _course_id(source):
+    if source not in _course_ids:
+        title = SOURCES[source]
+        course = Course.objects.filter(title=title).order_by('pk').first()
+        if course is None:
+            course = Course.objects.create(
+                title=title, category='other',
+                description='Time recorded automatically from WordWand activity.')
+        _course_ids[source] = course.pk
+    return _course_ids[source]
+
+
+def _write_chunk(course_id, totals):
+    """Add {(user_id, day): seconds} to one course's DailyActivity rows."""
+    DailyActivity.objects.bulk_create(
+        [DailyActivity(user_id=user_id, course_id=course_id, hours=0,
+                       week_start=day - timedelta(days=day.weekday()),
+                       day_of_week=day.weekday())
+         for user_id, day in totals],
+        ignore_conflicts=True)
+    rows = (DailyActivity.objects
+            .filter(course_id=course_id,
+                    user_id__in={user_id for user_id, _ in totals},
+                    week_start__in={day - timedelta(days=day.weekday()) for _, day in totals})
+            .values_list('pk', 'user_id', 'week_start', 'day_of_week'))
+    hours = {}
+    for pk, user_id, week_start, day_of_week in rows:
+        seconds = totals.get((user_id, week_start + timedelta(days=day_of_week)))
+        if seconds:
+            hours[pk] = seconds / 3600
+    DailyActivity.objects.filter(pk__in=hours).update(hours=F('hours') + Case(
+        *[When(pk=pk, then=Value(h)) for pk, h in hours.items()],
+        default=Value(0.0), output_field=FloatField()))
+
+
+def write(batch):
+    """Add {(source, user_id, day): seconds} to DailyActivity and the heatmap."""
+    by_course = defaultdict(dict)
+    for (source, user_id, day), seconds in batch.items():
+        by_course[_course_id(source)][(user_id, day)] = seconds
+    # All or nothing, so a failed batch can be retried without counting twice
+    with transaction.atomic():
+        for course_id, totals in by_course.items():
+            # Sorted so concurrent flushes lock rows in the same order
+            keys = sorted(totals)
+            for start in range(0, len(keys), WRITE_CHUNK):
+                _write_chunk(course_id, {key: totals[key] for key in keys[start:start + WRITE_CHUNK]})
+
+    days = defaultdict(set)
+    for _, user_id, day in batch:
+        days[user_id].add(day)
+    try:
+        heatmap.refresh_many(days)
+    except Exception:
+        # DailyActivity is written; rebuild_heatmaps repairs the heatmap
+        logger.exception('Heatmap refresh after activity flush failed')
+
+
+# ─── Buffering ────────────────────────────────────────────────────────────────
+
+class ActivityBuffer:
+    """Seconds of activity per (source, user_id, day) since the last drain."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._totals = defaultdict(float)
+        self.events = 0
+
+    def add(self, key, seconds):
+        """Returns the number of events now waiting."""
+        with self._lock:
+            self._totals[key] += seconds
+            self.events += 1
+            return self.events
+
+    def drain(self):
+        with self._lock:
+            totals, self._totals = self._totals, defaultdict(float)
+            self.events = 0
+        return dict(totals)
+
+    def restore(self, totals):
+        """Put back a batch that could not be written."""
+        with self._lock:
+            for key, seconds in totals.items():
+                self._totals[key] += seconds
+            self.events += len(totals)
+
+
+_buffer = ActivityBuffer()
+_wake = threading.Event()
+_flusher = None
+_flusher_lock = threading.Lock()
+
+
+def flush():
+    """Write everything buffered in this process now."""
+    batch = _buffer.drain()
+    if not batch:
+        return
+    try:
+        write(batch)
+    except Exception:
+        _buffer.restore(batch)
+        # The course may have been deleted
+        _course_ids.clear()
+        raise
+
+
+def _run():
+    """The flusher thread."""
+    while True:
+        _wake.wait(settings.DASHBOARD_ACTIVITY_FLUSH_SECONDS)
+        _wake.clear()
+        close_old_connections()
+        try:
+            flush()
+        except Exception:
+            logger.exception('Activity flush failed; retrying next interval')
+        finally:
+            close_old_connections()
+
+
+def _start_flusher():
+    global _flusher
+    with _flusher_lock:
+        if _flusher is None:
+            _flusher = threading.Thread(target=_run, name='activity-flush', daemon=True)
+            _flusher.start()
+            atexit.register(_flush_at_exit)
+
+
+def _flush_at_exit():
+    try:
+        flush()
+    except Exception:
+        logger.exception('Activity flush at exit failed')
+
+
+def record(user_id, source, seconds, day=None):
+    """Add one event of `seconds` on task; returns at once."""
+    seconds = min(max(float(seconds or 0), 0.0), settings.DASHBOARD_ACTIVITY_MAX_EVENT_SECONDS)
+    if not seconds:
+        return
+    key = (source, user_id, day or date.today())
+    if settings.DASHBOARD_ACTIVITY_FLUSH_SECONDS <= 0:
+        try:
+            write({key: seconds})
+        except Exception:
+            # Never fails the game answer or reader job that was recorded
+            logger.exception('Activity write failed')
+        return
+    if _buffer.add(key, seconds) >= settings.DASHBOARD_ACTIVITY_MAX_PENDING:
+        _wake.set()
+    if _flusher is None:
+        _start_flusher()
+
+
+def reading_seconds(text):
+    """Estimated time to listen to a reader document."""
+    return len(text.split()) / settings.DASHBOARD_READER_WORDS_PER_MINUTE * 60
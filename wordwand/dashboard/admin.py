@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Course, UserCourse, ScheduledClass, Assignment, DailyActivity
+from .models import Course, UserCourse, ScheduledClass, Assignment, DailyActivity, ActivityHeatmap
 
 
 @admin.register(Course)
@@ -37,3 +37,10 @@ class AssignmentAdmin(admin.ModelAdmin):
 class DailyActivityAdmin(admin.ModelAdmin):
     list_display = ('user', 'course', 'day_of_week', 'hours', 'week_start')
     list_filter = ('week_start', 'course')
+
+
+@admin.register(ActivityHeatmap)
+class ActivityHeatmapAdmin(admin.ModelAdmin):
+    list_display = ('user', 'year', 'updated_at')
+    list_filter = ('year',)
+    search_fields = ('user__username',)
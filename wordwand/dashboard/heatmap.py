@@ -0,0 +1,176 @@
+"""
+Materialised activity heatmap.
+
+The dashboard shows a user's hours for each of the last 365 days. Summing
+DailyActivity over their whole history on every visit costs more the
+longer they have used WordWand, so each user instead has one
+ActivityHeatmap row per calendar year:
+
+  hours    366 × float32 (little-endian), slot = day of year - 1;
+           slot 365 is only used in leap years — 1.4 KB a year
+
+Rows are kept current incrementally: `refresh(user_id, days)` recomputes
+just those days from DailyActivity and writes them into the year rows
+under a row lock, so it is idempotent and safe to call wherever activity
+is recorded. DailyActivity saves and deletes call it through signals
+(models.py); bulk writers call `refresh_many()`, which does the same for
+many users in a fixed number of statements.
+`python manage.py rebuild_heatmaps` rebuilds (or --verify checks) every
+row from DailyActivity.
+
+The dashboard reads at most two rows — this year and last — however long
+the history, and keeps the result in the session for
+DASHBOARD_HEATMAP_CACHE_TTL seconds, like the games progress summary.
+Activity is flushed from a background thread with no session at hand,
+so the TTL (and the date changing) is the only bound on staleness.
+"""
+
+import calendar
+import sys
+import time
+from array import array
+from collections import defaultdict
+from datetime import date, timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Sum
+from django.utils import timezone
+
+from .models import ActivityHeatmap, DailyActivity
+
+SLOTS = 366
+# Days on the dashboard, today included
+DAYS = 365
+
+SESSION_KEY = 'dashboard_heatmap'
+
+
+def _slot(day):
+    return day.timetuple().tm_yday - 1
+
+
+def unpack(data):
+    """A year row's hours as array('f') of SLOTS (zeros if never written)."""
+    if not data:
+        return array('f', bytes(4 * SLOTS))
+    hours = array('f')
+    hours.frombytes(data)
+    if sys.byteorder != 'little':
+        hours.byteswap()
+    return hours
+
+
+def pack(hours):
+    if sys.byteorder != 'little':
+        hours = hours[:]
+        hours.byteswap()
+    return hours.tobytes()
+
+
+# ─── Writing ──────────────────────────────────────────────────────────────────
+
+def daily_hours(days_by_user):
+    """{(user_id, day): total hours over all courses} from DailyActivity (one query)."""
+    totals = {(user_id, day): 0.0 for user_id, days in days_by_user.items() for day in days}
+    if not totals:
+        return totals
+    first = min(day for _, day in totals)
+    last = max(day for _, day in totals)
+    # A day is stored as week_start + day_of_week, with week_start up to 6 days earlier
+    rows = (DailyActivity.objects
+            .filter(user_id__in=days_by_user,
+                    week_start__range=(first - timedelta(days=6), last))
+            .values_list('user_id', 'week_start', 'day_of_week')
+            .annotate(total=Sum('hours')))
+    for user_id, week_start, day_of_week, total in rows:
+        key = (user_id, week_start + timedelta(days=day_of_week))
+        if key in totals:
+            totals[key] += total or 0.0
+    return totals
+
+
+def refresh_many(days_by_user, create=True):
+    """
+    Recompute these days of each user's heatmap ({user_id: days}) from
+    DailyActivity. With create=False only rows that already exist are
+    updated (after deletes — the user may be being deleted too).
+    """
+    by_row = defaultdict(set)
+    for user_id, days in days_by_user.items():
+        for day in days:
+            by_row[(user_id, day.year)].add(day)
+    if not by_row:
+        return
+    with transaction.atomic():
+        if create:
+            ActivityHeatmap.objects.bulk_create(
+                [ActivityHeatmap(user_id=user_id, year=year) for user_id, year in sorted(by_row)],
+                ignore_conflicts=True)
+        # Locked before reading the totals: concurrent refreshes of a day
+        # then write in commit order, never an older total over a newer one
+        rows = [row for row in (ActivityHeatmap.objects.select_for_update()
+                                .filter(user_id__in=days_by_user,
+                                        year__in={year for _, year in by_row})
+                                .order_by('user_id', 'year'))
+                if (row.user_id, row.year) in by_row]
+        totals = daily_hours(days_by_user)
+        now = timezone.now()
+        for row in rows:
+            hours = unpack(row.hours)
+            for day in by_row[(row.user_id, row.year)]:
+                hours[_slot(day)] = totals[(row.user_id, day)]
+            row.hours = pack(hours)
+            # bulk_update skips auto_now
+            row.updated_at = now
+        ActivityHeatmap.objects.bulk_update(rows, ['hours', 'updated_at'])
+
+
+def refresh(user_id, days, create=True):
+    """Recompute these days of a user's heatmap from DailyActivity."""
+    refresh_many({user_id: days}, create)
+
+
+def build_year(user_id, year):
+    """A year's hours computed from DailyActivity (for rebuilds and checks)."""
+    first = date(year, 1, 1)
+    days = [first + timedelta(days=i) for i in range(366 if calendar.isleap(year) else 365)]
+    hours = unpack(b'')
+    for (_, day), total in daily_hours({user_id: days}).items():
+        hours[_slot(day)] = total
+    return hours
+
+
+# ─── Reading ──────────────────────────────────────────────────────────────────
+
+def recent(user_id, today=None):
+    """(first day, [hours per day]) for the last DAYS days, oldest first."""
+    today = today or date.today()
+    first = today - timedelta(days=DAYS - 1)
+    rows = dict(ActivityHeatmap.objects
+                .filter(user_id=user_id, year__in={first.year, today.year})
+                .values_list('year', 'hours'))
+    hours = unpack(rows.get(today.year))[:_slot(today) + 1]
+    if first.year != today.year:
+        year_end = 366 if calendar.isleap(first.year) else 365
+        hours = unpack(rows.get(first.year))[_slot(first):year_end] + hours
+    else:
+        hours = hours[_slot(first):]
+    return first, [round(h, 2) for h in hours]
+
+
+def for_dashboard(request):
+    """The chart's [{"date", "hours"}, ...] and max_hours, cached in the session."""
+    today = date.today()
+    cached = request.session.get(SESSION_KEY)
+    if (cached is None or cached['today'] != today.isoformat()
+            or time.time() - cached['at'] > settings.DASHBOARD_HEATMAP_CACHE_TTL):
+        first, hours = recent(request.user.pk, today)
+        cached = {'at': time.time(), 'today': today.isoformat(),
+                  'first': first.toordinal(), 'hours': hours}
+        request.session[SESSION_KEY] = cached
+
+    first = cached['first']
+    data = [{'date': date.fromordinal(first + i).isoformat(), 'hours': h}
+            for i, h in enumerate(cached['hours'])]
+    return data, max(cached['hours'], default=0) or 1
@@ -0,0 +1,117 @@
+"""
+Management command: python manage.py benchmark_activity [--events N] [--users N] [--rate N] [--intervals 0,5,30,120]
+
+Replays a stream of --events game answers from --users children, arriving
+at --rate events a second, through the activity buffer
+(dashboard/activity.py) at each flush interval, and reports per interval:
+
+  flushes    batches written to DailyActivity
+  stmts/ev   SQL statements per event, heatmap refresh included
+  ms/ev      database time per event
+  ev/s       events a second one flusher can absorb at that cost
+  loss       events waiting in the buffer at worst — lost if the process
+             crashed then (at most --rate × interval, or --max-pending)
+
+Interval 0 writes every event as it comes, as DASHBOARD_ACTIVITY_FLUSH_SECONDS
+= 0 does. Time is simulated, so a run takes only as long as its writes.
+Each interval runs in a transaction that is rolled back, with user ids
+that need not exist; nothing is kept.
+"""
+
+import random
+import time
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+# Simulated user ids start here, clear of real ones
+USER_BASE = 1_000_000_000
+
+
+class _StatementCounter:
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+def _intervals(value):
+    try:
+        return [float(n) for n in value.split(',') if n.strip()]
+    except ValueError:
+        raise CommandError(f'Invalid interval list: {value!r}')
+
+
+class Command(BaseCommand):
+    help = 'Benchmarks buffered activity capture (see module docstring)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--events', type=int, default=5000)
+        parser.add_argument('--users', type=int, default=200)
+        parser.add_argument('--rate', type=float, default=50,
+                            help='Events a second across the process')
+        parser.add_argument('--days', type=int, default=2,
+                            help='Days the events are spread over')
+        parser.add_argument('--intervals', type=_intervals, default=[0, 5, 30, 120],
+                            help='Comma-separated flush intervals, seconds')
+        parser.add_argument('--max-pending', type=int, default=None,
+                            help='Default: DASHBOARD_ACTIVITY_MAX_PENDING')
+        parser.add_argument('--seed', type=int, default=1)
+
+    def handle(self, *args, **options):
+        from django.conf import settings
+
+        from dashboard import activity
+        from dashboard.activity import ActivityBuffer, write
+
+        rng = random.Random(options['seed'])
+        max_pending = options['max_pending'] or settings.DASHBOARD_ACTIVITY_MAX_PENDING
+        today = date.today()
+        events = [(USER_BASE + rng.randrange(options['users']),
+                   today - timedelta(days=rng.randrange(options['days'])),
+                   rng.uniform(2, 20))
+                  for _ in range(options['events'])]
+
+        buffer = ActivityBuffer()
+        t0 = time.perf_counter()
+        for user_id, day, seconds in events:
+            buffer.add(('games', user_id, day), seconds)
+        record = (time.perf_counter() - t0) / len(events) * 1e6
+        self.stdout.write(f'buffering: {record:.2f} µs/event, '
+                          f'{len(buffer.drain())} child-days from {len(events)} events\n')
+
+        self.stdout.write(f'{"interval":>8} {"flushes":>8} {"stmts/ev":>9} {"ms/ev":>8} '
+                          f'{"ev/s":>9} {"loss":>6}')
+        for interval in options['intervals']:
+            flushes = worst = 0
+            elapsed = 0.0
+            statements = _StatementCounter()
+            with transaction.atomic(), connection.execute_wrapper(statements):
+                buffer = ActivityBuffer()
+                last_flush = 0.0
+                for i, (user_id, day, seconds) in enumerate(events):
+                    now = i / options['rate']
+                    waiting = buffer.add(('games', user_id, day), seconds)
+                    worst = max(worst, waiting)
+                    if interval <= 0 or now - last_flush >= interval or waiting >= max_pending:
+                        last_flush = now
+                        flushes += 1
+                        t0 = time.perf_counter()
+                        write(buffer.drain())
+                        elapsed += time.perf_counter() - t0
+                if buffer.events:
+                    flushes += 1
+                    t0 = time.perf_counter()
+                    write(buffer.drain())
+                    elapsed += time.perf_counter() - t0
+                transaction.set_rollback(True)
+            # The course may have been created in the rolled-back transaction
+            activity._course_ids.clear()
+
+            per_event = elapsed / len(events)
+            self.stdout.write(
+                f'{interval:>8g} {flushes:>8} {statements.count / len(events):>9.2f} '
+                f'{per_event * 1000:>8.3f} {1 / per_event if per_event else 0:>9.0f} {worst:>6}')
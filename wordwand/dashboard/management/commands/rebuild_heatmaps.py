@@ -0,0 +1,69 @@
+"""
+Management command: python manage.py rebuild_heatmaps [--verify] [--user USERNAME]
+
+The dashboard heatmap reads ActivityHeatmap rows (dashboard/heatmap.py),
+which are kept current as DailyActivity changes. DailyActivity remains the
+source of truth; this command rebuilds every user-year row from it, or
+with --verify only checks that the stored rows match and exits non-zero if
+any do not. Migration 0003 builds the rows for history that predates
+them; this is for repairs (e.g. after a failed activity flush).
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds (or verifies) the materialised dashboard heatmaps'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--verify', action='store_true',
+                            help='Only compare stored heatmaps with DailyActivity')
+        parser.add_argument('--user', default=None,
+                            help='Limit to one username')
+
+    def handle(self, *args, **options):
+        from datetime import timedelta
+
+        from dashboard.heatmap import build_year, pack, unpack
+        from dashboard.models import ActivityHeatmap, DailyActivity
+
+        activity = DailyActivity.objects.all()
+        stored = ActivityHeatmap.objects.all()
+        if options['user']:
+            activity = activity.filter(user__username=options['user'])
+            stored = stored.filter(user__username=options['user'])
+
+        # Every user-year with activity, plus rows whose activity is gone
+        keys = {(user_id, (week_start + timedelta(days=day)).year)
+                for user_id, week_start, day in
+                activity.values_list('user_id', 'week_start', 'day_of_week').distinct().iterator()}
+        rows = {(row.user_id, row.year): row for row in stored.iterator()}
+        keys |= rows.keys()
+
+        checked = missing = mismatched = 0
+        for user_id, year in sorted(keys):
+            checked += 1
+            expected = build_year(user_id, year)
+            row = rows.get((user_id, year))
+            if row is None:
+                missing += 1
+            else:
+                if unpack(row.hours) == expected:
+                    continue
+                mismatched += 1
+                self.stdout.write(self.style.WARNING(
+                    f'  user {user_id} {year}: stored heatmap does not match DailyActivity'))
+
+            if not options['verify']:
+                ActivityHeatmap.objects.update_or_create(
+                    user_id=user_id, year=year, defaults={'hours': pack(expected)})
+
+        summary = (f'{checked} user-years: {mismatched} mismatched, '
+                   f'{missing} not yet built')
+        if options['verify']:
+            if mismatched:
+                raise CommandError(summary)
+            self.stdout.write(self.style.SUCCESS(f'✅  {summary}'))
+        else:
+            self.stdout.write(self.style.SUCCESS(
+                f'✅  {summary} — {mismatched + missing} rebuilt'))
@@ -0,0 +1,48 @@
+import sys
+from array import array
+from collections import defaultdict
+from datetime import timedelta
+
+from django.db import migrations
+from django.db.models import Sum
+
+# dashboard/heatmap.py: 366 float32 slots per user-year, little-endian
+SLOTS = 366
+BATCH = 500
+
+
+def build_heatmaps(apps, schema_editor):
+    """Materialise every existing user's history (as rebuild_heatmaps does)."""
+    DailyActivity = apps.get_model('dashboard', 'DailyActivity')
+    ActivityHeatmap = apps.get_model('dashboard', 'ActivityHeatmap')
+
+    years = defaultdict(lambda: array('f', bytes(4 * SLOTS)))
+    rows = (DailyActivity.objects
+            .values_list('user_id', 'week_start', 'day_of_week')
+            .annotate(total=Sum('hours'))
+            .order_by())
+    for user_id, week_start, day_of_week, total in rows.iterator():
+        day = week_start + timedelta(days=day_of_week)
+        years[(user_id, day.year)][day.timetuple().tm_yday - 1] += total or 0.0
+
+    def pack(hours):
+        if sys.byteorder != 'little':
+            hours.byteswap()
+        return hours.tobytes()
+
+    ActivityHeatmap.objects.bulk_create(
+        [ActivityHeatmap(user_id=user_id, year=year, hours=pack(hours))
+         for (user_id, year), hours in sorted(years.items())],
+        batch_size=BATCH, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0002_activity_heatmap'),
+    ]
+
+    operations = [
+        # Reversing 0002 drops the table, rows and all
+        migrations.RunPython(build_heatmaps, migrations.RunPython.noop),
+    ]
@@ -1,4 +1,7 @@
+from datetime import timedelta
+
 from django.db import models
+from django.db.models.signals import post_delete, post_save
 from django.contrib.auth.models import User
 
 
@@ -99,3 +102,33 @@ class DailyActivity(models.Model):
 
     def __str__(self):
         return f"{self.user.username} | {self.course.title} | {self.get_day_of_week_display()}: {self.hours}h"
+
+
+class ActivityHeatmap(models.Model):
+    """
+    A user's daily hours for one calendar year, materialised from
+    DailyActivity: 366 float32 slots by day of year (see heatmap.py).
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='activity_heatmaps')
+    year = models.PositiveSmallIntegerField()
+    hours = models.BinaryField(default=b'', editable=False)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ('user', 'year')
+
+    def __str__(self):
+        return f"{self.user.username} | {self.year}"
+
+
+def refresh_heatmap(sender, instance, **kwargs):
+    if kwargs.get('raw'):
+        return
+    from .heatmap import refresh
+    # A delete may be cascading from the user, whose heatmap is already gone
+    refresh(instance.user_id, [instance.week_start + timedelta(days=instance.day_of_week)],
+            create=kwargs.get('signal') is post_save)
+
+
+post_save.connect(refresh_heatmap, sender=DailyActivity)
+post_delete.connect(refresh_heatmap, sender=DailyActivity)
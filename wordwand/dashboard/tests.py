@@ -1,3 +1,174 @@
-from django.test import TestCase
+from datetime import date, timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.db import DatabaseError
+from django.test import TestCase, override_settings
+
+from . import activity, heatmap
+from .models import ActivityHeatmap, Course, DailyActivity
+
+
+def _activity(user, course, day, hours):
+    return DailyActivity.objects.create(
+        user=user, course=course, hours=hours,
+        week_start=day - timedelta(days=day.weekday()), day_of_week=day.weekday())
+
+
+class HeatmapTests(TestCase):
+    """The materialised per-year heatmap (heatmap.py) follows DailyActivity."""
+
+    def setUp(self):
+        self.user = User.objects.create_user('reader', password='pw')
+        self.games = Course.objects.create(title='WordWand Games', category='other')
+        self.reader = Course.objects.create(title='WordWand Reader', category='other')
+
+    def _hours(self, today):
+        first, hours = heatmap.recent(self.user.pk, today)
+        return {first + timedelta(days=i): h for i, h in enumerate(hours) if h}
+
+    def test_saves_and_deletes_refresh_the_day(self):
+        day = date(2026, 3, 4)
+        row = _activity(self.user, self.games, day, 1.5)
+        _activity(self.user, self.reader, day, 0.25)
+        self.assertEqual(self._hours(day), {day: 1.75})
+
+        row.hours = 0.5
+        row.save()
+        self.assertEqual(self._hours(day), {day: 0.75})
+        row.delete()
+        self.assertEqual(self._hours(day), {day: 0.25})
+
+    def test_refresh_many_after_bulk_writes(self):
+        days = [date(2026, 3, 2), date(2026, 3, 9)]
+        DailyActivity.objects.bulk_create([
+            DailyActivity(user=self.user, course=self.games, hours=2.0,
+                          week_start=day - timedelta(days=day.weekday()), day_of_week=day.weekday())
+            for day in days])
+        # Bulk writes send no signals
+        self.assertEqual(self._hours(days[-1]), {})
+        heatmap.refresh_many({self.user.pk: days})
+        self.assertEqual(self._hours(days[-1]), {day: 2.0 for day in days})
+
+    def test_window_across_the_new_year(self):
+        today = date(2026, 1, 10)
+        first = today - timedelta(days=heatmap.DAYS - 1)
+        days = {first: 1.0, date(2025, 12, 31): 2.0, date(2026, 1, 1): 3.0, today: 0.5}
+        for day, hours in days.items():
+            _activity(self.user, self.games, day, hours)
+        # Just outside the window
+        _activity(self.user, self.games, first - timedelta(days=1), 9.0)
+
+        window_first, hours = heatmap.recent(self.user.pk, today)
+        self.assertEqual(window_first, first)
+        self.assertEqual(len(hours), heatmap.DAYS)
+        self.assertEqual(self._hours(today), days)
+        self.assertEqual(ActivityHeatmap.objects.filter(user=self.user).count(), 2)
+
+    def test_leap_day_and_last_slot(self):
+        today = date(2025, 1, 5)
+        days = {date(2024, 2, 29): 1.0, date(2024, 12, 31): 2.0, date(2025, 1, 1): 0.5}
+        for day, hours in days.items():
+            _activity(self.user, self.games, day, hours)
+        self.assertEqual(self._hours(today), days)
+        # 31 December of a leap year is the 366th slot
+        row = ActivityHeatmap.objects.get(user=self.user, year=2024)
+        self.assertEqual(heatmap.unpack(row.hours)[365], 2.0)
+
+    def test_no_history(self):
+        first, hours = heatmap.recent(self.user.pk, date(2026, 6, 1))
+        self.assertEqual(len(hours), heatmap.DAYS)
+        self.assertFalse(any(hours))
+
+
+class ActivityCaptureTests(TestCase):
+    """Buffered time-on-task capture (activity.py)."""
+
+    def setUp(self):
+        self.user = User.objects.create_user('player', password='pw')
+        self.day = date(2026, 3, 4)
+        self.enterContext(override_settings(
+            DASHBOARD_ACTIVITY_FLUSH_SECONDS=30, DASHBOARD_ACTIVITY_MAX_PENDING=5000,
+            DASHBOARD_ACTIVITY_MAX_EVENT_SECONDS=600))
+        # A fresh buffer per test, and no flusher thread outside the test transaction
+        self.buffer = activity.ActivityBuffer()
+        self.enterContext(mock.patch.object(activity, '_buffer', self.buffer))
+        self.start_flusher = self.enterContext(mock.patch.object(activity, '_start_flusher'))
+        self.enterContext(mock.patch.object(activity, '_flusher', None))
+        # Course ids cached by an earlier test were rolled back with it
+        activity._course_ids.clear()
+        self.addCleanup(activity._course_ids.clear)
+
+    def _seconds(self, source='games'):
+        rows = DailyActivity.objects.filter(user=self.user, course__title=activity.SOURCES[source])
+        return {row.week_start + timedelta(days=row.day_of_week): round(row.hours * 3600, 3)
+                for row in rows}
+
+    def test_buffer_coalesces_per_child_day(self):
+        key = ('games', self.user.pk, self.day)
+        self.assertEqual(self.buffer.add(key, 2.0), 1)
+        self.assertEqual(self.buffer.add(key, 3.0), 2)
+        self.buffer.add(('reader', self.user.pk, self.day), 60.0)
+
+        self.assertEqual(self.buffer.drain(), {key: 5.0, ('reader', self.user.pk, self.day): 60.0})
+        self.assertEqual(self.buffer.events, 0)
+        self.assertEqual(self.buffer.drain(), {})
+
+    def test_record_buffers_until_flush(self):
+        for seconds in (4.0, 6.0):
+            activity.record(self.user.pk, 'games', seconds, day=self.day)
+        activity.record(self.user.pk, 'reader', 90.0, day=self.day)
+        self.start_flusher.assert_called()
+        self.assertFalse(DailyActivity.objects.exists())
+
+        activity.flush()
+        self.assertEqual(self._seconds('games'), {self.day: 10.0})
+        self.assertEqual(self._seconds('reader'), {self.day: 90.0})
+        first, hours = heatmap.recent(self.user.pk, self.day)
+        self.assertEqual(hours[(self.day - first).days], round(100 / 3600, 2))
+
+    def test_flushes_add_to_existing_rows(self):
+        activity.record(self.user.pk, 'games', 30.0, day=self.day)
+        activity.flush()
+        activity.record(self.user.pk, 'games', 15.0, day=self.day)
+        activity.record(self.user.pk, 'games', 5.0, day=self.day + timedelta(days=1))
+        activity.flush()
+        self.assertEqual(self._seconds(), {self.day: 45.0, self.day + timedelta(days=1): 5.0})
+        self.assertEqual(Course.objects.filter(title=activity.SOURCES['games']).count(), 1)
+
+    def test_failed_flush_keeps_its_events(self):
+        activity.record(self.user.pk, 'games', 20.0, day=self.day)
+        with mock.patch.object(activity, 'write', side_effect=DatabaseError('locked')):
+            with self.assertRaises(DatabaseError):
+                activity.flush()
+        self.assertEqual(self.buffer.events, 1)
+        self.assertFalse(DailyActivity.objects.exists())
+
+        activity.record(self.user.pk, 'games', 10.0, day=self.day)
+        activity.flush()
+        self.assertEqual(self._seconds(), {self.day: 30.0})
+        activity.flush()
+        self.assertEqual(self._seconds(), {self.day: 30.0})
+
+    def test_max_pending_wakes_the_flusher(self):
+        with override_settings(DASHBOARD_ACTIVITY_MAX_PENDING=3), \
+                mock.patch.object(activity, '_wake') as wake:
+            activity.record(self.user.pk, 'games', 1.0, day=self.day)
+            activity.record(self.user.pk, 'games', 1.0, day=self.day)
+            wake.set.assert_not_called()
+            activity.record(self.user.pk, 'games', 1.0, day=self.day)
+            wake.set.assert_called_once()
+
+    @override_settings(DASHBOARD_ACTIVITY_FLUSH_SECONDS=0)
+    def test_unbuffered_writes_at_once(self):
+        activity.record(self.user.pk, 'games', 12.0, day=self.day)
+        self.assertEqual(self._seconds(), {self.day: 12.0})
+        self.assertEqual(self.buffer.events, 0)
+        self.start_flusher.assert_not_called()
+
+    @override_settings(DASHBOARD_ACTIVITY_FLUSH_SECONDS=0)
+    def test_event_seconds_are_clamped(self):
+        activity.record(self.user.pk, 'games', 3 * 3600, day=self.day)
+        activity.record(self.user.pk, 'games', -5, day=self.day)
+        activity.record(self.user.pk, 'games', None, day=self.day)
+        self.assertEqual(self._seconds(), {self.day: 600.0})
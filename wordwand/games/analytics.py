@@ -0,0 +1,332 @@
+"""
+Columnar attempt log and teacher analytics.
+
+The attempt tables are row-per-event and only indexed by their foreign
+keys, so a report that walks a year of them through the ORM takes
+minutes. `python manage.py export_attempt_log` (run it from cron) appends
+every attempt newer than the last export's high-water mark to compact
+column files, one directory per game and day. Export stops at the first
+attempt younger than GAMES_ATTEMPT_LOG_LAG_SECONDS: ids are allocated
+before their transactions commit, so a lower id can appear after a higher
+one has been exported, and the mark must never pass it.
+
+  <GAMES_ATTEMPT_LOG_DIR>/manifest.json         {"games": {game: {"hwm": last id, "rows": n}}}
+  <GAMES_ATTEMPT_LOG_DIR>/<game>/<YYYY-MM-DD>/<column>.npy
+
+  id       i8    attempt primary key (partitions are sorted by it)
+  user     i4
+  item     i4    phoneme / word / confusion set / story id
+  at       i8    unix seconds
+  correct  bool  stories: completed
+  seconds  f4    response time (stories: time spent)
+
+A report reads only the days and columns it needs, straight into arrays,
+and every aggregate is a NumPy bincount over whole columns — a year of
+2,000 children (~15M attempts) takes under a second (`manage.py
+benchmark_analytics`):
+
+  user_report(user_id)          per game: attempts, accuracy, time, active days
+  class_report(user_ids)        the same per child, for any group of children
+  item_report(game, user_ids)   per word / phoneme, hardest first
+
+The log is append-only: attempts edited after export are only reflected
+by `export_attempt_log --rebuild`, and attempts pruned by rollup_attempts
+stay in it (a rebuild would lose them, so the command refuses one for
+games with rollups).
+"""
+
+import datetime
+import json
+import os
+import shutil
+import struct
+import tempfile
+from pathlib import Path
+
+import numpy as np
+from django.conf import settings
+from django.utils import timezone
+
+COLUMNS = {'id': 'i8', 'user': 'i4', 'item': 'i4', 'at': 'i8', 'correct': '?', 'seconds': 'f4'}
+# Not stored: each row's day ordinal, from its partition's name
+DAY = 'day'
+
+# game_type -> (content foreign key, correctness field); times come from attempts.GAMES
+SOURCES = {
+    'sound_match':   ('phoneme_id',       'is_correct'),
+    'word_builder':  ('word_id',          'is_correct'),
+    'sight_word':    ('word_id',          'is_correct'),
+    'confusion':     ('confusion_set_id', 'is_correct'),
+    'syllable':      ('syllable_word_id', 'is_correct'),
+    'listen_type':   ('listen_word_id',   'is_correct'),
+    'story_builder': ('story_id',         'completed'),
+}
+
+EXPORT_CHUNK = 50_000
+
+# Distinct counts use a (groups × values) bitmap up to this many cells
+BITMAP_LIMIT = 64 * 1024 * 1024
+
+_NPY_MAGIC = b'\x93NUMPY\x01\x00'
+
+
+# ─── Storage ──────────────────────────────────────────────────────────────────
+
+def _load_column(path, dtype):
+    """
+    Read a column file this module wrote. np.load parses every header with
+    ast.literal_eval, which dominates for a year of small day partitions;
+    anything unexpected still goes through it.
+    """
+    with open(path, 'rb') as f:
+        head = f.read(10)
+        if head[:8] == _NPY_MAGIC:
+            header = f.read(struct.unpack_from('<H', head, 8)[0])
+            if f"'descr': '{np.dtype(dtype).str}'".encode() in header and b"'fortran_order': False" in header:
+                return np.fromfile(f, dtype=dtype)
+    return np.load(path)
+
+
+def _save_atomic(path, write):
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix='.part')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            write(f)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+class AttemptLog:
+    """The exported attempt log under `root` (settings.GAMES_ATTEMPT_LOG_DIR)."""
+
+    def __init__(self, root=None):
+        self.root = Path(root or settings.GAMES_ATTEMPT_LOG_DIR)
+
+    def manifest(self):
+        try:
+            with open(self.root / 'manifest.json') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {'games': {}}
+
+    def save_manifest(self, manifest):
+        self.root.mkdir(parents=True, exist_ok=True)
+        _save_atomic(self.root / 'manifest.json',
+                     lambda f: f.write(json.dumps(manifest, indent=1).encode()))
+
+    def high_water_mark(self, game_type):
+        return self.manifest()['games'].get(game_type, {}).get('hwm', 0)
+
+    def days(self, game_type, start=None, end=None):
+        """Partition dates (inclusive range), oldest first."""
+        directory = self.root / game_type
+        if not directory.is_dir():
+            return []
+        days = sorted(datetime.date.fromisoformat(name) for name in os.listdir(directory)
+                      if not name.startswith('.'))
+        return [d for d in days if (start is None or d >= start) and (end is None or d <= end)]
+
+    def partition(self, game_type, day, columns=COLUMNS, mmap=True):
+        """One day's columns, memory-mapped by default."""
+        directory = self.root / game_type / day.isoformat()
+        data = {name: np.load(directory / f'{name}.npy', mmap_mode='r' if mmap else None)
+                for name in columns}
+        # Merges only append, and replace one column file at a time: while an
+        # export runs, the shortest column is the consistent prefix
+        rows = min(len(column) for column in data.values())
+        return {name: column[:rows] for name, column in data.items()}
+
+    def read(self, game_type, columns, start=None, end=None):
+        """Columns of every partition in the date range, concatenated in memory."""
+        stored = [name for name in columns if name != DAY] or ['id']
+        days = self.days(game_type, start, end)
+        parts = []
+        base = os.path.join(self.root, game_type)
+        for day in days:
+            directory = os.path.join(base, day.isoformat())
+            part = {name: _load_column(os.path.join(directory, f'{name}.npy'), COLUMNS[name])
+                    for name in stored}
+            rows = min(len(column) for column in part.values())  # see partition()
+            parts.append({name: column[:rows] for name, column in part.items()})
+        data = {name: np.concatenate([part[name] for part in parts])
+                if parts else np.empty(0, COLUMNS[name]) for name in stored}
+        if DAY in columns:
+            data[DAY] = np.repeat(
+                np.array([day.toordinal() for day in days], dtype=np.int32),
+                [len(part[stored[0]]) for part in parts]).astype(np.int32)
+        return data
+
+    def append(self, game_type, rows, days):
+        """
+        Merge new rows ({column: array}, ids ascending) into their day
+        partitions; `days` is each row's date. Rows already present (an
+        export interrupted before its manifest update) are skipped.
+        Returns the number of rows written.
+        """
+        order = np.argsort(days, kind='stable')
+        days = np.asarray(days)[order]
+        rows = {name: np.asarray(rows[name], dtype)[order] for name, dtype in COLUMNS.items()}
+        bounds = np.flatnonzero(days[1:] != days[:-1]) + 1
+        return sum(
+            self._merge(game_type, days[lo], {name: column[lo:hi] for name, column in rows.items()})
+            for lo, hi in zip(np.r_[0, bounds], np.r_[bounds, len(days)]))
+
+    def _merge(self, game_type, day, new):
+        directory = self.root / game_type / day.isoformat()
+        added = len(new['id'])
+        if directory.is_dir():
+            old = self.partition(game_type, day, mmap=False)
+            if len(old['id']):
+                keep = new['id'] > old['id'][-1]
+                added = int(keep.sum())
+                new = {name: np.concatenate([old[name], new[name][keep]]) for name in COLUMNS}
+        directory.mkdir(parents=True, exist_ok=True)
+        for name, column in new.items():
+            _save_atomic(directory / f'{name}.npy', lambda f, column=column: np.save(f, column))
+        return added
+
+    def clear(self, game_type=None):
+        if game_type is None:
+            shutil.rmtree(self.root, ignore_errors=True)
+            return
+        shutil.rmtree(self.root / game_type, ignore_errors=True)
+        manifest = self.manifest()
+        manifest['games'].pop(game_type, None)
+        self.save_manifest(manifest)
+
+
+# ─── Export ───────────────────────────────────────────────────────────────────
+
+def export(game_type, log=None, chunk_size=EXPORT_CHUNK):
+    """Append this game's attempts above the high-water mark; returns rows added."""
+    from .attempts import GAMES
+
+    log = log or AttemptLog()
+    item_field, correct_field = SOURCES[game_type]
+    time_field = GAMES[game_type].time_attr
+    queryset = GAMES[game_type].model.objects.order_by('pk').values_list(
+        'pk', 'user_id', item_field, 'attempted_at', correct_field, time_field)
+
+    manifest = log.manifest()
+    state = manifest['games'].setdefault(game_type, {'hwm': 0, 'rows': 0})
+    cutoff = timezone.now() - datetime.timedelta(seconds=settings.GAMES_ATTEMPT_LOG_LAG_SECONDS)
+    added = 0
+    while True:
+        chunk = list(queryset.filter(pk__gt=state['hwm'])[:chunk_size])
+        # Only the run of ids before the first recent attempt: one still
+        # committing below it would otherwise be skipped for good
+        recent = next((i for i, row in enumerate(chunk) if row[3] >= cutoff), None)
+        if recent is not None:
+            chunk = chunk[:recent]
+        if not chunk:
+            break
+        ids, users, items, ats, correct, seconds = zip(*chunk)
+        written = log.append(game_type, {
+            'id': ids, 'user': users, 'item': items,
+            'at': [int(at.timestamp()) for at in ats],
+            'correct': correct, 'seconds': [s or 0.0 for s in seconds],
+        }, [timezone.localdate(at) for at in ats])
+        # Only after the partitions are written: a crash re-exports, never skips
+        state['hwm'] = ids[-1]
+        state['rows'] += written
+        log.save_manifest(manifest)
+        added += written
+        if recent is not None:
+            break
+    return added
+
+
+# ─── Reports ──────────────────────────────────────────────────────────────────
+
+def _index(users, user_ids):
+    """Position of each row's user in `user_ids`; everyone else gets len(user_ids)."""
+    user_ids = np.asarray(user_ids, dtype=np.int64)
+    size = int(max(users.max(initial=0), user_ids.max(initial=0))) + 1
+    lookup = np.full(size, len(user_ids), dtype=np.int32)
+    lookup[user_ids] = np.arange(len(user_ids), dtype=np.int32)
+    return lookup[users]
+
+
+def _distinct(groups, values, size):
+    """Number of distinct `values` in each of `size` groups."""
+    if not len(values):
+        return np.zeros(size, dtype=np.int64)
+    low = int(values.min())
+    span = int(values.max()) - low + 1
+    cells = groups.astype(np.int64) * span + (values - low)
+    if size * span <= BITMAP_LIMIT:
+        seen = np.zeros(size * span, dtype=bool)
+        seen[cells] = True
+        return seen.reshape(size, span).sum(axis=1)
+    return np.bincount(np.unique(cells) // span, minlength=size)
+
+
+def _totals(keys, size, correct, seconds, days=None):
+    """Per-key attempts, accuracy %, average seconds (and distinct days)."""
+    attempts = np.bincount(keys, minlength=size)
+    right = np.bincount(keys[correct], minlength=size)
+    total_time = np.bincount(keys, weights=seconds, minlength=size)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        totals = {
+            'attempts': attempts,
+            'accuracy': np.where(attempts > 0, np.round(right / attempts * 100, 1), 0.0),
+            'average_time': np.where(attempts > 0, np.round(total_time / attempts, 2), 0.0),
+        }
+    if days is not None:
+        totals['active_days'] = _distinct(keys, days, size)
+    return totals
+
+
+def class_report(user_ids, start=None, end=None, log=None):
+    """
+    {game_type: {'attempts', 'accuracy', 'average_time', 'active_days'}},
+    each an array aligned with `user_ids` (a class, a course's enrolments…).
+    """
+    from .attempts import GAMES
+
+    log = log or AttemptLog()
+    report = {}
+    for game_type in GAMES:
+        cols = log.read(game_type, ('user', 'correct', 'seconds', DAY), start, end)
+        # Other children's rows land in one extra bucket instead of being copied out
+        keys = _index(cols['user'], user_ids)
+        totals = _totals(keys, len(user_ids) + 1, cols['correct'], cols['seconds'], cols[DAY])
+        report[game_type] = {name: values[:-1] for name, values in totals.items()}
+    return report
+
+
+def user_report(user_id, start=None, end=None, log=None):
+    """{game_type: {'attempts', 'accuracy', 'average_time', 'active_days'}} for one child."""
+    from .attempts import GAMES
+
+    log = log or AttemptLog()
+    report = {}
+    for game_type in GAMES:
+        cols = log.read(game_type, ('user', 'correct', 'seconds', DAY), start, end)
+        mine = cols['user'] == user_id
+        totals = _totals(np.zeros(np.count_nonzero(mine), dtype=np.intp), 1,
+                         cols['correct'][mine], cols['seconds'][mine], cols[DAY][mine])
+        report[game_type] = {name: values[0].item() for name, values in totals.items()}
+    return report
+
+
+def item_report(game_type, user_ids=None, start=None, end=None, log=None):
+    """
+    Per item (word, phoneme, …) of one game, hardest first: [{'item',
+    'attempts', 'accuracy', 'average_time', 'children'}], optionally
+    limited to a group of children.
+    """
+    log = log or AttemptLog()
+    cols = log.read(game_type, ('user', 'item', 'correct', 'seconds'), start, end)
+    if user_ids is not None:
+        mine = _index(cols['user'], user_ids) < len(user_ids)
+        cols = {name: column[mine] for name, column in cols.items()}
+    items, keys = np.unique(cols['item'], return_inverse=True)
+    totals = _totals(keys, len(items), cols['correct'], cols['seconds'])
+    totals['children'] = _distinct(keys, cols['user'], len(items))
+
+    order = np.lexsort((-totals['attempts'], totals['accuracy']))
+    return [{'item': int(items[i]), **{name: values[i].item() for name, values in totals.items()}}
+            for i in order]
@@ -0,0 +1,357 @@
+"""
+Grading and recording of game attempts.
+
+Every game answer goes through `grade()` (pure: decides correctness and
+builds the unsaved attempt) and `record()` (writes). The per-game submit
+views record one attempt; the batch endpoint records whatever the client
+queued — possibly several games — in one transaction, with one
+bulk_create, one error-pattern update per error type and one progress
+save per game.
+
+Progress is replayed attempt by attempt in memory, so a batch moves the
+adaptive level exactly as the same answers submitted one at a time would.
+The rolling window behind it is UserProgress.recent_outcomes (see
+ring.py), so recording never reads the attempt tables back. Levels move
+by the trained model in difficulty.py when one is installed. Each
+answer's time is also passed on as dashboard activity (dashboard/activity.py).
+"""
+
+from collections import Counter, defaultdict, namedtuple
+
+from django.db import transaction
+
+from dashboard import activity
+
+from .models import (
+    ConfusionAttempt, ListenAttempt, PhonemeAttempt, SightWordAttempt,
+    StoryAttempt, SyllableAttempt, UserErrorPattern, UserProgress,
+    UserSightWordProgress, WordBuildAttempt,
+)
+from . import difficulty, scheduler
+from .pools import get_pool
+from .ring import Outcome, RecentRing
+
+# Largest batch the client may send in one request
+MAX_BATCH = 50
+
+# Attempts looked back over for a game's rolling accuracy / time
+RECENT_ATTEMPTS = 10
+RECENT_STORIES = 5
+# Stories are not graded, so they count as a fixed accuracy
+STORY_ACCURACY = 80.0
+
+Graded = namedtuple('Graded', 'attempt error_type result')
+
+
+class InvalidAttempt(ValueError):
+    """The attempt payload is malformed or refers to missing content."""
+
+
+class ContentNotFound(InvalidAttempt):
+    pass
+
+
+def _calc_stats(outcomes):
+    """Rolling (accuracy %, average seconds) over a list of Outcomes."""
+    if not outcomes:
+        return 0.0, 0.0
+    correct = sum(1 for o in outcomes if o.is_correct)
+    acc = round(correct / len(outcomes) * 100, 1)
+    avg_t = round(sum(o.seconds for o in outcomes) / len(outcomes), 2)
+    return acc, avg_t
+
+
+def _story_stats(outcomes):
+    avg_t = round(sum(o.seconds for o in outcomes) /
+                  len(outcomes), 2) if outcomes else 0
+    return STORY_ACCURACY, avg_t
+
+
+def _response_time(data, key='response_time'):
+    try:
+        return float(data.get(key, 0))
+    except (TypeError, ValueError):
+        raise InvalidAttempt(f'{key} must be a number')
+
+
+def _content(pool, data, key):
+    try:
+        pk = int(data[key])
+    except (KeyError, TypeError, ValueError):
+        raise InvalidAttempt(f'{key} is required')
+    item = pool.items.get(pk)
+    if item is None:
+        raise ContentNotFound(f'No such {key}: {pk}')
+    return item
+
+
+# ─── Graders ──────────────────────────────────────────────────────────────────
+# grader(user, data, pool) -> Graded; nothing is written here.
+
+def _grade_sound_match(user, data, pool):
+    phoneme = _content(pool, data, 'phoneme_id')
+    options = {option.pk: option for option in phoneme.option_list}
+    try:
+        option = options[int(data['option_id'])]
+    except (KeyError, TypeError, ValueError):
+        raise ContentNotFound('option_id does not belong to this phoneme')
+
+    is_correct = option.is_correct
+    attempt = PhonemeAttempt(
+        user=user, phoneme=phoneme,
+        selected_option=option, is_correct=is_correct,
+        response_time=_response_time(data),
+    )
+    return Graded(attempt, None if is_correct else 'phoneme_miss',
+                  {'correct': is_correct})
+
+
+def _grade_word_builder(user, data, pool):
+    word = _content(pool, data, 'word_id')
+    submitted = data.get('submitted_order')
+    if not isinstance(submitted, list):
+        raise InvalidAttempt('submitted_order must be a list')
+
+    # FIX: ordered + case-insensitive
+    correct_order = word.letter_list
+    is_correct = ([str(s).lower() for s in submitted] ==
+                  [c.lower() for c in correct_order])
+    attempt = WordBuildAttempt(
+        user=user, word=word,
+        submitted_order=submitted, is_correct=is_correct,
+        response_time=_response_time(data),
+    )
+    return Graded(attempt, None if is_correct else 'blending_failure',
+                  {'correct': is_correct, 'correct_order': list(correct_order)})
+
+
+def _grade_sight_word(user, data, pool):
+    target = _content(pool, data, 'word_id')
+    try:
+        selected_id = int(data['selected_id'])
+    except (KeyError, TypeError, ValueError):
+        raise InvalidAttempt('selected_id is required')
+
+    is_correct = (target.pk == selected_id)
+    attempt = SightWordAttempt(
+        user=user, word=target,
+        is_correct=is_correct, response_time=_response_time(data),
+    )
+    return Graded(attempt, None if is_correct else 'sight_word_miss',
+                  {'correct': is_correct})
+
+
+def _grade_confusion(user, data, pool):
+    confusion = _content(pool, data, 'confusion_id')
+    shown = str(data.get('shown', ''))
+    selected = str(data.get('selected', ''))
+    is_correct = (shown == selected)
+
+    error_type = None
+    if not is_correct:
+        pair = {shown, selected}
+        error_type = 'bd_confusion' if pair <= {'b', 'd'} else 'pq_confusion'
+    attempt = ConfusionAttempt(
+        user=user, confusion_set=confusion,
+        shown_letter=shown, selected=selected,
+        is_correct=is_correct, response_time=_response_time(data),
+    )
+    return Graded(attempt, error_type, {'correct': is_correct})
+
+
+def _grade_syllable(user, data, pool):
+    sw = _content(pool, data, 'word_id')
+    submitted = data.get('submitted_splits')
+    if not isinstance(submitted, list):
+        raise InvalidAttempt('submitted_splits must be a list')
+
+    correct = sw.syllable_structure
+    # FIX: case-insensitive + strip whitespace
+    is_correct = ([str(s).lower().strip() for s in submitted] ==
+                  [c.lower().strip() for c in correct])
+    attempt = SyllableAttempt(
+        user=user, syllable_word=sw,
+        submitted_splits=submitted, is_correct=is_correct,
+        response_time=_response_time(data),
+    )
+    return Graded(attempt, None if is_correct else 'syllable_segmentation',
+                  {'correct': is_correct, 'correct_answer': correct})
+
+
+def _grade_listen_type(user, data, pool):
+    lw = _content(pool, data, 'word_id')
+    typed = str(data.get('typed_answer', '')).strip().lower()
+    correct = lw.word_text.strip().lower()
+    is_correct = (typed == correct)
+
+    wrong_pos = [i for i in range(
+        min(len(typed), len(correct))) if typed[i] != correct[i]]
+    if len(typed) != len(correct):
+        wrong_pos += list(range(min(len(typed), len(correct)),
+                          max(len(typed), len(correct))))
+
+    attempt = ListenAttempt(
+        user=user, listen_word=lw,
+        typed_answer=typed, is_correct=is_correct,
+        wrong_positions=wrong_pos, response_time=_response_time(data),
+    )
+    return Graded(attempt, None if is_correct else 'phoneme_miss',
+                  {'correct': is_correct, 'wrong_positions': wrong_pos,
+                   'correct_word': correct})
+
+
+def _grade_story_builder(user, data, pool):
+    story = _content(pool, data, 'story_id')
+    answers = data.get('fill_answers', {})
+    if not isinstance(answers, dict):
+        answers = {}
+    attempt = StoryAttempt(
+        user=user, story=story,
+        completed=True, fill_answers=answers,
+        time_spent=_response_time(data, 'time_spent'),
+    )
+    return Graded(attempt, None, {'ok': True})
+
+
+Game = namedtuple('Game', 'grader model window time_attr stats')
+
+GAMES = {
+    'sound_match':   Game(_grade_sound_match,   PhonemeAttempt,   RECENT_ATTEMPTS, 'response_time', _calc_stats),
+    'word_builder':  Game(_grade_word_builder,  WordBuildAttempt, RECENT_ATTEMPTS, 'response_time', _calc_stats),
+    'sight_word':    Game(_grade_sight_word,    SightWordAttempt, RECENT_ATTEMPTS, 'response_time', _calc_stats),
+    'confusion':     Game(_grade_confusion,     ConfusionAttempt, RECENT_ATTEMPTS, 'response_time', _calc_stats),
+    'syllable':      Game(_grade_syllable,      SyllableAttempt,  RECENT_ATTEMPTS, 'response_time', _calc_stats),
+    'listen_type':   Game(_grade_listen_type,   ListenAttempt,    RECENT_ATTEMPTS, 'response_time', _calc_stats),
+    'story_builder': Game(_grade_story_builder, StoryAttempt,     RECENT_STORIES,  'time_spent',    _story_stats),
+}
+
+
+def grade(user, game_type, data, pool=None):
+    if game_type not in GAMES:
+        raise InvalidAttempt(f'Unknown game: {game_type}')
+    if not isinstance(data, dict):
+        raise InvalidAttempt('Each attempt must be an object')
+    return GAMES[game_type].grader(user, data, pool or get_pool(game_type))
+
+
+# ─── Rolling outcomes ─────────────────────────────────────────────────────────
+
+def _outcome(game, attempt):
+    # Stories are not graded; every finished story counts as correct
+    return Outcome(getattr(attempt, 'is_correct', True), getattr(attempt, game.time_attr))
+
+
+def history_ring(user_id, game_type):
+    """The RecentRing rebuilt from the attempt table (the source of truth)."""
+    game = GAMES[game_type]
+    rows = list(game.model.objects.filter(user_id=user_id)
+                .order_by('-attempted_at', '-pk')[:game.window])
+    rows.reverse()
+    return RecentRing.from_outcomes(game.window, [_outcome(game, row) for row in rows])
+
+
+def progress_ring(progress):
+    """The progress row's ring; rows from before rings existed are seeded once."""
+    game = GAMES[progress.game_type]
+    if not progress.recent_outcomes:
+        return history_ring(progress.user_id, progress.game_type)
+    return RecentRing(game.window, progress.recent_outcomes)
+
+
+# ─── Recording ────────────────────────────────────────────────────────────────
+
+def _record_game(user, game_type, graded):
+    """Write one game's attempts; returns the final rolling accuracy."""
+    game = GAMES[game_type]
+    # Locked until record() commits: a concurrent batch for the same child
+    # (another tab, a queue flush racing a submit) waits rather than
+    # overwriting this one's ring and level
+    prog, _ = UserProgress.objects.select_for_update().get_or_create(user=user, game_type=game_type)
+    level = prog.level
+    # Seeding (first use only) must see the history without this batch
+    ring = progress_ring(prog)
+
+    attempts = [g.attempt for g in graded]
+    game.model.objects.bulk_create(attempts)
+    for attempt in attempts:
+        ring.push(*_outcome(game, attempt))
+        outcomes = ring.outcomes()
+        acc, avg_t = game.stats(outcomes)
+        difficulty.update_progress(prog, outcomes, acc, avg_t, game.window)
+    prog.recent_outcomes = ring.to_bytes()
+    prog.save()
+
+    if game_type in scheduler.GAMES:
+        # Before the sight-word tallies: a new schedule is seeded from them
+        word_attr = scheduler.GAMES[game_type]
+        scheduler.record_answers(
+            user, game_type,
+            [(getattr(a, word_attr), a.is_correct) for a in attempts],
+            pool=get_pool(game_type), level=level)
+
+    if game_type == 'sight_word':
+        per_word = defaultdict(lambda: [0, 0])
+        for attempt in attempts:
+            per_word[attempt.word_id][0] += 1
+            per_word[attempt.word_id][1] += attempt.is_correct
+        UserSightWordProgress.record_many(user, per_word)
+    return acc
+
+
+def record(user, graded_by_game):
+    """
+    Write graded attempts ({game_type: [Graded, ...]}) in one transaction.
+    Returns {game_type: rolling accuracy after the batch}.
+    """
+    accuracy = {}
+    errors = Counter(g.error_type for graded in graded_by_game.values()
+                     for g in graded if g.error_type)
+    with transaction.atomic():
+        for game_type, graded in graded_by_game.items():
+            if graded:
+                accuracy[game_type] = _record_game(user, game_type, graded)
+        UserErrorPattern.log_many(user, errors)
+
+    # Time on task for the dashboard, buffered (see dashboard/activity.py)
+    for game_type, graded in graded_by_game.items():
+        time_attr = GAMES[game_type].time_attr
+        for g in graded:
+            activity.record(user.pk, 'games', getattr(g.attempt, time_attr))
+    return accuracy
+
+
+def submit(user, game_type, data):
+    """Grade and record a single attempt; returns the response payload."""
+    graded = grade(user, game_type, data)
+    accuracy = record(user, {game_type: [graded]})
+    return {**graded.result, 'accuracy': accuracy[game_type]}
+
+
+def submit_batch(user, items):
+    """
+    Grade and record a batch of {"game": ..., **attempt} items in order.
+
+    Invalid items are skipped (their result carries an "error") so one bad
+    answer never loses the rest of a queued batch.
+    """
+    if not isinstance(items, list):
+        raise InvalidAttempt('attempts must be a list')
+    if len(items) > MAX_BATCH:
+        raise InvalidAttempt(f'At most {MAX_BATCH} attempts per batch')
+
+    pools, results = {}, []
+    graded_by_game = defaultdict(list)
+    for item in items:
+        game_type = item.get('game') if isinstance(item, dict) else None
+        try:
+            if game_type in GAMES and game_type not in pools:
+                pools[game_type] = get_pool(game_type)
+            graded = grade(user, game_type, item, pools.get(game_type))
+        except InvalidAttempt as e:
+            results.append({'error': str(e)})
+            continue
+        graded_by_game[game_type].append(graded)
+        results.append(graded.result)
+
+    accuracy = record(user, graded_by_game)
+    return {'results': results, 'accuracy': accuracy}
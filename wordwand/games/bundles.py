@@ -0,0 +1,258 @@
+"""
+Round bundles: a whole game session in one response.
+
+A bundle is the next N rounds of a game for one child — each round with
+everything the page needs to play and grade it locally (shuffled letters
+and options, syllable structure, story hard words, audio URLs), built
+from the in-process content pools. The game page embeds one and the
+client plays through it (static/js/game_rounds.js), fetching the next
+from `games/bundle/<game>/` when it runs out, so a session costs one
+page load plus a batch post every few answers instead of a page render
+and a submit per round.
+
+The next bundle is built ahead of time, once a session is over: the
+batch the client sends when the child leaves the page names the games
+played, and `prepare()` is queued for each on a small per-process thread
+pool (GAMES_BUNDLE_WORKERS), which stores it as the child's RoundBundle
+row for their next visit. Building it any earlier would miss the
+session's answers; a bundle fetched mid-visit is built on the spot.
+`take()` hands out that row and falls back to building inline when there
+is none or it no longer fits — the child's level changed since, game
+content changed (GameContentVersion), or it is over MAX_AGE old, which
+keeps spaced-repetition reviews roughly on time.
+
+Scheduled games take their words in schedule order (scheduler.next_words)
+as of when the bundle is built; answers inside a session reschedule them
+for the next one.
+"""
+
+import datetime
+import logging
+import random
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import IntegrityError, close_old_connections, transaction
+from django.utils import timezone
+
+from . import scheduler
+from .models import GameContentVersion, RoundBundle, UserProgress
+from .pools import get_pool
+
+logger = logging.getLogger(__name__)
+
+# Largest bundle a client may ask for
+MAX_ROUNDS = 50
+
+# Stored bundles older than this are rebuilt
+MAX_AGE = datetime.timedelta(hours=6)
+
+
+def _url(field):
+    return field.url if field else None
+
+
+# ─── Rounds ───────────────────────────────────────────────────────────────────
+# round(item, pool) -> JSON-ready dict; ids are the submit payload's keys.
+# Answers are graded on the page (and re-graded by the batch endpoint).
+
+def _sound_match_round(phoneme, pool):
+    # Only phonemes that have options are pooled
+    options = phoneme.option_list[:]
+    random.shuffle(options)
+    return {
+        'phoneme_id': phoneme.pk,
+        'text':       phoneme.phoneme_text,
+        'audio':      _url(phoneme.sound_file),
+        'options':    [[o.pk, o.letter_option] for o in options],
+        'answer':     next((o.pk for o in options if o.is_correct), None),
+    }
+
+
+def _word_builder_round(word, pool):
+    # Pooled letters are already in position order
+    shuffled = word.letter_list[:]
+    random.shuffle(shuffled)
+    return {
+        'word_id': word.pk,
+        'text':    word.word_text,
+        'audio':   _url(word.audio_file),
+        'image':   _url(word.image_path),
+        'letters': shuffled,
+        'answer':  word.letter_list,
+    }
+
+
+def _sight_word_round(target, pool):
+    options = pool.sample(3, exclude=target) + [target]
+    random.shuffle(options)
+    return {
+        'word_id': target.pk,
+        'word':    target.word,
+        'options': [[o.pk, o.word] for o in options],
+    }
+
+
+def _confusion_round(confusion, pool):
+    options = [confusion.letter_a, confusion.letter_b]
+    random.shuffle(options)
+    return {
+        'confusion_id': confusion.pk,
+        'shown':        random.choice(options),
+        'options':      options,
+    }
+
+
+def _syllable_round(word, pool):
+    return {
+        'word_id': word.pk,
+        'word':    word.word,
+        'audio':   _url(word.audio_file),
+        'answer':  word.syllable_structure,
+    }
+
+
+def _listen_type_round(word, pool):
+    return {
+        'word_id': word.pk,
+        'word':    word.word_text,
+        'audio':   _url(word.audio_file),
+    }
+
+
+def _story_builder_round(story, pool):
+    return {
+        'story_id':    story.pk,
+        'title':       story.title,
+        'content':     story.content,
+        'hard_words':  story.get_hard_words(),
+        'fill_blanks': story.fill_blanks,
+    }
+
+
+ROUNDS = {
+    'sound_match':   _sound_match_round,
+    'word_builder':  _word_builder_round,
+    'sight_word':    _sight_word_round,
+    'confusion':     _confusion_round,
+    'syllable':      _syllable_round,
+    'listen_type':   _listen_type_round,
+    'story_builder': _story_builder_round,
+}
+
+# Games whose content has no levels
+UNLEVELLED = {'confusion'}
+
+
+def _items(user, game_type, pool, level, rounds):
+    items = []
+    if game_type in scheduler.GAMES:
+        items = scheduler.next_words(user, game_type, pool, level, rounds)
+    if len(items) < rounds:
+        extra = pool.pick_many(rounds, None if game_type in UNLEVELLED else level)
+        # Top up with random words, ones not already scheduled first
+        scheduled = {item.pk for item in items}
+        extra.sort(key=lambda item: item.pk in scheduled)
+        items += extra[:rounds - len(items)]
+    return items
+
+
+def build(user, game_type, level, rounds=None):
+    """`rounds` fresh rounds (default GAMES_BUNDLE_ROUNDS) at `level`."""
+    rounds = min(rounds or settings.GAMES_BUNDLE_ROUNDS, MAX_ROUNDS)
+    pool = get_pool(game_type)
+    make = ROUNDS[game_type]
+    return [make(item, pool) for item in _items(user, game_type, pool, level, rounds)]
+
+
+def _payload(game_type, level, rounds):
+    return {'game': game_type, 'level': level, 'rounds': rounds}
+
+
+# ─── Serving ──────────────────────────────────────────────────────────────────
+
+def take(user, game_type, level, rounds=None):
+    """
+    The next bundle for this child — the stored one if it still fits,
+    else built now. A stored bundle is handed out once.
+    """
+    rounds = min(rounds or settings.GAMES_BUNDLE_ROUNDS, MAX_ROUNDS)
+    stored = RoundBundle.objects.filter(user=user, game_type=game_type).first()
+    if stored is not None:
+        RoundBundle.objects.filter(pk=stored.pk).delete()
+        if (stored.level == level
+                and stored.content_version == GameContentVersion.current()
+                and stored.built_at >= timezone.now() - MAX_AGE
+                and len(stored.rounds) >= rounds):
+            return _payload(game_type, level, stored.rounds[:rounds])
+    return _payload(game_type, level, build(user, game_type, level, rounds))
+
+
+# ─── Precomputing ─────────────────────────────────────────────────────────────
+
+def prepare(user_id, game_type):
+    """Build and store a child's next bundle at their current level."""
+    level = (UserProgress.objects.filter(user_id=user_id, game_type=game_type)
+             .values_list('level', flat=True).first() or 1)
+    # Read before building: content changing meanwhile makes it stale, never current
+    fields = {
+        'level':           level,
+        'content_version': GameContentVersion.current(),
+        'rounds':          build(user_id, game_type, level),
+        'built_at':        timezone.now(),
+    }
+    lookup = {'user_id': user_id, 'game_type': game_type}
+    if RoundBundle.objects.filter(**lookup).update(**fields):
+        return
+    try:
+        with transaction.atomic():
+            RoundBundle.objects.create(**lookup, **fields)
+    except IntegrityError:
+        # Another worker stored one first — this one is as new
+        RoundBundle.objects.filter(**lookup).update(**fields)
+
+
+_executor = None
+_executor_lock = threading.Lock()
+# Queued but not yet started; a later request for the same bundle would
+# build the same thing, so it is dropped
+_pending = set()
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.GAMES_BUNDLE_WORKERS,
+                thread_name_prefix='round-bundle',
+            )
+    return _executor
+
+
+def prepare_later(user_id, game_types):
+    """Queue `prepare()` for each game; returns at once."""
+    if settings.GAMES_BUNDLE_WORKERS <= 0:
+        return
+    for game_type in game_types:
+        key = (user_id, game_type)
+        with _executor_lock:
+            if key in _pending:
+                continue
+            _pending.add(key)
+        _get_executor().submit(_run, user_id, game_type)
+
+
+def _run(user_id, game_type):
+    """Runs on a pool thread."""
+    with _executor_lock:
+        _pending.discard((user_id, game_type))
+    close_old_connections()
+    try:
+        prepare(user_id, game_type)
+    except Exception:
+        # The page builds the bundle itself when none is stored
+        logger.exception('Round bundle for user %s, %s failed', user_id, game_type)
+    finally:
+        close_old_connections()
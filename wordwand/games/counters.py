@@ -0,0 +1,76 @@
+"""
+Atomic counter upserts.
+
+Per-user counters (error frequencies, sight-word tallies) used to be
+read-modify-write: get_or_create, `+= 1`, save(). That is two or three
+queries per event and loses increments when two tabs or rapid taps race.
+`increment()` instead issues a single
+
+    INSERT ... VALUES (...), (...)
+    ON CONFLICT (unique fields) DO UPDATE SET n = table.n + EXCLUDED.n
+
+statement, which both SQLite (3.24+) and PostgreSQL execute atomically.
+Other backends fall back to an F() update plus create.
+"""
+
+from django.db import IntegrityError, connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+UPSERT_VENDORS = ('sqlite', 'postgresql')
+
+
+def increment(model, unique_fields, rows, counter_fields, now_fields=()):
+    """
+    Add to counters, creating missing rows.
+
+    `rows` are dicts of field name -> value covering `unique_fields` and
+    `counter_fields` (the amounts to add). `now_fields` are set to the
+    current time on insert and update (auto_now fields are not applied by
+    raw SQL). Rows must be unique on `unique_fields` — aggregate first.
+    """
+    if not rows:
+        return
+    now = timezone.now()
+    fields = [model._meta.get_field(name) for name in
+              [*unique_fields, *counter_fields, *now_fields]]
+    values = [[*(row[name] for name in [*unique_fields, *counter_fields]),
+               *(now for _ in now_fields)] for row in rows]
+
+    if connection.vendor not in UPSERT_VENDORS:
+        _increment_fallback(model, unique_fields, counter_fields, now_fields, fields, values)
+        return
+
+    qn = connection.ops.quote_name
+    table = qn(model._meta.db_table)
+    columns = [qn(f.column) for f in fields]
+    conflict = [qn(model._meta.get_field(name).column) for name in unique_fields]
+    updates = [f'{qn(f.column)} = {table}.{qn(f.column)} + EXCLUDED.{qn(f.column)}'
+               for f in fields[len(unique_fields):len(unique_fields) + len(counter_fields)]]
+    updates += [f'{qn(f.column)} = EXCLUDED.{qn(f.column)}'
+                for f in fields[len(unique_fields) + len(counter_fields):]]
+    placeholders = ', '.join(['(' + ', '.join(['%s'] * len(fields)) + ')'] * len(values))
+
+    sql = (f'INSERT INTO {table} ({", ".join(columns)}) VALUES {placeholders} '
+           f'ON CONFLICT ({", ".join(conflict)}) DO UPDATE SET {", ".join(updates)}')
+    params = [f.get_db_prep_value(v, connection) for row in values
+              for f, v in zip(fields, row)]
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+
+
+def _increment_fallback(model, unique_fields, counter_fields, now_fields, fields, values):
+    attname = {f.name: f.attname for f in fields}
+    for row in values:
+        data = {f.attname: v for f, v in zip(fields, row)}
+        lookup = {attname[name]: data[attname[name]] for name in unique_fields}
+        changes = {name: F(name) + data[attname[name]] for name in counter_fields}
+        changes.update({name: data[attname[name]] for name in now_fields})
+        if model.objects.filter(**lookup).update(**changes):
+            continue
+        try:
+            with transaction.atomic():
+                model.objects.create(**data)
+        except IntegrityError:
+            # Lost the race to create it — the row exists now
+            model.objects.filter(**lookup).update(**changes)
@@ -0,0 +1,378 @@
+"""
+Trained adaptive-difficulty model.
+
+UserProgress.update_after_session moves levels with fixed thresholds on
+the rolling accuracy. `python manage.py train_difficulty_model` instead
+fits, per graded game, a logistic model of "will the child answer the
+next item correctly" from the attempt history, and the level follows that
+predicted skill.
+
+Training exports each attempt table into columnar NumPy arrays (sorted by
+user, then time) and computes every feature with cumulative sums — no
+per-row queries. The fitted scaler and regression are fused into one
+weight vector and saved with joblib (settings.GAMES_DIFFICULTY_MODEL), so
+workers load plain arrays once and need neither scikit-learn nor the
+database to predict: a dot product and a sigmoid per attempt.
+
+Features describe the child's state after an attempt and are built from
+exactly what `_record_game` has at hand — the RecentRing outcomes and the
+progress row's EMA accuracy:
+
+  recent_accuracy   correct fraction of the rolling window
+  last3_accuracy    correct fraction of the last three answers
+  log_seconds       mean log(1 + seconds) over the window
+  window_fill       answers in the window / window size
+  ema_accuracy      UserProgress.accuracy / 100
+
+Games without a trained model (stories, or no model file) keep the EMA
+rule.
+"""
+
+import logging
+import math
+import os
+import tempfile
+import threading
+import time
+
+import numpy as np
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+FORMAT_VERSION = 1
+FEATURES = ('recent_accuracy', 'last3_accuracy', 'log_seconds', 'window_fill', 'ema_accuracy')
+LAST_N = 3
+
+# Level bounds, as in UserProgress.update_after_session
+MIN_LEVEL, MAX_LEVEL = 1, 4
+
+# Defaults for the level rule on predicted skill (same shape as the EMA rule)
+LEVEL_UP_SKILL = 0.85
+LEVEL_DOWN_SKILL = 0.60
+LEVEL_UP_STREAK = 3
+
+# Games with fewer (attempt, next answer) pairs than this are not trained
+MIN_TRAINING_ROWS = 200
+
+# Untrained estimates are clipped away from 0/1 before scoring log loss
+_EPS = 0.01
+
+
+# ─── Policy ───────────────────────────────────────────────────────────────────
+
+class Policy:
+    """One game's fused model plus the level rule applied to its prediction."""
+
+    def __init__(self, weights, bias, up=LEVEL_UP_SKILL, down=LEVEL_DOWN_SKILL,
+                 streak=LEVEL_UP_STREAK):
+        self.weights = np.asarray(weights, dtype=np.float64)
+        self.bias = float(bias)
+        self.up, self.down, self.streak = up, down, streak
+
+    def predict(self, X):
+        """Probability of a correct next answer, for one feature row or a matrix."""
+        return 1.0 / (1.0 + np.exp(-(np.asarray(X) @ self.weights + self.bias)))
+
+    def step(self, prog, skill):
+        if skill >= self.up:
+            prog.sessions_at_level += 1
+            if prog.sessions_at_level >= self.streak:
+                prog.level = min(prog.level + 1, MAX_LEVEL)
+                prog.sessions_at_level = 0
+        elif skill < self.down:
+            prog.level = max(prog.level - 1, MIN_LEVEL)
+            prog.sessions_at_level = 0
+        else:
+            prog.sessions_at_level = 0
+
+
+def features(outcomes, ema_accuracy, window):
+    """The feature row for a child's state: ring outcomes and EMA accuracy in %."""
+    correct = [o.is_correct for o in outcomes]
+    last = correct[-LAST_N:]
+    # A handful of values: plain floats are cheaper than NumPy calls here
+    log_seconds = sum(math.log1p(max(o.seconds, 0.0)) for o in outcomes) / len(outcomes)
+    return np.array([
+        sum(correct) / len(correct),
+        sum(last) / len(last),
+        log_seconds,
+        len(correct) / window,
+        ema_accuracy / 100,
+    ])
+
+
+def policies_from_bundle(bundle):
+    if bundle.get('version') != FORMAT_VERSION or tuple(bundle.get('features', ())) != FEATURES:
+        raise ValueError('Difficulty model was trained with different features; retrain it')
+    return {
+        game_type: Policy(entry['weights'], entry['bias'],
+                          bundle['up'], bundle['down'], bundle['streak'])
+        for game_type, entry in bundle['games'].items()
+    }
+
+
+_policies = None
+_policies_lock = threading.Lock()
+
+
+def get_policy(game_type):
+    """The installed model's policy for a game, or None (use the EMA rule)."""
+    global _policies
+    if _policies is None:
+        with _policies_lock:
+            if _policies is None:
+                _policies = _load_policies(settings.GAMES_DIFFICULTY_MODEL)
+    return _policies.get(game_type)
+
+
+def _load_policies(path):
+    if not os.path.exists(path):
+        logger.info('No difficulty model at %s; using the EMA level rule', path)
+        return {}
+    import joblib
+    try:
+        return policies_from_bundle(joblib.load(path))
+    except (ValueError, KeyError, OSError) as e:
+        logger.warning('Ignoring difficulty model %s: %s', path, e)
+        return {}
+
+
+def update_progress(prog, outcomes, session_accuracy, session_avg_time, window):
+    """Advance a progress row by one attempt (no save)."""
+    policy = get_policy(prog.game_type)
+    if policy is None:
+        prog.update_after_session(session_accuracy, session_avg_time, save=False)
+        return
+    prog.update_averages(session_accuracy, session_avg_time)
+    policy.step(prog, float(policy.predict(features(outcomes, prog.accuracy, window))))
+
+
+# ─── Columnar history ─────────────────────────────────────────────────────────
+
+COLUMNS = np.dtype([('user', 'i8'), ('at', 'f8'), ('correct', '?'), ('seconds', 'f8')])
+
+
+def load_columns(game_type, chunk_size=5000):
+    """One game's attempts as {column: array}, sorted by user, then time."""
+    from .attempts import GAMES
+
+    game = GAMES[game_type]
+    rows = (game.model.objects.order_by('user_id', 'attempted_at', 'pk')
+            .values_list('user_id', 'attempted_at', 'is_correct', game.time_attr))
+    data = np.fromiter(
+        ((user, at.timestamp(), correct, seconds or 0.0)
+         for user, at, correct, seconds in rows.iterator(chunk_size=chunk_size)),
+        dtype=COLUMNS)
+    return {name: np.ascontiguousarray(data[name]) for name in COLUMNS.names}
+
+
+def select_users(cols, users):
+    keep = np.isin(cols['user'], users)
+    return {name: column[keep] for name, column in cols.items()}
+
+
+def _rolling(values, group_start, end, size):
+    """Mean and count of values[max(group_start, end - size):end] for every row."""
+    totals = np.concatenate(([0], np.cumsum(values)))
+    lo = np.maximum(group_start, end - size)
+    return (totals[end] - totals[lo]) / (end - lo), end - lo
+
+
+def window_features(cols, window):
+    """
+    Feature rows for the state after each attempt, plus per-row session
+    accuracy / time as `_calc_stats` reports them. The EMA column is left
+    at zero: it depends on the order of updates (see `_replay_ema`).
+    """
+    users = cols['user']
+    n = len(users)
+    first = np.ones(n, dtype=bool)
+    first[1:] = users[1:] != users[:-1]
+    starts = np.flatnonzero(first)
+    group_start = np.repeat(starts, np.diff(np.append(starts, n)))
+    end = np.arange(1, n + 1)
+
+    correct = cols['correct'].astype(np.int64)
+    acc, count = _rolling(correct, group_start, end, window)
+    last, _ = _rolling(correct, group_start, end, LAST_N)
+    log_seconds, _ = _rolling(np.log1p(np.maximum(cols['seconds'], 0.0)), group_start, end, window)
+    avg_seconds, _ = _rolling(cols['seconds'], group_start, end, window)
+
+    X = np.column_stack([acc, last, log_seconds, count / window, np.zeros(n)])
+    return X, first, np.round(acc * 100, 1), np.round(avg_seconds, 2)
+
+
+def _replay_ema(first, session_acc):
+    """UserProgress.accuracy after each attempt, rounded exactly as update_averages does."""
+    ema = np.empty(len(first))
+    value = 0.0
+    for i, (new_user, acc) in enumerate(zip(first.tolist(), session_acc.tolist())):
+        if new_user:
+            value = 0.0
+        value = round(0.70 * value + 0.30 * acc, 2)
+        ema[i] = value
+    return ema
+
+
+def dataset(cols, window):
+    """(X, y, users): the state after each attempt -> whether the next answer was correct."""
+    X, first, session_acc, _ = window_features(cols, window)
+    X[:, 4] = _replay_ema(first, session_acc) / 100
+    # Shifted by one within each child; sized to the rows, so a game with
+    # no attempts yet gives empty arrays
+    has_next = np.zeros(len(first), dtype=bool)
+    has_next[:-1] = ~first[1:]
+    y = np.zeros(len(first), dtype=bool)
+    y[:-1] = cols['correct'][1:]
+    return X[has_next], y[has_next], cols['user'][has_next]
+
+
+# ─── Training ─────────────────────────────────────────────────────────────────
+
+def train(game_types=None, holdout=0.2, seed=0, up=LEVEL_UP_SKILL,
+          down=LEVEL_DOWN_SKILL, streak=LEVEL_UP_STREAK, log=None):
+    """
+    Fit one model per graded game on all but a `holdout` share of children.
+    Returns (bundle, {game_type: held-out columns}) — the bundle is what
+    `save()` writes; the columns are for `backtest()`.
+    """
+    from sklearn.linear_model import LogisticRegression
+    from sklearn.model_selection import GroupShuffleSplit
+    from sklearn.pipeline import make_pipeline
+    from sklearn.preprocessing import StandardScaler
+
+    from .attempts import GAMES
+
+    log = log or (lambda message: None)
+    bundle = {'version': FORMAT_VERSION, 'features': FEATURES, 'games': {},
+              'up': up, 'down': down, 'streak': streak, 'trained_at': time.time()}
+    held_out = {}
+    for game_type in game_types or graded_games():
+        window = GAMES[game_type].window
+        cols = load_columns(game_type)
+        X, y, users = dataset(cols, window)
+        if len(y) < MIN_TRAINING_ROWS or len(np.unique(y)) < 2 or len(np.unique(users)) < 2:
+            log(f'{game_type}: {len(y)} rows — not enough history, keeping the EMA rule')
+            continue
+
+        split = GroupShuffleSplit(n_splits=1, test_size=holdout, random_state=seed)
+        train_rows, test_rows = next(split.split(X, y, users))
+        model = make_pipeline(StandardScaler(), LogisticRegression(max_iter=1000))
+        model.fit(X[train_rows], y[train_rows])
+
+        scaler, regression = model[0], model[1]
+        coef = regression.coef_[0] / scaler.scale_
+        bias = regression.intercept_[0] - coef @ scaler.mean_
+        bundle['games'][game_type] = {
+            'weights': coef, 'bias': float(bias), 'rows': int(len(train_rows)),
+        }
+        held_out[game_type] = select_users(cols, np.unique(users[test_rows]))
+        log(f'{game_type}: trained on {len(train_rows)} rows, '
+            f'{len(np.unique(users[test_rows]))} children held out')
+    return bundle, held_out
+
+
+def graded_games():
+    from .attempts import GAMES
+    return [game_type for game_type, game in GAMES.items()
+            if any(f.name == 'is_correct' for f in game.model._meta.fields)]
+
+
+def save(bundle, path=None):
+    """Write the model atomically, so running workers never read half a file."""
+    import joblib
+
+    path = path or settings.GAMES_DIFFICULTY_MODEL
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.part')
+    os.close(fd)
+    try:
+        joblib.dump(bundle, tmp_path)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def load_bundle(path=None):
+    import joblib
+    return joblib.load(path or settings.GAMES_DIFFICULTY_MODEL)
+
+
+# ─── Backtest ─────────────────────────────────────────────────────────────────
+
+def _scores(y, p):
+    from sklearn.metrics import brier_score_loss, log_loss, roc_auc_score
+
+    p = np.clip(p, _EPS, 1 - _EPS)
+    auc = roc_auc_score(y, p) if len(np.unique(y)) == 2 else float('nan')
+    return {'log_loss': log_loss(y, p, labels=[False, True]),
+            'brier': brier_score_loss(y, p), 'auc': auc}
+
+
+def _replay_levels(first, step):
+    """Run a level rule over every attempt; returns (seconds, level changes, final levels)."""
+    from .models import UserProgress
+
+    changes, finals, prog = 0, [], None
+    start = time.perf_counter()
+    for i, new_user in enumerate(first.tolist()):
+        if new_user:
+            if prog is not None:
+                finals.append(prog.level)
+            prog = UserProgress()
+        before = prog.level
+        step(prog, i)
+        changes += prog.level != before
+    elapsed = time.perf_counter() - start
+    if prog is not None:
+        finals.append(prog.level)
+    return elapsed, changes, finals
+
+
+def backtest(cols, window, policy):
+    """
+    Replay one game's attempts through the EMA rule and through `policy`,
+    as `_record_game` would, one attempt at a time. Reports per-attempt
+    cost, batch inference throughput, how well each rule's skill estimate
+    (EMA accuracy vs model probability) predicts the next answer, and how
+    often each moved the level.
+    """
+    X, first, session_acc, session_time = window_features(cols, window)
+    X[:, 4] = _replay_ema(first, session_acc) / 100
+    n = len(first)
+    report = {'attempts': n, 'children': int(first.sum())}
+    if not n:
+        return report
+
+    acc_list, time_list = session_acc.tolist(), session_time.tolist()
+
+    def old_rule(prog, i):
+        prog.update_after_session(acc_list[i], time_list[i], save=False)
+
+    def new_rule(prog, i):
+        prog.update_averages(acc_list[i], time_list[i])
+        policy.step(prog, float(policy.predict(X[i])))
+
+    old_seconds, old_changes, old_levels = _replay_levels(first, old_rule)
+    new_seconds, new_changes, new_levels = _replay_levels(first, new_rule)
+
+    start = time.perf_counter()
+    p = policy.predict(X)
+    batch_seconds = time.perf_counter() - start
+
+    has_next = np.append(~first[1:], False)
+    y = np.append(cols['correct'][1:], False)[has_next]
+    report.update({
+        'old_us': old_seconds / n * 1e6,
+        'new_us': new_seconds / n * 1e6,
+        'batch_per_s': n / batch_seconds if batch_seconds else float('inf'),
+        'old_changes': old_changes, 'new_changes': new_changes,
+        'old_level': float(np.mean(old_levels)), 'new_level': float(np.mean(new_levels)),
+    })
+    if len(y):
+        report['old_scores'] = _scores(y, X[has_next, 4])
+        report['new_scores'] = _scores(y, p[has_next])
+    return report
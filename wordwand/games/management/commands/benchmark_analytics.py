@@ -0,0 +1,87 @@
+"""
+Management command: python manage.py benchmark_analytics [--children N] [--days N] [--per-day N]
+
+Writes a synthetic attempt log (games/analytics.py) for a school — by
+default 2,000 children playing for a year, ~20 answers a day spread over
+the games — to a temporary directory, then times the teacher reports
+over it:
+
+  class    class_report for every child, the whole year
+  user     user_report for one child
+  items    item_report of the sight-word game for every child
+
+The log is written through AttemptLog.append, so the write path is timed
+too. Nothing touches the database or the real log directory.
+"""
+
+import datetime
+import shutil
+import tempfile
+import time
+
+import numpy as np
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = 'Benchmarks the columnar attempt log reports (see module docstring)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--children', type=int, default=2000)
+        parser.add_argument('--days', type=int, default=365)
+        parser.add_argument('--per-day', type=int, default=20,
+                            help='Answers per child per day, over all games')
+        parser.add_argument('--items', type=int, default=500,
+                            help='Distinct words / phonemes per game')
+        parser.add_argument('--seed', type=int, default=1)
+        parser.add_argument('--keep', action='store_true',
+                            help='Print and keep the generated log directory')
+
+    def handle(self, *args, **options):
+        from games.analytics import SOURCES, AttemptLog, class_report, item_report, user_report
+
+        rng = np.random.default_rng(options['seed'])
+        children, per_day = options['children'], options['per_day']
+        games = list(SOURCES)
+        root = tempfile.mkdtemp(prefix='attempt_log_')
+        log = AttemptLog(root)
+        try:
+            first_day = datetime.date.today() - datetime.timedelta(days=options['days'])
+            skill = rng.uniform(0.4, 0.95, children)
+            next_id, rows = 1, 0
+            start = time.perf_counter()
+            for offset in range(options['days']):
+                day = first_day + datetime.timedelta(days=offset)
+                n = children * per_day // len(games)
+                midnight = int(datetime.datetime.combine(day, datetime.time()).timestamp())
+                for game_type in games:
+                    users = rng.integers(0, children, n)
+                    log.append(game_type, {
+                        'id': np.arange(next_id, next_id + n),
+                        'user': users + 1,
+                        'item': rng.integers(1, options['items'] + 1, n),
+                        'at': np.sort(midnight + rng.integers(0, 86400, n)),
+                        'correct': rng.random(n) < skill[users],
+                        'seconds': rng.gamma(2.0, 2.0, n),
+                    }, [day] * n)
+                    next_id += n
+                    rows += n
+            write = time.perf_counter() - start
+            self.stdout.write(f'{rows:,} attempts, {children:,} children, {options["days"]} days '
+                              f'written in {write:.1f}s')
+
+            everyone = np.arange(1, children + 1)
+            for label, report in (
+                ('class', lambda: class_report(everyone, log=log)),
+                ('user', lambda: user_report(1, log=log)),
+                ('items', lambda: item_report('sight_word', everyone, log=log)),
+            ):
+                report()  # first run pages the files in
+                start = time.perf_counter()
+                report()
+                self.stdout.write(f'  {label:<6} {time.perf_counter() - start:>8.3f}s')
+        finally:
+            if options['keep']:
+                self.stdout.write(f'Log kept at {root}')
+            else:
+                shutil.rmtree(root, ignore_errors=True)
@@ -0,0 +1,141 @@
+"""
+Management command: python manage.py benchmark_attempt_indexes [--rows N] [--users N] [--samples N]
+
+Measures what the (user, attempted_at) index buys the attempt tables. A
+throwaway copy of the sight-word attempt table (same columns, no foreign
+key constraints) is created in the configured database and filled with
+--rows attempts (default 10M) spread over --users children. The
+per-submit queries are timed with the old schema — a user-only foreign
+key index ("before") — and again with the composite index replacing it
+("after"):
+
+  insert    record one attempt
+  recent    a child's latest attempts, newest first (ring seeding,
+            rebuild_progress_stats)
+  daily     a child's per-day totals (retention.history)
+
+The table is dropped afterwards, even on failure.
+"""
+
+import datetime
+import random
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, models, transaction
+from django.db.models import Count
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+TABLE = 'games_benchmark_attempt'
+
+
+def _benchmark_model():
+    """The table as it was before: no composite index, user foreign key indexed."""
+    from games.models import SightWordAttempt
+
+    attrs = {'__module__': __name__}
+    for field in SightWordAttempt._meta.local_fields:
+        name, path, args, kwargs = field.deconstruct()
+        if isinstance(field, models.ForeignKey):
+            kwargs.update(db_constraint=False, related_name='+', db_index=True)
+        attrs[name] = type(field)(*args, **kwargs)
+    attrs['Meta'] = type('Meta', (), {'app_label': 'games', 'db_table': TABLE})
+    return type('BenchmarkAttempt', (models.Model,), attrs)
+
+
+def _migrate_to_current(editor, model):
+    """Apply what migration 0005 does to the attempt tables."""
+    from games.models import user_history_index
+
+    editor.add_index(model, user_history_index('games_bench_user_at_idx'))
+    with connection.cursor() as cursor:
+        constraints = connection.introspection.get_constraints(cursor, TABLE)
+    column = model._meta.get_field('user').column
+    for name, info in constraints.items():
+        if info['index'] and info['columns'] == [column]:
+            editor.execute(editor._delete_index_sql(model, name))
+
+
+def _percentiles(samples):
+    samples = sorted(samples)
+    return (samples[len(samples) // 2] * 1000,
+            samples[min(len(samples) - 1, int(len(samples) * 0.95))] * 1000)
+
+
+class Command(BaseCommand):
+    help = 'Benchmarks per-submit attempt queries with and without the composite index'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=10_000_000)
+        parser.add_argument('--users', type=int, default=20_000)
+        parser.add_argument('--samples', type=int, default=300,
+                            help='Timed runs of each query, per phase')
+        parser.add_argument('--seed', type=int, default=1)
+
+    def handle(self, *args, **options):
+        model = _benchmark_model()
+        rng = random.Random(options['seed'])
+        with connection.schema_editor() as editor:
+            editor.create_model(model)
+        try:
+            start = time.perf_counter()
+            self._fill(model, options['rows'], options['users'], rng)
+            self.stdout.write(f'{options["rows"]:,} attempts over {options["users"]:,} children '
+                              f'loaded in {time.perf_counter() - start:.0f}s')
+
+            before = self._time(model, options, rng)
+            start = time.perf_counter()
+            with connection.schema_editor() as editor:
+                _migrate_to_current(editor, model)
+            self.stdout.write(f'indexes migrated in {time.perf_counter() - start:.1f}s')
+            after = self._time(model, options, rng)
+
+            self.stdout.write(f'{"query":<8} {"before p50/p95 ms":>20} {"after p50/p95 ms":>20}')
+            for name in before:
+                b50, b95 = _percentiles(before[name])
+                a50, a95 = _percentiles(after[name])
+                self.stdout.write(f'{name:<8} {b50:>9.3f} / {b95:<8.3f} {a50:>9.3f} / {a95:<8.3f}')
+        finally:
+            with connection.schema_editor() as editor:
+                editor.delete_model(model)
+
+    def _fill(self, model, rows, users, rng, chunk=50_000):
+        fields = [model._meta.get_field(name) for name in
+                  ('user', 'word', 'is_correct', 'response_time', 'attempted_at')]
+        qn = connection.ops.quote_name
+        sql = (f'INSERT INTO {qn(TABLE)} ({", ".join(qn(f.column) for f in fields)}) '
+               f'VALUES ({", ".join(["%s"] * len(fields))})')
+        # A term of history, oldest first, as the real table grows
+        first = timezone.now() - datetime.timedelta(days=120)
+        step = datetime.timedelta(days=120) / max(rows, 1)
+        adapt = connection.ops.adapt_datetimefield_value
+        with connection.cursor() as cursor:
+            for lo in range(0, rows, chunk):
+                with transaction.atomic():
+                    cursor.executemany(sql, [
+                        (rng.randrange(1, users + 1), rng.randrange(1, 300), rng.random() < 0.7,
+                         rng.uniform(0.5, 8), adapt(first + step * i))
+                        for i in range(lo, min(rows, lo + chunk))
+                    ])
+
+    def _time(self, model, options, rng):
+        timings = {'insert': [], 'recent': [], 'daily': []}
+        for _ in range(options['samples']):
+            user_id = rng.randrange(1, options['users'] + 1)
+
+            start = time.perf_counter()
+            with transaction.atomic():
+                model.objects.create(user_id=user_id, word_id=1, is_correct=True, response_time=1.0)
+            timings['insert'].append(time.perf_counter() - start)
+
+            start = time.perf_counter()
+            list(model.objects.filter(user_id=user_id).order_by('-attempted_at', '-pk')
+                 .values_list('is_correct', 'response_time')[:10])
+            timings['recent'].append(time.perf_counter() - start)
+
+            start = time.perf_counter()
+            list(model.objects.filter(user_id=user_id).annotate(day=TruncDate('attempted_at'))
+                 .values('day').annotate(n=Count('pk')))
+            timings['daily'].append(time.perf_counter() - start)
+        return timings
@@ -0,0 +1,82 @@
+"""
+Management command: python manage.py benchmark_scheduler [--sizes 1000,10000,...] [--picks N]
+
+Simulates a child's spaced-repetition queue (games/scheduler.py) at
+growing vocabulary sizes and reports, per size:
+
+  bytes    size of the packed WordSchedule.queue value
+  bundle   a full bundle's words (games.bundles.MAX_ROUNDS) from the
+           stored bytes, via upcoming() — what building a bundle does
+  scan     the soonest-due words found by scanning every word's due time
+  answer   apply one answer and re-pack (what a submission does)
+
+`bundle` grows only with the heap copy, far slower than `scan`.
+No database access: queues are built in memory from simulated answers.
+"""
+
+import heapq
+import random
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+
+def _sizes(value):
+    try:
+        return [int(n) for n in value.split(',') if n.strip()]
+    except ValueError:
+        raise CommandError(f'Invalid size list: {value!r}')
+
+
+class Command(BaseCommand):
+    help = 'Benchmarks spaced-repetition word selection (see module docstring)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=_sizes, default=[1000, 10000, 50000, 100000],
+                            help='Comma-separated vocabulary sizes')
+        parser.add_argument('--picks', type=int, default=2000,
+                            help='Selections timed per size')
+        parser.add_argument('--seed', type=int, default=1)
+
+    def handle(self, *args, **options):
+        from games.bundles import MAX_ROUNDS
+        from games.scheduler import INTERVALS, WordQueue
+
+        rng = random.Random(options['seed'])
+        picks = options['picks']
+        self.stdout.write(f'{"words":>8} {"bytes":>10} {"bundle µs":>10} {"scan µs":>9} {"answer µs":>10}')
+
+        for n in options['sizes']:
+            # A child who has met every word over ~60 days of play
+            start = 1_700_000_000
+            ids = list(range(1, n + 1))
+            queue = WordQueue()
+            for word_id in ids:
+                queue.set(word_id, rng.randrange(len(INTERVALS)),
+                          start + rng.randrange(60 * 86400))
+            data = queue.to_bytes()
+            level_ids = ids[: n // 4]
+            nows = [start + rng.randrange(60 * 86400) for _ in range(picks)]
+
+            t0 = time.perf_counter()
+            for now in nows:
+                WordQueue.from_bytes(data).upcoming(now, level_ids, k=MAX_ROUNDS)
+            bundle = (time.perf_counter() - t0) / picks * 1e6
+
+            # Baseline: find the most overdue words by looking at all of them
+            dues = list(queue.dues)
+            scans = max(1, picks // 20)
+            t0 = time.perf_counter()
+            for now in nows[:scans]:
+                heapq.nsmallest(MAX_ROUNDS, range(n), key=dues.__getitem__)
+            scan = (time.perf_counter() - t0) / scans * 1e6
+
+            answers = max(1, picks // 20)
+            t0 = time.perf_counter()
+            for now in nows[:answers]:
+                q = WordQueue.from_bytes(data)
+                q.answer(rng.choice(ids), rng.random() < 0.8, now)
+                q.to_bytes()
+            answer = (time.perf_counter() - t0) / answers * 1e6
+
+            self.stdout.write(f'{n:>8} {len(data):>10} {bundle:>10.1f} {scan:>9.1f} {answer:>10.1f}')
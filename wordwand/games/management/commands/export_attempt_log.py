@@ -0,0 +1,59 @@
+"""
+Management command: python manage.py export_attempt_log [--rebuild [--force]] [--game GAME ...]
+
+Appends attempts recorded since the last run to the columnar attempt log
+read by the teacher reports (games/analytics.py, under
+settings.GAMES_ATTEMPT_LOG_DIR). Each game resumes from its high-water
+mark, so the command is cheap to run from cron every few minutes; do not
+run two exports at once.
+
+--rebuild discards the game's log and exports the attempt table again,
+for attempts edited after export. The table no longer holds what
+`rollup_attempts` pruned, so a game with rollups would lose that history
+from the log for good: --rebuild refuses such games unless --force is
+given too.
+"""
+
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = 'Appends new game attempts to the columnar attempt log'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rebuild', action='store_true',
+                            help='Discard the exported log and export everything again')
+        parser.add_argument('--force', action='store_true',
+                            help='With --rebuild: also rebuild games whose old attempts were rolled up')
+        parser.add_argument('--game', action='append', default=None,
+                            help='Limit to a game type (repeatable)')
+
+    def handle(self, *args, **options):
+        from games.analytics import SOURCES, AttemptLog, export
+        from games.models import AttemptRollup
+
+        games = options['game'] or list(SOURCES)
+        unknown = set(games) - set(SOURCES)
+        if unknown:
+            raise CommandError(f'Unknown game: {", ".join(sorted(unknown))}')
+        if options['rebuild'] and not options['force']:
+            pruned = sorted(set(AttemptRollup.objects.filter(game_type__in=games)
+                                .values_list('game_type', flat=True).distinct()))
+            if pruned:
+                raise CommandError(
+                    f'Not rebuilding {", ".join(pruned)}: attempts rolled up by rollup_attempts '
+                    f'are no longer in the database and would drop out of the log. '
+                    f'Use --game to rebuild other games, or --force to rebuild anyway.')
+
+        log = AttemptLog()
+        total, start = 0, time.perf_counter()
+        for game_type in games:
+            if options['rebuild']:
+                log.clear(game_type)
+            added = export(game_type, log)
+            total += added
+            self.stdout.write(f'  {game_type:<14} +{added:<8} (up to id {log.high_water_mark(game_type)})')
+        self.stdout.write(self.style.SUCCESS(
+            f'✅  {total} attempts exported to {log.root} ({time.perf_counter() - start:.1f}s)'))
@@ -0,0 +1,59 @@
+"""
+Management command: python manage.py rebuild_progress_stats [--verify] [--user USERNAME]
+
+UserProgress.recent_outcomes keeps each game's latest outcomes as a packed
+ring buffer (games/ring.py) so recording an attempt never re-reads the
+attempt table. The attempt tables remain the source of truth; this command
+rebuilds every ring from them, or with --verify only checks that the
+stored rings match and exits non-zero if any do not.
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds (or verifies) the rolling game stats on UserProgress'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--verify', action='store_true',
+                            help='Only compare stored rings with attempt history')
+        parser.add_argument('--user', default=None,
+                            help='Limit to one username')
+
+    def handle(self, *args, **options):
+        from games.attempts import GAMES, history_ring
+        from games.models import UserProgress
+        from games.ring import RecentRing
+
+        rows = UserProgress.objects.filter(game_type__in=GAMES).order_by('user_id', 'game_type')
+        if options['user']:
+            rows = rows.filter(user__username=options['user'])
+
+        checked = unseeded = mismatched = 0
+        for prog in rows.only('pk', 'user_id', 'game_type', 'recent_outcomes').iterator():
+            checked += 1
+            expected = history_ring(prog.user_id, prog.game_type)
+            if not prog.recent_outcomes:
+                unseeded += 1
+            else:
+                stored = RecentRing(GAMES[prog.game_type].window, prog.recent_outcomes)
+                if stored.outcomes() == expected.outcomes():
+                    continue
+                mismatched += 1
+                self.stdout.write(self.style.WARNING(
+                    f'  user {prog.user_id} {prog.game_type}: stored '
+                    f'{len(stored)} outcomes do not match history ({len(expected)})'))
+
+            if not options['verify']:
+                UserProgress.objects.filter(pk=prog.pk).update(
+                    recent_outcomes=expected.to_bytes())
+
+        summary = (f'{checked} progress rows: {mismatched} mismatched, '
+                   f'{unseeded} not yet seeded')
+        if options['verify']:
+            if mismatched:
+                raise CommandError(summary)
+            self.stdout.write(self.style.SUCCESS(f'✅  {summary}'))
+        else:
+            self.stdout.write(self.style.SUCCESS(
+                f'✅  {summary} — {mismatched + unseeded} rebuilt'))
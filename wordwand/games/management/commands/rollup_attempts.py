@@ -0,0 +1,54 @@
+"""
+Management command: python manage.py rollup_attempts [--days N] [--batch-size N] [--dry-run] [--game GAME ...]
+
+Folds game attempts older than --days (default
+settings.GAMES_ATTEMPT_RETENTION_DAYS) into daily AttemptRollup rows and
+deletes them in batched transactions (games/retention.py). Each child's
+latest attempts, and attempts the attempt log has not exported yet, are
+kept. Safe to interrupt and re-run; schedule it nightly.
+"""
+
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = 'Rolls up and prunes old game attempts'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=None,
+                            help='Keep raw attempts from the last N days')
+        parser.add_argument('--batch-size', type=int, default=None,
+                            help='Attempts per delete transaction')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Only count what would be rolled up')
+        parser.add_argument('--game', action='append', default=None,
+                            help='Limit to a game type (repeatable)')
+
+    def handle(self, *args, **options):
+        from games.attempts import GAMES
+        from games.retention import BATCH_SIZE, cutoff_for, export_limit, rollup_game
+
+        days = settings.GAMES_ATTEMPT_RETENTION_DAYS if options['days'] is None else options['days']
+        if days < 1:
+            raise CommandError('--days must be at least 1')
+        games = options['game'] or list(GAMES)
+        unknown = set(games) - set(GAMES)
+        if unknown:
+            raise CommandError(f'Unknown game: {", ".join(sorted(unknown))}')
+
+        cutoff = cutoff_for(days)
+        total, start = 0, time.perf_counter()
+        for game_type in games:
+            rolled, kept = rollup_game(
+                game_type, cutoff, batch_size=options['batch_size'] or BATCH_SIZE,
+                max_pk=export_limit(game_type), dry_run=options['dry_run'])
+            total += rolled
+            self.stdout.write(f'  {game_type:<14} {rolled:>9} rolled up, {kept} kept as latest')
+
+        verb = 'would be rolled up' if options['dry_run'] else 'rolled up and pruned'
+        self.stdout.write(self.style.SUCCESS(
+            f'✅  {total} attempts before {cutoff:%Y-%m-%d} {verb} '
+            f'({time.perf_counter() - start:.1f}s)'))
@@ -7,16 +7,19 @@ Creates all the starter content needed for every WordWand game to work:
   - SightWords                 (Sight Word Tap)
   - ConfusionSets              (Letter Fix)
   - SyllableWords              (Syllable Breaker)
-  - ListenWords                (Listen & Type)  — audio via TTS placeholder
+  - ListenWords                (Listen & Type)  — audio via tts_engine.backends
   - Stories                    (Story Builder)
 
 Place this file at:
   your_app/management/commands/seed_game_data.py
 
 Then run:
-  python manage.py seed_game_data
+  python manage.py seed_game_data [--no-audio]
 """
 
+import os
+
+from django.conf import settings
 from django.core.management.base import BaseCommand
 from django.db import transaction
 
@@ -24,14 +27,23 @@ from django.db import transaction
 class Command(BaseCommand):
     help = 'Seeds all WordWand games with starter content'
 
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--no-audio', action='store_true',
+            help='Do not synthesise missing word audio (paths are still set)')
+
     def handle(self, *args, **options):
+        self.generate_audio = not options['no_audio']
+        # Before the transaction: synthesis is network I/O, and the write
+        # lock (transaction_mode IMMEDIATE) must not be held through it
+        listen_audio = self._listen_audio()
         with transaction.atomic():
             self._seed_phonemes()
             self._seed_words()
             self._seed_sight_words()
             self._seed_confusion_sets()
             self._seed_syllable_words()
-            self._seed_listen_words()
+            self._seed_listen_words(listen_audio)
             self._seed_stories()
         self.stdout.write(self.style.SUCCESS(
             '✅  All game data seeded successfully!'))
@@ -237,38 +249,75 @@ class Command(BaseCommand):
 
         self.stdout.write(f'  Syllable words: {created} created')
 
+    # ─── Audio ────────────────────────────────────────────────────────────────
+
+    def _ensure_audio(self, text, folder):
+        """
+        Storage name of the audio for `text` under `folder`, synthesising it
+        if missing. Returns the .mp3 placeholder path if that fails.
+        """
+        from tts_engine.backends import TTSUnavailable, synthesize_file
+
+        placeholder = f'{folder}/{text}.mp3'
+        for suffix in ('.mp3', '.wav'):
+            name = f'{folder}/{text}{suffix}'
+            if os.path.exists(os.path.join(settings.MEDIA_ROOT, name)):
+                return name
+        if not self.generate_audio:
+            return placeholder
+        try:
+            path = synthesize_file(text, os.path.join(settings.MEDIA_ROOT, folder, text))
+        except TTSUnavailable as e:
+            self.stdout.write(self.style.WARNING(f'  ⚠️  No audio for "{text}": {e}'))
+            return placeholder
+        self.audio_created += 1
+        return f'{folder}/{os.path.basename(path)}'
+
     # ─── GAME 6: Listen & Type ────────────────────────────────────────────────
 
-    def _seed_listen_words(self):
+    LISTEN_WORDS = [
+        # (word_text, difficulty)  — missing listen/audio/<word> files are
+        # synthesised unless --no-audio is given
+        ('cat',     1), ('dog',    1), ('sun',    1), ('hat',    1),
+        ('red',     1), ('big',    1), ('cup',    1), ('pen',    1),
+        ('frog',    2), ('clap',   2), ('step',   2), ('slip',   2),
+        ('brush',   2), ('chest',  2), ('think',  2), ('plant',  2),
+        ('elephant', 3), ('umbrella', 3), ('together', 3), ('remember', 3),
+    ]
+
+    def _listen_audio(self):
+        """{word_text: audio storage name} for words whose audio is missing."""
         from games.models import ListenWord
 
-        WORDS = [
-            # (word_text, difficulty)  — audio_file path is a placeholder;
-            # upload real .mp3 files via Django admin at listen/audio/<word>.mp3
-            ('cat',     1), ('dog',    1), ('sun',    1), ('hat',    1),
-            ('red',     1), ('big',    1), ('cup',    1), ('pen',    1),
-            ('frog',    2), ('clap',   2), ('step',   2), ('slip',   2),
-            ('brush',   2), ('chest',  2), ('think',  2), ('plant',  2),
-            ('elephant', 3), ('umbrella', 3), ('together', 3), ('remember', 3),
-        ]
+        current = dict(ListenWord.objects.values_list('word_text', 'audio_file'))
+        self.audio_created = 0
+        audio = {}
+        for word_text, _ in self.LISTEN_WORDS:
+            name = current.get(word_text) or f'listen/audio/{word_text}.mp3'
+            if not os.path.exists(os.path.join(settings.MEDIA_ROOT, name)):
+                audio[word_text] = self._ensure_audio(word_text, 'listen/audio')
+        return audio
+
+    def _seed_listen_words(self, audio):
+        from games.models import ListenWord
 
         created = 0
-        for word_text, level in WORDS:
-            _, made = ListenWord.objects.get_or_create(
+        for word_text, level in self.LISTEN_WORDS:
+            listen_word, made = ListenWord.objects.get_or_create(
                 word_text=word_text,
                 defaults={
                     'difficulty_level': level,
-                    'audio_file': f'listen/audio/{word_text}.mp3',
+                    'audio_file': audio.get(word_text, f'listen/audio/{word_text}.mp3'),
                 }
             )
             if made:
                 created += 1
+            elif word_text in audio and audio[word_text] != listen_word.audio_file.name:
+                listen_word.audio_file = audio[word_text]
+                listen_word.save(update_fields=['audio_file'])
 
-        self.stdout.write(f'  Listen words: {created} created')
-        self.stdout.write(self.style.WARNING(
-            '  ⚠️  Upload real audio files to media/listen/audio/<word>.mp3 '
-            'or generate them with a TTS tool.'
-        ))
+        self.stdout.write(f'  Listen words: {created} created, '
+                          f'{self.audio_created} audio files generated')
 
     # ─── GAME 7: Stories ──────────────────────────────────────────────────────
 
@@ -0,0 +1,95 @@
+"""
+Management command: python manage.py train_difficulty_model [--backtest] [--output PATH] [--game GAME ...]
+
+Fits the per-game adaptive-difficulty model (games/difficulty.py) on the
+attempt history and writes it to settings.GAMES_DIFFICULTY_MODEL. A share
+of children is held out of training and replayed through both the fixed
+EMA rule and the new model, so every run reports:
+
+  old / new µs   cost of one level update (what each submission pays)
+  batch /s       model predictions per second over the whole history
+  log loss, AUC  how well EMA accuracy vs model probability predicts the
+                 child's next answer (lower log loss, higher AUC = better)
+  changes        level moves over the replay, and the mean final level
+
+With --backtest nothing is trained: the installed model is replayed over
+every child's full history. Workers load the model when they start, so
+restart them after retraining.
+"""
+
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = 'Trains (or backtests) the adaptive-difficulty model from attempt history'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--backtest', action='store_true',
+                            help='Replay the installed model over all history; do not train')
+        parser.add_argument('--output', default=None,
+                            help='Model file (default: settings.GAMES_DIFFICULTY_MODEL)')
+        parser.add_argument('--game', action='append', default=None,
+                            help='Limit to a game type (repeatable)')
+        parser.add_argument('--holdout', type=float, default=0.2,
+                            help='Share of children held out for the backtest')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--up', type=float, default=None,
+                            help='Predicted skill counting towards a level up')
+        parser.add_argument('--down', type=float, default=None,
+                            help='Predicted skill below which the level drops')
+        parser.add_argument('--streak', type=int, default=None,
+                            help='Consecutive high-skill attempts needed to level up')
+
+    def handle(self, *args, **options):
+        from games import difficulty
+        from games.attempts import GAMES
+
+        path = options['output'] or settings.GAMES_DIFFICULTY_MODEL
+        games = options['game'] or difficulty.graded_games()
+        unknown = set(games) - set(difficulty.graded_games())
+        if unknown:
+            raise CommandError(f'Not a graded game: {", ".join(sorted(unknown))}')
+
+        if options['backtest']:
+            try:
+                policies = difficulty.policies_from_bundle(difficulty.load_bundle(path))
+            except FileNotFoundError:
+                raise CommandError(f'No model at {path}; train one first')
+            except ValueError as e:
+                raise CommandError(str(e))
+            samples = {g: difficulty.load_columns(g) for g in games if g in policies}
+        else:
+            start = time.perf_counter()
+            bundle, samples = difficulty.train(
+                games, holdout=options['holdout'], seed=options['seed'],
+                up=difficulty.LEVEL_UP_SKILL if options['up'] is None else options['up'],
+                down=difficulty.LEVEL_DOWN_SKILL if options['down'] is None else options['down'],
+                streak=options['streak'] or difficulty.LEVEL_UP_STREAK,
+                log=self.stdout.write)
+            if not bundle['games']:
+                raise CommandError('No game had enough history to train on')
+            difficulty.save(bundle, path)
+            policies = difficulty.policies_from_bundle(bundle)
+            self.stdout.write(self.style.SUCCESS(
+                f'✅  {len(bundle["games"])} game models → {path} '
+                f'({time.perf_counter() - start:.1f}s)'))
+
+        self.stdout.write(
+            f'{"game":<14} {"attempts":>9} {"old µs":>7} {"new µs":>7} {"batch /s":>10} '
+            f'{"log loss":>15} {"AUC":>11} {"changes":>9} {"level":>9}')
+        for game_type, cols in samples.items():
+            report = difficulty.backtest(cols, GAMES[game_type].window, policies[game_type])
+            if 'old_scores' not in report:
+                self.stdout.write(f'{game_type:<14} {report["attempts"]:>9}  (too little history)')
+                continue
+            old, new = report['old_scores'], report['new_scores']
+            self.stdout.write(
+                f'{game_type:<14} {report["attempts"]:>9} {report["old_us"]:>7.1f} '
+                f'{report["new_us"]:>7.1f} {report["batch_per_s"]:>10.0f} '
+                f'{old["log_loss"]:>7.3f}→{new["log_loss"]:<7.3f} '
+                f'{old["auc"]:>5.2f}→{new["auc"]:<5.2f} '
+                f'{report["old_changes"]:>4}→{report["new_changes"]:<4} '
+                f'{report["old_level"]:>4.1f}→{report["new_level"]:<4.1f}')
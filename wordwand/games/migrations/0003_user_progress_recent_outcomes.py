@@ -0,0 +1,18 @@
+# Generated by Django 6.0.1 on 2026-10-18 12:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('games', '0002_game_content_version'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userprogress',
+            name='recent_outcomes',
+            field=models.BinaryField(default=b''),
+        ),
+    ]
@@ -0,0 +1,100 @@
+# Generated by Django 6.0.1 on 2026-10-18 13:10
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('games', '0004_word_schedule'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AttemptRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('game_type', models.CharField(choices=[('sound_match', 'Sound–Letter Match'), ('word_builder', 'Word Builder'), ('sight_word', 'Sight Word Speed Tap'), ('confusion', 'Confusing Letter Fix'), ('syllable', 'Syllable Breaker'), ('listen_type', 'Listening & Type'), ('story_builder', 'Story Builder')], max_length=30)),
+                ('day', models.DateField()),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('correct', models.PositiveIntegerField(default=0)),
+                ('total_time', models.FloatField(default=0.0)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='confusionattempt',
+            index=models.Index(fields=['user', 'attempted_at'], name='games_confatt_user_at_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='listenattempt',
+            index=models.Index(fields=['user', 'attempted_at'], name='games_listatt_user_at_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='phonemeattempt',
+            index=models.Index(fields=['user', 'attempted_at'], name='games_phonatt_user_at_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='sightwordattempt',
+            index=models.Index(fields=['user', 'attempted_at'], name='games_sightatt_user_at_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='storyattempt',
+            index=models.Index(fields=['user', 'attempted_at'], name='games_storyatt_user_at_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='syllableattempt',
+            index=models.Index(fields=['user', 'attempted_at'], name='games_syllatt_user_at_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='wordbuildattempt',
+            index=models.Index(fields=['user', 'attempted_at'], name='games_wordatt_user_at_idx'),
+        ),
+        # Drop the user-only indexes once (user, attempted_at) covers them
+        migrations.AlterField(
+            model_name='confusionattempt',
+            name='user',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='confusion_attempts', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AlterField(
+            model_name='listenattempt',
+            name='user',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='listen_attempts', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AlterField(
+            model_name='phonemeattempt',
+            name='user',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='phoneme_attempts', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AlterField(
+            model_name='sightwordattempt',
+            name='user',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='sight_word_attempts', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AlterField(
+            model_name='storyattempt',
+            name='user',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='story_attempts', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AlterField(
+            model_name='syllableattempt',
+            name='user',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='syllable_attempts', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AlterField(
+            model_name='wordbuildattempt',
+            name='user',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='word_build_attempts', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='attemptrollup',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='attempt_rollups', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AlterUniqueTogether(
+            name='attemptrollup',
+            unique_together={('user', 'game_type', 'day')},
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 6.0.1 on 2026-10-18 13:40
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('games', '0005_attempt_indexes_and_rollups'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RoundBundle',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('game_type', models.CharField(choices=[('sound_match', 'Sound–Letter Match'), ('word_builder', 'Word Builder'), ('sight_word', 'Sight Word Speed Tap'), ('confusion', 'Confusing Letter Fix'), ('syllable', 'Syllable Breaker'), ('listen_type', 'Listening & Type'), ('story_builder', 'Story Builder')], max_length=30)),
+                ('level', models.PositiveIntegerField()),
+                ('content_version', models.PositiveBigIntegerField()),
+                ('rounds', models.JSONField(default=list)),
+                ('built_at', models.DateTimeField(auto_now=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='round_bundles', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'unique_together': {('user', 'game_type')},
+            },
+        ),
+    ]
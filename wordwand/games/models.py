@@ -1,7 +1,17 @@
 from django.db import models
+from django.db.models import F
+from django.db.models.signals import post_delete, post_save
 from django.contrib.auth.models import User
 
 
+def user_history_index(name):
+    """
+    Attempt tables are read per child, newest first — never by time alone.
+    The index leads with user, so their user foreign keys skip their own.
+    """
+    return models.Index(fields=['user', 'attempted_at'], name=name)
+
+
 # ═══════════════════════════════════════════════
 # GAME 1 — Sound–Letter Match
 # ═══════════════════════════════════════════════
@@ -31,7 +41,7 @@ class PhonemeOption(models.Model):
 
 class PhonemeAttempt(models.Model):
     user = models.ForeignKey(
-        User, on_delete=models.CASCADE, related_name='phoneme_attempts')
+        User, on_delete=models.CASCADE, related_name='phoneme_attempts', db_index=False)
     phoneme = models.ForeignKey(Phoneme, on_delete=models.CASCADE)
     selected_option = models.ForeignKey(
         PhonemeOption, on_delete=models.SET_NULL, null=True)
@@ -39,6 +49,9 @@ class PhonemeAttempt(models.Model):
     response_time = models.FloatField(help_text='seconds')
     attempted_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [user_history_index('games_phonatt_user_at_idx')]
+
 
 # ═══════════════════════════════════════════════
 # GAME 2 — Word Builder (Drag & Drop)
@@ -75,13 +88,16 @@ class WordLetter(models.Model):
 
 class WordBuildAttempt(models.Model):
     user = models.ForeignKey(
-        User, on_delete=models.CASCADE, related_name='word_build_attempts')
+        User, on_delete=models.CASCADE, related_name='word_build_attempts', db_index=False)
     word = models.ForeignKey(Word, on_delete=models.CASCADE)
     submitted_order = models.JSONField()
     is_correct = models.BooleanField()
     response_time = models.FloatField()
     attempted_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [user_history_index('games_wordatt_user_at_idx')]
+
 
 # ═══════════════════════════════════════════════
 # GAME 3 — Sight Word Speed Tap
@@ -110,15 +126,27 @@ class UserSightWordProgress(models.Model):
     def accuracy(self):
         return round((self.correct / self.attempts) * 100, 1) if self.attempts else 0
 
+    @classmethod
+    def record_many(cls, user, tallies):
+        """Atomically add {word_id: (attempts, correct)} in one statement."""
+        from .counters import increment
+        increment(cls, ['user', 'word'], [
+            {'user': user.pk, 'word': word_id, 'attempts': attempts, 'correct': correct}
+            for word_id, (attempts, correct) in tallies.items()
+        ], ['attempts', 'correct'])
+
 
 class SightWordAttempt(models.Model):
     user = models.ForeignKey(
-        User, on_delete=models.CASCADE, related_name='sight_word_attempts')
+        User, on_delete=models.CASCADE, related_name='sight_word_attempts', db_index=False)
     word = models.ForeignKey(SightWord, on_delete=models.CASCADE)
     is_correct = models.BooleanField()
     response_time = models.FloatField()
     attempted_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [user_history_index('games_sightatt_user_at_idx')]
+
 
 # ═══════════════════════════════════════════════
 # GAME 4 — Confusing Letter Fix (b/d/p/q)
@@ -138,7 +166,7 @@ class ConfusionSet(models.Model):
 
 class ConfusionAttempt(models.Model):
     user = models.ForeignKey(
-        User, on_delete=models.CASCADE, related_name='confusion_attempts')
+        User, on_delete=models.CASCADE, related_name='confusion_attempts', db_index=False)
     confusion_set = models.ForeignKey(ConfusionSet, on_delete=models.CASCADE)
     shown_letter = models.CharField(max_length=3)
     selected = models.CharField(max_length=3)
@@ -146,6 +174,9 @@ class ConfusionAttempt(models.Model):
     response_time = models.FloatField()
     attempted_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [user_history_index('games_confatt_user_at_idx')]
+
 
 # ═══════════════════════════════════════════════
 # GAME 5 — Syllable Breaker
@@ -170,13 +201,16 @@ class SyllableWord(models.Model):
 
 class SyllableAttempt(models.Model):
     user = models.ForeignKey(
-        User, on_delete=models.CASCADE, related_name='syllable_attempts')
+        User, on_delete=models.CASCADE, related_name='syllable_attempts', db_index=False)
     syllable_word = models.ForeignKey(SyllableWord, on_delete=models.CASCADE)
     submitted_splits = models.JSONField()
     is_correct = models.BooleanField()
     response_time = models.FloatField()
     attempted_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [user_history_index('games_syllatt_user_at_idx')]
+
 
 # ═══════════════════════════════════════════════
 # GAME 6 — Listening & Type
@@ -199,7 +233,7 @@ class ListenWord(models.Model):
 
 class ListenAttempt(models.Model):
     user = models.ForeignKey(
-        User, on_delete=models.CASCADE, related_name='listen_attempts')
+        User, on_delete=models.CASCADE, related_name='listen_attempts', db_index=False)
     listen_word = models.ForeignKey(ListenWord, on_delete=models.CASCADE)
     typed_answer = models.CharField(max_length=60)
     is_correct = models.BooleanField()
@@ -207,6 +241,9 @@ class ListenAttempt(models.Model):
     response_time = models.FloatField()
     attempted_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [user_history_index('games_listatt_user_at_idx')]
+
 
 # ═══════════════════════════════════════════════
 # GAME 7 — Story Builder
@@ -234,13 +271,16 @@ class Story(models.Model):
 
 class StoryAttempt(models.Model):
     user = models.ForeignKey(
-        User, on_delete=models.CASCADE, related_name='story_attempts')
+        User, on_delete=models.CASCADE, related_name='story_attempts', db_index=False)
     story = models.ForeignKey(Story, on_delete=models.CASCADE)
     completed = models.BooleanField(default=False)
     fill_answers = models.JSONField(default=dict, blank=True)
     time_spent = models.FloatField(default=0)
     attempted_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [user_history_index('games_storyatt_user_at_idx')]
+
 
 # ═══════════════════════════════════════════════
 # GLOBAL — Adaptive Difficulty + Progress Tracking
@@ -266,6 +306,17 @@ ERROR_TYPES = [
     ('phoneme_miss',          'Phoneme Miss'),
 ]
 
+# The game that practises each error type
+ERROR_GAMES = {
+    'bd_confusion':          'confusion',
+    'pq_confusion':          'confusion',
+    'vowel_substitution':    'sound_match',
+    'blending_failure':      'word_builder',
+    'syllable_segmentation': 'syllable',
+    'sight_word_miss':       'sight_word',
+    'phoneme_miss':          'sound_match',
+}
+
 
 class UserProgress(models.Model):
     user = models.ForeignKey(
@@ -275,6 +326,8 @@ class UserProgress(models.Model):
     accuracy = models.FloatField(default=0.0)
     average_time = models.FloatField(default=0.0)
     sessions_at_level = models.PositiveIntegerField(default=0)
+    # Packed ring of the latest (is_correct, seconds) outcomes — see ring.py
+    recent_outcomes = models.BinaryField(default=b'', editable=False)
     last_played = models.DateTimeField(auto_now=True)
 
     class Meta:
@@ -283,16 +336,18 @@ class UserProgress(models.Model):
     def __str__(self):
         return f"{self.user.username} | {self.game_type} | L{self.level} | {self.accuracy:.1f}%"
 
-    def update_after_session(self, session_accuracy: float, session_avg_time: float):
+    def update_after_session(self, session_accuracy: float, session_avg_time: float, save: bool = True):
         """
         Adaptive difficulty:
           accuracy > 85% for 3 consecutive sessions → level up
           accuracy < 60% → level down immediately
+
+        Batched submissions replay several sessions with save=False and
+        save once at the end. When a trained model is installed,
+        games/difficulty.py decides the level instead and this rule is the
+        fallback.
         """
-        self.accuracy = round(0.70 * self.accuracy +
-                              0.30 * session_accuracy,  2)
-        self.average_time = round(
-            0.70 * self.average_time + 0.30 * session_avg_time,  2)
+        self.update_averages(session_accuracy, session_avg_time)
 
         if session_accuracy > 85:
             self.sessions_at_level += 1
@@ -305,7 +360,15 @@ class UserProgress(models.Model):
         else:
             self.sessions_at_level = 0
 
-        self.save()
+        if save:
+            self.save()
+
+    def update_averages(self, session_accuracy: float, session_avg_time: float):
+        """Exponential moving averages of accuracy and time (shown on the dashboard)."""
+        self.accuracy = round(0.70 * self.accuracy +
+                              0.30 * session_accuracy,  2)
+        self.average_time = round(
+            0.70 * self.average_time + 0.30 * session_avg_time,  2)
 
 
 class UserErrorPattern(models.Model):
@@ -323,10 +386,17 @@ class UserErrorPattern(models.Model):
         return f"{self.user.username} | {self.error_type} ×{self.frequency}"
 
     @classmethod
-    def log(cls, user, error_type: str):
-        obj, _ = cls.objects.get_or_create(user=user, error_type=error_type)
-        obj.frequency += 1
-        obj.save()
+    def log(cls, user, error_type: str, count: int = 1):
+        cls.log_many(user, {error_type: count})
+
+    @classmethod
+    def log_many(cls, user, counts):
+        """Atomically add {error_type: count} for a user in one statement."""
+        from .counters import increment
+        increment(cls, ['user', 'error_type'], [
+            {'user': user.pk, 'error_type': error_type, 'frequency': count}
+            for error_type, count in counts.items() if count
+        ], ['frequency'], now_fields=['last_seen'])
 
     @classmethod
     def recommend_game(cls, user) -> str:
@@ -334,13 +404,109 @@ class UserErrorPattern(models.Model):
         top = cls.objects.filter(user=user).order_by('-frequency').first()
         if not top:
             return 'sound_match'
-        mapping = {
-            'bd_confusion':          'confusion',
-            'pq_confusion':          'confusion',
-            'vowel_substitution':    'sound_match',
-            'blending_failure':      'word_builder',
-            'syllable_segmentation': 'syllable',
-            'sight_word_miss':       'sight_word',
-            'phoneme_miss':          'sound_match',
-        }
-        return mapping.get(top.error_type, 'sound_match')
+        return ERROR_GAMES.get(top.error_type, 'sound_match')
+
+
+# ═══════════════════════════════════════════════
+# GLOBAL — Spaced repetition (see scheduler.py)
+# ═══════════════════════════════════════════════
+
+class WordSchedule(models.Model):
+    SCHEDULED_GAMES = [
+        ('sight_word',  'Sight Word Speed Tap'),
+        ('listen_type', 'Listening & Type'),
+    ]
+
+    user = models.ForeignKey(
+        User, on_delete=models.CASCADE, related_name='word_schedules')
+    game_type = models.CharField(max_length=30, choices=SCHEDULED_GAMES)
+    # Packed Leitner queue — see scheduler.WordQueue
+    queue = models.BinaryField(default=b'', editable=False)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ('user', 'game_type')
+
+    def __str__(self):
+        return f"{self.user.username} | {self.game_type} | {len(self.queue)} bytes"
+
+
+# ═══════════════════════════════════════════════
+# GLOBAL — Attempt rollups (see retention.py)
+# ═══════════════════════════════════════════════
+
+class AttemptRollup(models.Model):
+    """A child's daily totals in one game, for attempts pruned from the attempt tables."""
+    user = models.ForeignKey(
+        User, on_delete=models.CASCADE, related_name='attempt_rollups')
+    game_type = models.CharField(max_length=30, choices=GAME_TYPES)
+    day = models.DateField()
+    attempts = models.PositiveIntegerField(default=0)
+    correct = models.PositiveIntegerField(default=0)
+    total_time = models.FloatField(default=0.0)
+
+    class Meta:
+        unique_together = ('user', 'game_type', 'day')
+
+    def __str__(self):
+        return f"{self.user.username} | {self.game_type} | {self.day} ×{self.attempts}"
+
+
+# ═══════════════════════════════════════════════
+# GLOBAL — Round bundles (see bundles.py)
+# ═══════════════════════════════════════════════
+
+class RoundBundle(models.Model):
+    """A child's next session of one game, built ahead of time."""
+    user = models.ForeignKey(
+        User, on_delete=models.CASCADE, related_name='round_bundles')
+    game_type = models.CharField(max_length=30, choices=GAME_TYPES)
+    # What the rounds were built for; anything else and they are rebuilt
+    level = models.PositiveIntegerField()
+    content_version = models.PositiveBigIntegerField()
+    rounds = models.JSONField(default=list)
+    built_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ('user', 'game_type')
+
+    def __str__(self):
+        return f"{self.user.username} | {self.game_type} | L{self.level} ×{len(self.rounds)}"
+
+
+# ═══════════════════════════════════════════════
+# GLOBAL — Content pool invalidation (see pools.py)
+# ═══════════════════════════════════════════════
+
+class GameContentVersion(models.Model):
+    """
+    Single row, bumped whenever game content changes. Every process keeps
+    its content pools until it sees a newer version.
+    """
+    version = models.PositiveBigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    @classmethod
+    def current(cls) -> int:
+        return cls.objects.filter(pk=1).values_list('version', flat=True).first() or 0
+
+    @classmethod
+    def bump(cls):
+        if not cls.objects.filter(pk=1).update(version=F('version') + 1):
+            cls.objects.get_or_create(pk=1, defaults={'version': 1})
+
+
+CONTENT_MODELS = (
+    Phoneme, PhonemeOption, Word, WordLetter, SightWord,
+    ConfusionSet, SyllableWord, ListenWord, Story,
+)
+
+
+def invalidate_content_pools(sender, **kwargs):
+    if not kwargs.get('raw'):
+        GameContentVersion.bump()
+
+
+for _model in CONTENT_MODELS:
+    post_save.connect(invalidate_content_pools, sender=_model)
+    post_delete.connect(invalidate_content_pools, sender=_model)
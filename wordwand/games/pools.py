@@ -0,0 +1,124 @@
+"""
+In-process content pools for the games.
+
+Each game's content is loaded once per process: a compact array of IDs per
+difficulty level plus the rows themselves, with their related data
+(phoneme options, word letters) already attached. Picking a round is then a
+random index into an array — the only database query is the one-row
+GameContentVersion check that tells every process when content changed
+(any save/delete of game content bumps it, see models.py).
+"""
+
+import random
+import threading
+from array import array
+
+from .models import (
+    ConfusionSet, GameContentVersion, ListenWord, Phoneme,
+    SightWord, Story, SyllableWord, Word,
+)
+
+
+class ContentPool:
+    """The content of one game: rows by ID and sorted ID arrays by level."""
+
+    def __init__(self, items, level_attr=None):
+        self.items = {item.pk: item for item in items}
+        self.all_ids = array('q', sorted(self.items))
+        self.by_level = {}
+        if level_attr:
+            levels = {}
+            for pk in self.all_ids:
+                levels.setdefault(getattr(self.items[pk], level_attr), []).append(pk)
+            self.by_level = {level: array('q', ids) for level, ids in levels.items()}
+
+    def __len__(self):
+        return len(self.all_ids)
+
+    def pick(self, level=None):
+        """A random item at `level` (any level if there are none), or None."""
+        ids = self.by_level.get(level) or self.all_ids
+        if not ids:
+            return None
+        return self.items[ids[random.randrange(len(ids))]]
+
+    def pick_many(self, k, level=None):
+        """
+        `k` random items at `level` (any level if there are none): distinct
+        until the level runs out, then repeated — never twice in a row.
+        """
+        ids = self.by_level.get(level) or self.all_ids
+        picked = []
+        while ids and len(picked) < k:
+            batch = random.sample(ids, min(len(ids), k - len(picked)))
+            if picked and batch[0] == picked[-1]:
+                batch.append(batch.pop(0))
+            picked += batch
+        return [self.items[pk] for pk in picked]
+
+    def sample(self, k, exclude=None):
+        """Up to `k` distinct random items, never `exclude`."""
+        k = min(k, len(self.all_ids) - (exclude is not None))
+        picked = set()
+        while len(picked) < k:
+            pk = self.all_ids[random.randrange(len(self.all_ids))]
+            if exclude is None or pk != exclude.pk:
+                picked.add(pk)
+        return [self.items[pk] for pk in picked]
+
+
+# ─── Loaders ──────────────────────────────────────────────────────────────────
+
+def _load_phonemes():
+    phonemes = []
+    for phoneme in Phoneme.objects.prefetch_related('options'):
+        phoneme.option_list = list(phoneme.options.all())
+        if phoneme.option_list:
+            phonemes.append(phoneme)
+    return ContentPool(phonemes, 'difficulty_level')
+
+
+def _load_words():
+    words = []
+    for word in Word.objects.prefetch_related('letters'):
+        # WordLetter.Meta.ordering keeps letters in position order
+        word.letter_list = [letter.letter for letter in word.letters.all()]
+        words.append(word)
+    return ContentPool(words, 'difficulty_level')
+
+
+LOADERS = {
+    'sound_match':   _load_phonemes,
+    'word_builder':  _load_words,
+    'sight_word':    lambda: ContentPool(SightWord.objects.all(), 'level'),
+    'confusion':     lambda: ContentPool(ConfusionSet.objects.all()),
+    'syllable':      lambda: ContentPool(SyllableWord.objects.all(), 'difficulty_level'),
+    'listen_type':   lambda: ContentPool(ListenWord.objects.all(), 'difficulty_level'),
+    'story_builder': lambda: ContentPool(Story.objects.all(), 'difficulty_level'),
+}
+
+_pools = {}
+_version = None
+_lock = threading.Lock()
+
+
+def get_pool(game_type):
+    """The current ContentPool for a game, reloading it if content changed."""
+    global _version
+    version = GameContentVersion.current()
+    with _lock:
+        if version != _version:
+            _pools.clear()
+            _version = version
+        pool = _pools.get(game_type)
+    if pool is None:
+        pool = LOADERS[game_type]()
+        with _lock:
+            if _version == version:
+                _pools[game_type] = pool
+    return pool
+
+
+def invalidate():
+    """Force every process to reload (for bulk changes that skip signals)."""
+    GameContentVersion.bump()
@@ -0,0 +1,102 @@
+"""
+Per-user game progress summary.
+
+The menu, the dashboard and every game page need the user's level in each
+game plus the recommended game. `summary()` loads all of a user's
+UserProgress rows in one query (creating missing ones with one
+bulk_create), reads the error patterns once and derives the
+recommendation from them.
+
+The result is plain data cached in the session: sessions are loaded on
+every request anyway and, unlike the per-process local-memory cache, are
+shared by all workers, so `invalidate()` after a submit is seen by the
+next request of that session whichever worker serves it. The trade-off is
+that it is per session, not per child: entries also expire after
+GAMES_PROGRESS_CACHE_TTL seconds, which bounds staleness when the same
+child plays on two devices.
+"""
+
+import time
+
+from django.conf import settings
+from django.urls import reverse
+
+from .models import ERROR_GAMES, ERROR_TYPES, GAME_TYPES, UserErrorPattern, UserProgress
+
+SESSION_KEY = 'games_progress'
+
+GAME_LABELS = dict(GAME_TYPES)
+ERROR_LABELS = dict(ERROR_TYPES)
+
+# URL names of the game pages, by game_type
+GAME_URLS = {
+    'sound_match':   'sound_match',
+    'word_builder':  'word_builder',
+    'sight_word':    'sight_word',
+    'confusion':     'confusion_game',
+    'syllable':      'syllable_game',
+    'listen_type':   'listen_type',
+    'story_builder': 'story_builder',
+}
+
+
+def _row(prog):
+    return {
+        'game_type':         prog.game_type,
+        'label':             GAME_LABELS.get(prog.game_type, prog.game_type),
+        'level':             prog.level,
+        'accuracy':          prog.accuracy,
+        'average_time':      prog.average_time,
+        'sessions_at_level': prog.sessions_at_level,
+    }
+
+
+def load(user):
+    """Build the summary from the database (two queries, three on first visit)."""
+    rows = {p.game_type: p for p in UserProgress.objects.filter(user=user)}
+    missing = [UserProgress(user=user, game_type=g) for g, _ in GAME_TYPES if g not in rows]
+    if missing:
+        UserProgress.objects.bulk_create(missing, ignore_conflicts=True)
+        rows.update((p.game_type, p) for p in missing)
+
+    errors = [
+        {'error_type': e, 'label': ERROR_LABELS.get(e, e), 'frequency': f}
+        for e, f in UserErrorPattern.objects.filter(user=user)
+        .order_by('-frequency').values_list('error_type', 'frequency')
+    ]
+    # Same rule as UserErrorPattern.recommend_game, from the rows already read
+    recommended = ERROR_GAMES.get(errors[0]['error_type'], 'sound_match') if errors else 'sound_match'
+
+    return {
+        'at':          time.time(),
+        'progress':    {g: _row(rows[g]) for g, _ in GAME_TYPES},
+        'errors':      errors,
+        'recommended': recommended,
+    }
+
+
+def summary(request):
+    cached = request.session.get(SESSION_KEY)
+    if cached is None or time.time() - cached['at'] > settings.GAMES_PROGRESS_CACHE_TTL:
+        cached = load(request.user)
+        request.session[SESSION_KEY] = cached
+    return cached
+
+
+def for_game(request, game_type):
+    return summary(request)['progress'][game_type]
+
+
+def recommended_url(data):
+    return reverse(GAME_URLS[data['recommended']])
+
+
+def invalidate(request):
+    """
+    Drop this session's summary. Only this session's: the child's other
+    sessions (a second tab, another device) keep theirs until it expires,
+    GAMES_PROGRESS_CACHE_TTL seconds at most. Sessions are the one store
+    every worker shares here (the cache backend is per process), and a
+    stale level on another device is corrected by the next submit there.
+    """
+    request.session.pop(SESSION_KEY, None)
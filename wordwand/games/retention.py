@@ -0,0 +1,159 @@
+"""
+Attempt retention: daily rollups for old attempts.
+
+The attempt tables grow by millions of rows a term, yet beyond the last
+few months only daily totals are read. `python manage.py rollup_attempts`
+(run it nightly) folds attempts older than GAMES_ATTEMPT_RETENTION_DAYS
+into AttemptRollup rows — one per child, game and day — and deletes them
+in batches. Each batch is aggregated, added to the rollups
+(counters.increment) and deleted in one transaction, so every attempt is
+counted exactly once: raw or rolled up.
+
+Kept raw whatever their age:
+
+  - each child's latest attempts in a game (the RecentRing window), so
+    `rebuild_progress_stats` can still rebuild and verify the rings;
+  - attempts not yet exported to the attempt log (analytics.py), once
+    that game has been exported at all.
+
+`history()` reads both sources in one query, so progress pages look the
+same before and after a prune.
+"""
+
+import datetime
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import CharField, Count, F, Q, Sum, Value, Window
+from django.db.models.functions import RowNumber, TruncDate
+from django.utils import timezone
+
+from .counters import increment
+from .models import AttemptRollup
+
+BATCH_SIZE = 2000
+
+
+def _source(game_type):
+    from .analytics import SOURCES
+    from .attempts import GAMES
+
+    game = GAMES[game_type]
+    return game.model, SOURCES[game_type][1], game.time_attr, game.window
+
+
+def cutoff_for(days):
+    """Start of the day `days` days ago: attempts before it are rolled up."""
+    start = timezone.localdate() - datetime.timedelta(days=days)
+    return timezone.make_aware(datetime.datetime.combine(start, datetime.time()))
+
+
+def _protected(model, user_ids, cutoff, window):
+    """Old attempts still among these children's latest `window` in the game (two queries)."""
+    recent = dict(model.objects.filter(user_id__in=user_ids, attempted_at__gte=cutoff)
+                  .values('user_id').annotate(n=Count('pk')).values_list('user_id', 'n'))
+    # Children who played a full window since the cutoff need nothing kept
+    short = [user_id for user_id in user_ids if recent.get(user_id, 0) < window]
+    if not short:
+        return set()
+    latest = (model.objects.filter(user_id__in=short)
+              .annotate(rank=Window(RowNumber(), partition_by=[F('user_id')],
+                                    order_by=[F('attempted_at').desc(), F('pk').desc()]))
+              .filter(rank__lte=window)
+              .values_list('pk', flat=True))
+    return set(latest)
+
+
+def _daily_totals(queryset, correct_field, time_field, *group):
+    return (queryset.annotate(day=TruncDate('attempted_at'))
+            .values(*group, 'day')
+            .annotate(attempts=Count('pk'),
+                      correct=Count('pk', filter=Q(**{correct_field: True})),
+                      total_time=Sum(time_field)))
+
+
+def rollup_game(game_type, cutoff, batch_size=BATCH_SIZE, max_pk=None, dry_run=False):
+    """
+    Roll up and delete one game's attempts older than `cutoff` (and, if
+    given, with pk <= max_pk). Returns (rolled up, kept raw).
+    """
+    model, correct_field, time_field, window = _source(game_type)
+    old = model.objects.filter(attempted_at__lt=cutoff)
+    if max_pk is not None:
+        old = old.filter(pk__lte=max_pk)
+
+    rolled = kept = 0
+    after = 0
+    while True:
+        batch = list(old.filter(pk__gt=after).order_by('pk')
+                     .values_list('pk', 'user_id')[:batch_size])
+        if not batch:
+            break
+        first, after = batch[0][0], batch[-1][0]
+        keep = _protected(model, {user_id for _, user_id in batch}, cutoff, window)
+        kept += len(keep & {pk for pk, _ in batch})
+        # The pk range plus the age filter is exactly this batch (nothing
+        # old is inserted later), without a 2,000-item IN list
+        rows = old.filter(pk__gte=first, pk__lte=after).exclude(pk__in=keep)
+        if dry_run:
+            rolled += rows.count()
+            continue
+        with transaction.atomic():
+            totals = [
+                {'user': row['user_id'], 'game_type': game_type, 'day': row['day'],
+                 'attempts': row['attempts'], 'correct': row['correct'],
+                 'total_time': row['total_time'] or 0.0}
+                for row in _daily_totals(rows, correct_field, time_field, 'user_id')
+            ]
+            increment(AttemptRollup, ['user', 'game_type', 'day'], totals,
+                      ['attempts', 'correct', 'total_time'])
+            deleted, _ = rows.delete()
+        rolled += deleted
+    return rolled, kept
+
+
+def export_limit(game_type):
+    """Highest pk that may be pruned: the attempt log's high-water mark, if in use."""
+    from .analytics import AttemptLog
+
+    state = AttemptLog().manifest()['games'].get(game_type)
+    return None if state is None else state['hwm']
+
+
+# ─── Reading ──────────────────────────────────────────────────────────────────
+
+def history(user):
+    """
+    {game_type: {'attempts', 'correct', 'accuracy', 'average_time', 'days'}}
+    over a child's whole history — rollups plus raw attempts, one query.
+    """
+    from .attempts import GAMES
+
+    parts = [AttemptRollup.objects.filter(user=user)
+             .values_list('game_type', 'day', 'attempts', 'correct', 'total_time')]
+    for game_type in GAMES:
+        model, correct_field, time_field, _ = _source(game_type)
+        parts.append(
+            _daily_totals(model.objects.filter(user=user), correct_field, time_field)
+            .annotate(game=Value(game_type, output_field=CharField()))
+            .values_list('game', 'day', 'attempts', 'correct', 'total_time'))
+
+    totals = defaultdict(lambda: [0, 0, 0.0, set()])
+    for game_type, day, attempts, correct, total_time in parts[0].union(*parts[1:], all=True):
+        entry = totals[game_type]
+        entry[0] += attempts
+        entry[1] += correct
+        entry[2] += total_time or 0.0
+        entry[3].add(day)
+
+    result = {}
+    for game_type in GAMES:
+        attempts, correct, total_time, days = totals.get(game_type, (0, 0, 0.0, ()))
+        result[game_type] = {
+            'attempts':     attempts,
+            'correct':      correct,
+            'accuracy':     round(correct / attempts * 100, 1) if attempts else 0.0,
+            'average_time': round(total_time / attempts, 2) if attempts else 0.0,
+            'days':         len(days),
+        }
+    return result
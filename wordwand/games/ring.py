@@ -0,0 +1,75 @@
+"""
+Packed ring buffer of a game's most recent outcomes.
+
+UserProgress keeps the last few (is_correct, seconds) outcomes of each game
+in a BinaryField, so rolling accuracy and average time are updated in O(1)
+per attempt instead of re-reading the attempt table after every write.
+The attempt tables stay the source of truth: `manage.py
+rebuild_progress_stats` reconstructs (or verifies) every ring from them.
+
+Layout (little-endian):
+
+  header  capacity (u8), next slot (u8)
+  slots   `capacity` × [correct (u8, EMPTY if unused), seconds (f64)]
+"""
+
+import struct
+from collections import namedtuple
+
+Outcome = namedtuple('Outcome', 'is_correct seconds')
+
+_HEADER = struct.Struct('<BB')
+_SLOT = struct.Struct('<Bd')
+EMPTY = 0xFF
+
+
+class RecentRing:
+    """The last `capacity` outcomes, oldest first when read back."""
+
+    def __init__(self, capacity, data=b''):
+        self.capacity = capacity
+        self._buf = bytearray(_HEADER.size + _SLOT.size * capacity)
+        _HEADER.pack_into(self._buf, 0, capacity, 0)
+        for slot in range(capacity):
+            _SLOT.pack_into(self._buf, self._offset(slot), EMPTY, 0.0)
+
+        data = bytes(data or b'')
+        if not data:
+            return
+        if data[0] == capacity and len(data) == len(self._buf):
+            self._buf[:] = data
+        else:
+            # Capacity changed: keep the newest outcomes that still fit
+            for outcome in RecentRing(data[0], data).outcomes():
+                self.push(*outcome)
+
+    def _offset(self, slot):
+        return _HEADER.size + _SLOT.size * slot
+
+    def push(self, is_correct, seconds):
+        _, slot = _HEADER.unpack_from(self._buf, 0)
+        _SLOT.pack_into(self._buf, self._offset(slot), bool(is_correct), float(seconds))
+        _HEADER.pack_into(self._buf, 0, self.capacity, (slot + 1) % self.capacity)
+
+    def outcomes(self):
+        _, start = _HEADER.unpack_from(self._buf, 0)
+        result = []
+        for i in range(self.capacity):
+            correct, seconds = _SLOT.unpack_from(
+                self._buf, self._offset((start + i) % self.capacity))
+            if correct != EMPTY:
+                result.append(Outcome(bool(correct), seconds))
+        return result
+
+    def __len__(self):
+        return len(self.outcomes())
+
+    def to_bytes(self):
+        return bytes(self._buf)
+
+    @classmethod
+    def from_outcomes(cls, capacity, outcomes):
+        ring = cls(capacity)
+        for outcome in outcomes:
+            ring.push(*outcome)
+        return ring
@@ -0,0 +1,317 @@
+"""
+Spaced repetition for Sight Word Tap and Listening & Type.
+
+Each child has one WordSchedule row per game holding a packed Leitner
+queue: for every word they have answered, a box (0–6) and a due time,
+plus a min-heap of (due, word) keys. A round bundle's words come from
+`upcoming()`: one copy of the heap, then k pops and binary searches —
+O(m + k log m) over memoryviews of the stored bytes, without scanning
+every word's due time. Answers are applied in a batch per submission
+(one row read and one row write).
+
+Order of preference when picking: the most overdue reviews, then the next
+words at the child's level they have never answered, then the reviews
+that fall due soonest.
+
+Layout (native byte order, little-endian hosts):
+
+  header   MAGIC, word count n (u32), heap size m (u32), reserved (u32)
+  cursors  MAX_LEVELS × u32   next new-word index per level
+  heap     m × u64            due << 32 | word_id  (may hold stale keys)
+  ids      n × u32            sorted word ids
+  dues     n × u32            due time (unix seconds)
+  boxes    n × u8             Leitner box
+
+Sections are ordered by alignment so they can be viewed in place.
+"""
+
+import struct
+import sys
+import time
+from array import array
+from bisect import bisect_left
+
+from django.db import transaction
+
+from .models import UserSightWordProgress, WordSchedule
+
+MAGIC = b'WWSQ'
+_HEADER = struct.Struct('<4sIII')
+MAX_LEVELS = 8
+
+# Seconds until a word in each box is due again
+INTERVALS = (60, 10 * 60, 86400, 3 * 86400, 7 * 86400, 16 * 86400, 35 * 86400)
+MAX_BOX = len(INTERVALS) - 1
+
+# Scheduled games -> the attempt's word foreign key
+GAMES = {
+    'sight_word':  'word_id',
+    'listen_type': 'listen_word_id',
+}
+
+_WORD_MASK = 0xFFFFFFFF
+
+
+def _key(due, word_id):
+    return (due << 32) | word_id
+
+
+# heapq only works on lists; these keep the heap in its packed array
+
+def _heappush(heap, key):
+    heap.append(key)
+    pos = len(heap) - 1
+    while pos:
+        parent = (pos - 1) >> 1
+        if heap[parent] <= key:
+            break
+        heap[pos] = heap[parent]
+        pos = parent
+    heap[pos] = key
+
+
+def _heappop(heap):
+    last = heap.pop()
+    if not heap:
+        return last
+    top, size, pos = heap[0], len(heap), 0
+    while True:
+        child = 2 * pos + 1
+        if child >= size:
+            break
+        if child + 1 < size and heap[child + 1] < heap[child]:
+            child += 1
+        if heap[child] >= last:
+            break
+        heap[pos] = heap[child]
+        pos = child
+    heap[pos] = last
+    return top
+
+
+def _copy(section):
+    # frombytes is a memcpy; array(code, view) would convert item by item
+    if isinstance(section, memoryview):
+        copy = array(section.format)
+        copy.frombytes(section.cast('B'))
+        return copy
+    return section[:]
+
+
+class WordQueue:
+    """A child's Leitner queue for one game (see module docstring)."""
+
+    def __init__(self):
+        self.cursors = array('I', [0] * MAX_LEVELS)
+        self.heap = array('Q')
+        self.ids = array('I')
+        self.dues = array('I')
+        self.boxes = array('B')
+        self._writable = True
+
+    # ─── Serialisation ────────────────────────────────────────────────────────
+
+    @classmethod
+    def from_bytes(cls, data):
+        """View stored bytes in place; copied only when first modified."""
+        queue = cls()
+        if not data:
+            return queue
+        view = memoryview(data)
+        magic, n, m, _ = _HEADER.unpack_from(view, 0)
+        if magic != MAGIC:
+            raise ValueError('Not a word queue')
+        offset = _HEADER.size
+        sections = []
+        for code, count in (('I', MAX_LEVELS), ('Q', m), ('I', n), ('I', n), ('B', n)):
+            size = struct.calcsize(code) * count
+            sections.append(view[offset:offset + size].cast(code))
+            offset += size
+        if sys.byteorder != 'little':
+            sections = [_copy(section) for section in sections]
+            for section in sections:
+                section.byteswap()
+        else:
+            queue._writable = False
+        queue.cursors, queue.heap, queue.ids, queue.dues, queue.boxes = sections
+        return queue
+
+    def to_bytes(self):
+        parts = [_HEADER.pack(MAGIC, len(self.ids), len(self.heap), 0)]
+        for section in (self.cursors, self.heap, self.ids, self.dues, self.boxes):
+            if sys.byteorder != 'little':
+                section = _copy(section)
+                section.byteswap()
+            parts.append(bytes(section))
+        return b''.join(parts)
+
+    def _make_writable(self):
+        if not self._writable:
+            self.cursors, self.heap, self.ids, self.dues, self.boxes = (
+                _copy(section) for section in
+                (self.cursors, self.heap, self.ids, self.dues, self.boxes))
+            self._writable = True
+
+    # ─── Lookup ───────────────────────────────────────────────────────────────
+
+    def __len__(self):
+        return len(self.ids)
+
+    def _index(self, word_id):
+        i = bisect_left(self.ids, word_id)
+        return i if i < len(self.ids) and self.ids[i] == word_id else None
+
+    def __contains__(self, word_id):
+        return self._index(word_id) is not None
+
+    def state(self, word_id):
+        """(box, due) for a word, or None if it was never answered."""
+        i = self._index(word_id)
+        return None if i is None else (self.boxes[i], self.dues[i])
+
+    def peek(self):
+        """(due, word_id) of the next review, or None. The top is never stale."""
+        if not len(self.heap):
+            return None
+        key = self.heap[0]
+        return key >> 32, key & _WORD_MASK
+
+    def upcoming(self, now, level_ids=(), slot=0, k=1):
+        """
+        Up to `k` distinct words to show next, as if nothing were answered
+        in between: overdue reviews, then unseen words from `level_ids`
+        (sorted IDs at the child's level, whose new-word cursor is `slot`),
+        then the soonest reviews. Pops k keys off a copy of the heap (one
+        memcpy).
+        """
+        heap = _copy(self.heap)
+        reviews, seen = [], set()
+        while heap and len(reviews) < k:
+            key = _heappop(heap)
+            due, word_id = key >> 32, key & _WORD_MASK
+            i = self._index(word_id)
+            if i is None or self.dues[i] != due or word_id in seen:
+                continue
+            seen.add(word_id)
+            reviews.append((due, word_id))
+
+        words = [word_id for due, word_id in reviews if due <= now]
+        cursor = self.cursors[slot]
+        while cursor < len(level_ids) and len(words) < k:
+            if level_ids[cursor] not in self:
+                words.append(level_ids[cursor])
+            cursor += 1
+        words += [word_id for due, word_id in reviews if due > now]
+        return words[:k]
+
+    # ─── Updates ──────────────────────────────────────────────────────────────
+
+    def set(self, word_id, box, due):
+        """Put a word in `box`, due at `due` (O(log n) for known words)."""
+        self._make_writable()
+        i = bisect_left(self.ids, word_id)
+        if i == len(self.ids) or self.ids[i] != word_id:
+            # A word's first answer is the only O(n) step, once per word
+            self.ids.insert(i, word_id)
+            self.dues.insert(i, 0)
+            self.boxes.insert(i, 0)
+        self.boxes[i] = box
+        self.dues[i] = due
+        _heappush(self.heap, _key(due, word_id))
+        self._drop_stale()
+
+    def answer(self, word_id, correct, now, level_ids=None, slot=0):
+        """Move a word up a box (or back to box 0) and reschedule it."""
+        state = self.state(word_id)
+        if state is None:
+            box = 1 if correct else 0
+        else:
+            box = min(state[0] + 1, MAX_BOX) if correct else 0
+        self.set(word_id, box, int(now) + INTERVALS[box])
+
+        if level_ids is not None:
+            cursor = self.cursors[slot]
+            while cursor < len(level_ids) and level_ids[cursor] in self:
+                cursor += 1
+            self.cursors[slot] = cursor
+
+    def forget(self, word_id):
+        """Remove a word (e.g. deleted content); its heap keys become stale."""
+        i = self._index(word_id)
+        if i is None:
+            return
+        self._make_writable()
+        del self.ids[i], self.dues[i], self.boxes[i]
+        self._drop_stale()
+
+    def _drop_stale(self):
+        heap = self.heap
+        # Rescheduled words leave their old key behind; compact when they dominate
+        if len(heap) > 2 * len(self.ids) + 64:
+            # A sorted array is a valid heap
+            self.heap = array('Q', sorted(_key(due, word_id)
+                                          for word_id, due in zip(self.ids, self.dues)))
+            return
+        while heap:
+            due, word_id = heap[0] >> 32, heap[0] & _WORD_MASK
+            i = self._index(word_id)
+            if i is not None and self.dues[i] == due:
+                break
+            _heappop(heap)
+
+
+# ─── Persistence ──────────────────────────────────────────────────────────────
+
+def _seed(user, game_type, queue, now):
+    """A first schedule for sight words, from the per-word tallies already kept."""
+    if game_type != 'sight_word':
+        return
+    tallies = UserSightWordProgress.objects.filter(user=user).values_list('word_id', 'attempts', 'correct')
+    for word_id, attempts, correct in sorted(tallies):
+        if attempts >= 3 and correct / attempts >= 0.8:
+            box = 2
+        else:
+            box = 1 if correct else 0
+        # Everything already practised is due for a first scheduled review
+        queue.set(word_id, box, now)
+
+
+def _level_ids(pool, level):
+    """Sorted new-word candidates and their cursor slot (0 = every level)."""
+    ids = pool.by_level.get(level)
+    if ids and 0 < level < MAX_LEVELS:
+        return ids, level
+    return pool.all_ids, 0
+
+
+def load_queue(user, game_type):
+    data = (WordSchedule.objects.filter(user=user, game_type=game_type)
+            .values_list('queue', flat=True).first())
+    return WordQueue.from_bytes(data)
+
+
+def next_words(user, game_type, pool, level, k):
+    """Up to `k` items from `pool` in schedule order (for round bundles)."""
+    queue = load_queue(user, game_type)
+    ids = queue.upcoming(int(time.time()), *_level_ids(pool, level), k=k)
+    return [pool.items[word_id] for word_id in ids if word_id in pool.items]
+
+
+def record_answers(user, game_type, answers, pool=None, level=None):
+    """Apply [(word_id, correct), ...] in order; one row read, one row write."""
+    now = int(time.time())
+    level_ids, slot = _level_ids(pool, level) if pool is not None else (None, 0)
+    with transaction.atomic():
+        schedule, created = WordSchedule.objects.select_for_update().get_or_create(
+            user=user, game_type=game_type)
+        queue = WordQueue.from_bytes(schedule.queue)
+        if created:
+            _seed(user, game_type, queue, now)
+        for word_id, correct in answers:
+            queue.answer(word_id, correct, now, level_ids, slot)
+        if pool is not None:
+            # Words deleted from the game would otherwise block the top
+            while queue.peek() is not None and queue.peek()[1] not in pool.items:
+                queue.forget(queue.peek()[1])
+        schedule.queue = queue.to_bytes()
+        schedule.save(update_fields=['queue', 'updated_at'])
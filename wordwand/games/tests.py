@@ -1,3 +1,243 @@
-from django.test import TestCase
+import datetime
+import json
+import threading
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import Client, TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+
+from . import bundles, retention
+from .counters import increment
+from .models import (
+    AttemptRollup, ConfusionSet, SightWord, SightWordAttempt, UserErrorPattern, UserProgress,
+    UserSightWordProgress,
+)
+from .progress import SESSION_KEY
+
+
+def _hammer(threads, work):
+    """Run work(i) on `threads` threads at once; re-raise the first failure."""
+    start = threading.Barrier(threads)
+    errors = []
+
+    def run(i):
+        try:
+            start.wait()
+            work(i)
+        except BaseException as e:
+            errors.append(e)
+        finally:
+            connection.close()
+
+    workers = [threading.Thread(target=run, args=(i,)) for i in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    if errors:
+        raise errors[0]
+
+
+# Bundles and dashboard activity would otherwise write from background threads
+@override_settings(GAMES_BUNDLE_WORKERS=0)
+class ConcurrentCounterTests(TransactionTestCase):
+    """Counters hammered from many threads at once stay exact (counters.increment)."""
+
+    THREADS = 8
+    ROUNDS = 5
+
+    def setUp(self):
+        self.user = User.objects.create_user('racer', password='pw')
+        self.words = [SightWord.objects.create(word=w) for w in ('the', 'and', 'was')]
+        self.confusion = ConfusionSet.objects.create(letter_a='b', letter_b='d')
+
+    def _post(self, client, url, payload):
+        response = client.post(url, json.dumps(payload), content_type='application/json')
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.json()
+
+    def test_submit_and_batch_endpoints(self):
+        # Per thread and round: one sight-word and one confusion answer
+        # through each game's submit endpoint, and the same again as a batch
+        def sight(r):
+            word = self.words[r % len(self.words)]
+            correct = r % 2 == 0
+            other = self.words[(r + 1) % len(self.words)]
+            return {'word_id': word.pk, 'selected_id': word.pk if correct else other.pk,
+                    'response_time': 0}
+
+        def confusion(r):
+            # Misses alternate between a b/d and a p/q confusion
+            return {'confusion_id': self.confusion.pk, 'shown': 'b',
+                    'selected': 'd' if r % 2 else 'q', 'response_time': 0}
+
+        def play(i):
+            client = Client()
+            client.force_login(self.user)
+            for r in range(self.ROUNDS):
+                self._post(client, reverse('sight_word_submit'), sight(r))
+                self._post(client, reverse('confusion_submit'), confusion(r))
+                self._post(client, reverse('attempts_batch'), {'attempts': [
+                    {'game': 'sight_word', **sight(r)},
+                    {'game': 'confusion', **confusion(r)},
+                ]})
+
+        _hammer(self.THREADS, play)
+
+        expected_words = {word.pk: [0, 0] for word in self.words}
+        expected_errors = {'sight_word_miss': 0, 'bd_confusion': 0, 'pq_confusion': 0}
+        for r in range(self.ROUNDS):
+            tally = expected_words[self.words[r % len(self.words)].pk]
+            # Twice per round: the submit and the batch
+            tally[0] += 2 * self.THREADS
+            if r % 2 == 0:
+                tally[1] += 2 * self.THREADS
+            else:
+                expected_errors['sight_word_miss'] += 2 * self.THREADS
+            expected_errors['bd_confusion' if r % 2 else 'pq_confusion'] += 2 * self.THREADS
+
+        words = {row.word_id: [row.attempts, row.correct]
+                 for row in UserSightWordProgress.objects.filter(user=self.user)}
+        self.assertEqual(words, expected_words)
+        errors = dict(UserErrorPattern.objects.filter(user=self.user)
+                      .values_list('error_type', 'frequency'))
+        self.assertEqual(errors, expected_errors)
+
+    def test_rollup_increments(self):
+        day = datetime.date(2026, 1, 5)
+        days = [day, day + datetime.timedelta(days=1)]
+
+        def add(i):
+            for r in range(self.ROUNDS):
+                increment(AttemptRollup, ['user', 'game_type', 'day'], [
+                    {'user': self.user.pk, 'game_type': 'sight_word', 'day': d,
+                     'attempts': 2, 'correct': 1, 'total_time': 1.5}
+                    for d in days
+                ], ['attempts', 'correct', 'total_time'])
+
+        _hammer(self.THREADS, add)
+
+        n = self.THREADS * self.ROUNDS
+        rows = AttemptRollup.objects.filter(user=self.user).order_by('day')
+        self.assertEqual(
+            [(row.day, row.attempts, row.correct, row.total_time) for row in rows],
+            [(d, 2 * n, n, 1.5 * n) for d in days])
+
+
+class MenuQueryTests(TestCase):
+    """The menu reads progress once per session (progress.py), then only the session."""
+
+    def setUp(self):
+        self.user = User.objects.create_user('menu', password='pw')
+        self.client.force_login(self.user)
+        UserErrorPattern.objects.create(user=self.user, error_type='bd_confusion', frequency=3)
+
+    def test_first_visit(self):
+        # Session and user; progress rows, then one insert creating them;
+        # error patterns; the session write (and its savepoint)
+        with self.assertNumQueries(8):
+            response = self.client.get(reverse('menu'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['recommended_game'], 'confusion')
+        self.assertEqual(UserProgress.objects.filter(user=self.user).count(), 7)
+
+    def test_uncached_visit(self):
+        self.client.get(reverse('menu'))
+        session = self.client.session
+        del session[SESSION_KEY]
+        session.save()
+        # Session and user; progress rows; error patterns; the session write
+        # (and its savepoint)
+        with self.assertNumQueries(7):
+            self.client.get(reverse('menu'))
+
+    def test_cached_visit(self):
+        self.client.get(reverse('menu'))
+        # Session and user only
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse('menu'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['sound_progress']['level'], 1)
+
+
+class RoundBundleTests(TestCase):
+    """games/bundle/<game>/ hands out round bundles (bundles.py)."""
+
+    def setUp(self):
+        self.user = User.objects.create_user('bundler', password='pw')
+        self.client.force_login(self.user)
+        for w in ('the', 'and', 'was'):
+            SightWord.objects.create(word=w)
+
+    def _get(self, **params):
+        return self.client.get(reverse('round_bundle', args=['sight_word']), params)
+
+    def test_rounds_in_range(self):
+        response = self._get(rounds=2)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()['rounds']), 2)
+        self.assertEqual(self._get().status_code, 200)
+
+    def test_rounds_out_of_range(self):
+        for rounds in (-5, 0, bundles.MAX_ROUNDS + 1, 'many'):
+            with self.subTest(rounds=rounds):
+                response = self._get(rounds=rounds)
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('error', response.json())
+
+    def _batch(self, **extra):
+        word = SightWord.objects.first()
+        attempt = {'game': 'sight_word', 'word_id': word.pk, 'selected_id': word.pk,
+                   'response_time': 0}
+        response = self.client.post(reverse('attempts_batch'),
+                                    json.dumps({'attempts': [attempt], **extra}),
+                                    content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+
+    def test_prepared_when_session_ends(self):
+        with mock.patch.object(bundles, 'prepare_later') as prepare_later:
+            self._batch()
+            prepare_later.assert_not_called()
+            self._batch(end=['sight_word', 'no_such_game', ['x']])
+        prepare_later.assert_called_once_with(self.user.pk, {'sight_word'})
+
+
+class RetentionTests(TestCase):
+    """rollup_game keeps each child's latest window raw and rolls up the rest (retention.py)."""
+
+    def setUp(self):
+        self.word = SightWord.objects.create(word='the')
+        self.cutoff = retention.cutoff_for(30)
+
+    def _play(self, user, n, days_ago):
+        at = self.cutoff - datetime.timedelta(days=days_ago)
+        rows = SightWordAttempt.objects.bulk_create(
+            [SightWordAttempt(user=user, word=self.word, is_correct=i % 2 == 0, response_time=1.0)
+             for i in range(n)])
+        SightWordAttempt.objects.filter(pk__in=[row.pk for row in rows]).update(attempted_at=at)
+
+    def test_latest_window_kept_raw(self):
+        old_only = User.objects.create_user('old', password='pw')
+        active = User.objects.create_user('active', password='pw')
+        self._play(old_only, 25, days_ago=5)
+        self._play(active, 25, days_ago=5)
+        self._play(active, 10, days_ago=-1)
+
+        rolled, kept = retention.rollup_game('sight_word', self.cutoff)
+        self.assertEqual((rolled, kept), (40, 10))
+        self.assertEqual(SightWordAttempt.objects.filter(user=old_only).count(), 10)
+        self.assertEqual(SightWordAttempt.objects.filter(user=active).count(), 10)
+        self.assertEqual(
+            sorted(AttemptRollup.objects.values_list('user__username', 'attempts')),
+            [('active', 25), ('old', 15)])
+
+    def test_queries_per_batch_do_not_grow_with_children(self):
+        for i in range(12):
+            self._play(User.objects.create_user(f'child{i}', password='pw'), 12, days_ago=5)
+        # Batch read, recent counts, latest windows; then the rollup
+        # transaction (savepoint, totals, upsert, delete, release); end of data
+        with self.assertNumQueries(9):
+            rolled, kept = retention.rollup_game('sight_word', self.cutoff)
+        self.assertEqual((rolled, kept), (24, 120))
@@ -30,4 +30,10 @@ urlpatterns = [
          views.listen_type_submit,   name='listen_type_submit'),
     path('games/story/submit/',
          views.story_submit,          name='story_submit'),
+    path('games/attempts/batch/',
+         views.attempts_batch,        name='attempts_batch'),
+
+    # Session bundles (JSON): the next rounds of a game
+    path('games/bundle/<str:game_type>/',
+         views.round_bundle,          name='round_bundle'),
 ]
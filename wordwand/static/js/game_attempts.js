@@ -0,0 +1,175 @@
+// WordWand – Game attempt queue
+//
+// Answers are graded on the page for instant feedback and queued here
+// (in localStorage, so the queue survives the reload between rounds).
+// The queue is posted to the batch endpoint every FLUSH_EVERY answers,
+// once its oldest answer is FLUSH_AFTER_MS old, and whenever the child
+// leaves the games (tab hidden / closed / navigated away). The server
+// re-grades every attempt; the local result is only used for feedback.
+// The flush on leaving also names the games played, even with no answers
+// left to send: the session is over, so the server builds their next
+// round bundles then.
+//
+// The stored keys carry the child's user id: on a shared classroom device
+// answers left queued by one child wait for that child to log in again
+// instead of being posted under the next child's session. A batch the
+// server turns away because the session expired (a login redirect, 401 or
+// 403) stays queued the same way.
+//
+// Include once per game page:
+//   <script src="{% static 'js/game_attempts.js' %}"
+//           data-batch-url="{% url 'attempts_batch' %}"
+//           data-csrf="{{ csrf_token }}"
+//           data-user="{{ user.pk }}"></script>
+
+(function () {
+    const script    = document.currentScript;
+    const BATCH_URL = script.dataset.batchUrl;
+    const CSRF      = script.dataset.csrf;
+    const USER      = script.dataset.user;
+
+    const QUEUE_KEY      = "ww-attempts-" + USER;
+    const RECENT_KEY     = "ww-recent-" + USER;
+    const CONTINUE_KEY   = "ww-attempts-continue";
+    const FLUSH_EVERY    = 5;
+    const FLUSH_AFTER_MS = 15000;
+    const MAX_BATCH      = 50;     // games.attempts.MAX_BATCH
+    const RECENT_WINDOW  = 10;     // games.attempts.RECENT_ATTEMPTS
+
+    // Keys from before they were per child: whose answers they hold is unknown
+    try {
+        localStorage.removeItem("ww-attempts");
+        localStorage.removeItem("ww-recent");
+    } catch (e) {}
+
+    let flushing = null;       // the batch request in flight
+    let endAfter = false;      // a session end asked for while it was
+    let played   = new Set();  // games answered since the last session end
+
+    // =======================
+    // STORAGE
+    // =======================
+    function load(key, fallback) {
+        try {
+            return JSON.parse(localStorage.getItem(key)) || fallback;
+        } catch (e) {
+            return fallback;
+        }
+    }
+
+    function save(key, value) {
+        try {
+            localStorage.setItem(key, JSON.stringify(value));
+        } catch (e) {}
+    }
+
+    // =======================
+    // FLUSH
+    // =======================
+    // Returns a promise that settles once the batch in flight (if any) is done;
+    // end: the child is leaving, so the batch ends their session
+    function flush(end) {
+        const queue = load(QUEUE_KEY, []);
+        if (flushing) {
+            // Sent as soon as the batch in flight is done
+            if (end) endAfter = true;
+            return flushing;
+        }
+        const ended = end ? Array.from(played) : [];
+        if (queue.length === 0 && ended.length === 0) return Promise.resolve();
+        if (end) played = new Set();
+
+        // Taken off the queue before sending: a page that unloads mid-request
+        // must not leave them behind to be sent twice
+        const batch = queue.slice(0, MAX_BATCH);
+        save(QUEUE_KEY, queue.slice(batch.length));
+
+        let sent = false;
+        const requeue = () => {
+            save(QUEUE_KEY, batch.concat(load(QUEUE_KEY, [])));
+            ended.forEach(game => played.add(game));
+        };
+
+        flushing = fetch(BATCH_URL, {
+            method:    "POST",
+            keepalive: true,
+            // Not followed: login_required answers an expired session with a
+            // redirect to the login page, whose 200 would pass for success
+            redirect:  "manual",
+            headers:   { "Content-Type": "application/json", "X-CSRFToken": CSRF },
+            body:      JSON.stringify({ attempts: batch.map(item => item.attempt), end: ended })
+        })
+        .then(res => {
+            if (res.type === "opaqueredirect" || res.status === 401 ||
+                    res.status === 403 || res.status >= 500) {
+                requeue();
+                return;
+            }
+            // Any other 4xx means the batch itself is unusable — retrying cannot help
+            sent = true;
+        })
+        .catch(requeue)
+        .finally(() => {
+            flushing = null;
+            if (endAfter) {
+                endAfter = false;
+                flush(true);
+            } else if (sent && load(QUEUE_KEY, []).length >= FLUSH_EVERY) {
+                // Straight on only after a success, not into the same failure
+                flush();
+            }
+        });
+        return flushing;
+    }
+
+    function due() {
+        const queue = load(QUEUE_KEY, []);
+        return queue.length >= FLUSH_EVERY ||
+               (queue.length > 0 && Date.now() - queue[0].at >= FLUSH_AFTER_MS);
+    }
+
+    // =======================
+    // PUBLIC API
+    // =======================
+    // record("sight_word", {word_id: 3, selected_id: 3, response_time: 1.2},
+    //        {correct: true}) -> {correct: true, accuracy: 90}
+    function record(game, attempt, result) {
+        const queue = load(QUEUE_KEY, []);
+        queue.push({ at: Date.now(), attempt: Object.assign({ game: game }, attempt) });
+        save(QUEUE_KEY, queue);
+
+        const recent = load(RECENT_KEY, {});
+        const marks  = (recent[game] || []).concat(result.correct === false ? 0 : 1);
+        recent[game] = marks.slice(-RECENT_WINDOW);
+        save(RECENT_KEY, recent);
+        played.add(game);
+
+        if (due()) flush();
+
+        const correct = recent[game].reduce((a, b) => a + b, 0);
+        return Object.assign({
+            accuracy: Math.round(correct / recent[game].length * 1000) / 10
+        }, result);
+    }
+
+    // Reload for a new round without flushing on the way out (pages that
+    // play from a round bundle only do this when none can be fetched)
+    function next() {
+        sessionStorage.setItem(CONTINUE_KEY, "1");
+        location.reload();
+    }
+
+    window.addEventListener("pagehide", () => {
+        if (sessionStorage.getItem(CONTINUE_KEY)) return;
+        flush(true);
+    });
+
+    document.addEventListener("visibilitychange", () => {
+        if (document.visibilityState === "hidden" && !sessionStorage.getItem(CONTINUE_KEY)) flush(true);
+    });
+
+    sessionStorage.removeItem(CONTINUE_KEY);
+    if (due()) flush();
+
+    window.WWAttempts = { record: record, next: next, flush: () => flush(false) };
+})();
@@ -0,0 +1,69 @@
+// WordWand – Round bundles
+//
+// A game page arrives with a whole session of rounds embedded (see
+// games/bundles.py) and plays through them without reloading. When the
+// last round is done the queued answers are flushed first — the server
+// builds the next session from them — and the next bundle is fetched
+// from the bundle endpoint. If that fails the page reloads, which always
+// brings a fresh bundle.
+//
+// Include once per game page, after game_attempts.js:
+//   {{ bundle|json_script:"roundBundle" }}
+//   <script src="{% static 'js/game_rounds.js' %}"
+//           data-bundle-url="{% url 'round_bundle' 'sight_word' %}"></script>
+//
+// Page code:
+//   WWRounds.start(round => { ...show the round... });
+//   "Next" buttons call WWRounds.next().
+
+(function () {
+    const script     = document.currentScript;
+    const BUNDLE_URL = script.dataset.bundleUrl;
+
+    let rounds  = [];
+    let index   = 0;
+    let show    = null;
+    let loading = false;
+
+    function fetchBundle() {
+        // Twice: the first call may only wait for a batch already in flight
+        return WWAttempts.flush()
+            .then(() => WWAttempts.flush())
+            .then(() => fetch(BUNDLE_URL, { headers: { "Accept": "application/json" } }))
+            .then(res => res.ok ? res.json() : null)
+            .catch(() => null);
+    }
+
+    // =======================
+    // PUBLIC API
+    // =======================
+    function start(render) {
+        show = render;
+        const data = document.getElementById("roundBundle");
+        rounds = data ? JSON.parse(data.textContent).rounds : [];
+        index  = 0;
+        if (rounds.length) show(rounds[0]);
+    }
+
+    function next() {
+        if (index + 1 < rounds.length) {
+            index += 1;
+            show(rounds[index]);
+            return;
+        }
+        if (loading) return;
+        loading = true;
+        fetchBundle().then(bundle => {
+            loading = false;
+            if (!bundle || !bundle.rounds.length) {
+                WWAttempts.next();
+                return;
+            }
+            rounds = bundle.rounds;
+            index  = 0;
+            show(rounds[0]);
+        });
+    }
+
+    window.WWRounds = { start: start, next: next };
+})();
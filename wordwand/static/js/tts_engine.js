@@ -16,22 +16,25 @@ function renderText() {
 
     container.innerHTML = "";
     const words = OCR_TEXT.split(/\s+/);
+    // Results without positions fall back to matching the word list
+    const hardSet = new Set(HARD_WORDS);
 
     words.forEach((word, index) => {
         // Remove punctuation for checking against lists
         const clean = word.replace(/[^\w]/g, "").toLowerCase();
+        const hard = HARD_AT[index] || (hardSet.has(clean) ? clean : null);
 
         const span = document.createElement("span");
         span.className = "word";
         span.textContent = word;
         span.setAttribute("data-index", index);
 
-        if (HARD_WORDS.includes(clean)) {
+        if (hard) {
             span.classList.add("hard-word");
             // Attach the click event directly here
             span.onclick = (e) => {
                 e.stopPropagation();
-                openPopup(clean);
+                openPopup(hard);
             };
         }
 
@@ -101,6 +104,11 @@ function speakText(rate) {
     const spans = document.querySelectorAll(".word");
     if (spans.length === 0) return;
 
+    if (AUDIO_CHUNKS.length > 0) {
+        playChunks(rate);
+        return;
+    }
+
     utterance = new SpeechSynthesisUtterance(OCR_TEXT);
     utterance.rate = rate;
 
@@ -131,6 +139,97 @@ function speakText(rate) {
     speechSynthesis.speak(utterance);
 }
 
+// =======================
+// SERVER AUDIO PLAYLIST (sentence chunks)
+// =======================
+// Each chunk: { url, start_word, weights }. The chunk's real duration is
+// spread over its word weights to work out which word is being spoken.
+let AUDIO_CHUNKS = [];
+let readerJobDone = true;
+let chunkAudio = null;
+let chunkSession = 0;
+
+function highlightWord(index) {
+    document.querySelectorAll(".word.highlight").forEach(s => s.classList.remove("highlight"));
+    const span = document.querySelector(`.word[data-index="${index}"]`);
+    if (span) {
+        span.classList.add("highlight");
+        span.scrollIntoView({ behavior: "smooth", block: "nearest" });
+    }
+}
+
+function wordAtTime(chunk, fraction) {
+    const total = chunk.weights.reduce((a, b) => a + b, 0);
+    let elapsed = 0;
+    for (let i = 0; i < chunk.weights.length; i++) {
+        elapsed += chunk.weights[i];
+        if (elapsed / total >= fraction) return chunk.start_word + i;
+    }
+    return chunk.start_word + chunk.weights.length - 1;
+}
+
+function speakChunkInBrowser(chunk, rate) {
+    // Fallback for a chunk whose audio could not be generated
+    const words = OCR_TEXT.split(/\s+/).slice(chunk.start_word, chunk.start_word + chunk.weights.length);
+    return new Promise(resolve => {
+        const u = new SpeechSynthesisUtterance(words.join(" "));
+        u.rate = rate;
+        u.onboundary = (event) => {
+            if (event.name === "word") {
+                const before = u.text.substring(0, event.charIndex).trim().split(/\s+/).filter(Boolean).length;
+                highlightWord(chunk.start_word + before);
+            }
+        };
+        u.onend = resolve;
+        u.onerror = resolve;
+        speechSynthesis.speak(u);
+    });
+}
+
+function playChunkAudio(chunk, rate, session) {
+    return new Promise(resolve => {
+        chunkAudio = new Audio(chunk.url);
+        chunkAudio.playbackRate = rate;
+        chunkAudio.ontimeupdate = () => {
+            if (session !== chunkSession || !chunkAudio.duration) return;
+            highlightWord(wordAtTime(chunk, chunkAudio.currentTime / chunkAudio.duration));
+        };
+        chunkAudio.onended = resolve;
+        chunkAudio.onerror = resolve;
+        chunkAudio.play().catch(resolve);
+    });
+}
+
+async function playChunks(rate) {
+    const session = ++chunkSession;
+
+    for (let i = 0; i < AUDIO_CHUNKS.length; i++) {
+        // Wait for this chunk while the job is still synthesising it
+        while (!AUDIO_CHUNKS[i].url && !readerJobDone) {
+            await new Promise(resolve => setTimeout(resolve, 250));
+            if (session !== chunkSession) return;
+        }
+        if (session !== chunkSession) return;
+
+        const chunk = AUDIO_CHUNKS[i];
+        if (chunk.url) {
+            await playChunkAudio(chunk, rate, session);
+        } else {
+            await speakChunkInBrowser(chunk, rate);
+        }
+        if (session !== chunkSession) return;
+    }
+    document.querySelectorAll(".word.highlight").forEach(s => s.classList.remove("highlight"));
+}
+
+function stopChunks() {
+    chunkSession++;
+    if (chunkAudio) {
+        chunkAudio.pause();
+        chunkAudio = null;
+    }
+}
+
 // =======================
 // STOP SPEECH
 // =======================
@@ -138,6 +237,7 @@ function stopSpeech() {
     if (speechSynthesis.speaking) {
         speechSynthesis.cancel();
     }
+    stopChunks();
 
     document.querySelectorAll(".word").forEach(w => w.classList.remove("highlight"));
 }
@@ -230,13 +330,173 @@ function closePopup() {
 }
 
 
+// =======================
+// READER JOBS (upload → poll → result)
+// =======================
+const JOB_POLL_INTERVAL = 1000;
+// Polling gives up once a job has shown no progress for this long (the
+// server fails or re-queues a stuck job sooner, READER_JOB_STALE_SECONDS)
+const JOB_STALL_TIMEOUT = 15 * 60 * 1000;
+
+function showReaderError(message) {
+    const box = document.getElementById("reader-error");
+    box.querySelector("span").textContent = message;
+    box.hidden = false;
+    document.getElementById("reader-status").hidden = true;
+}
+
+function showReaderResult(result) {
+    AUDIO_CHUNKS = result.audio_chunks || [];
+    const text = result.text || "";
+    if (text === OCR_TEXT) return;
+
+    OCR_TEXT = text;
+    HARD_WORDS = result.hard_words || [];
+    SYLLABLES = result.syllables || {};
+    HARD_AT = {};
+    for (const [word, indices] of Object.entries(result.hard_word_positions || {})) {
+        indices.forEach(i => { if (!(i in HARD_AT)) HARD_AT[i] = word; });
+    }
+
+    document.getElementById("reader-output").hidden = false;
+    renderText();
+}
+
+// Show the pages that are ready so far (only the unbroken run from page 1,
+// so the text never jumps around while later pages come in)
+let previewPages = 0;
+
+function showPartialPages(job) {
+    const pages = job.pages || {};
+    let ready = 0;
+    while (ready < job.page_count && (String(ready) in pages)) ready++;
+    if (ready === 0 || ready === previewPages) return;
+
+    previewPages = ready;
+    const text = Array.from({ length: ready }, (_, i) => pages[String(i)].trim())
+        .filter(Boolean).join(" ");
+    if (speechSynthesis.speaking) return;  // don't re-render mid-sentence
+
+    OCR_TEXT = text;
+    HARD_AT = {};
+    document.getElementById("reader-output").hidden = false;
+    document.getElementById("reader-status").textContent =
+        `⏳ Reading your file… page ${ready} of ${job.page_count} ready`;
+    renderText();
+}
+
+async function pollJob(jobId) {
+    const status = document.getElementById("reader-status");
+    status.textContent = "⏳ Reading your file…";
+    status.hidden = false;
+    previewPages = 0;
+    readerJobDone = false;
+    document.getElementById("reader-error").hidden = true;
+    document.getElementById("reader-output").hidden = true;
+
+    // Progress is any change in what the job reports
+    let progress = "";
+    let progressAt = Date.now();
+    function stalled(state) {
+        const seen = JSON.stringify(state);
+        if (seen !== progress) {
+            progress = seen;
+            progressAt = Date.now();
+        }
+        if (Date.now() - progressAt < JOB_STALL_TIMEOUT) return false;
+        showReaderError("This is taking too long. Please try uploading the file again.");
+        return true;
+    }
+
+    // 1. Wait for the text (showing pages as they are extracted)
+    let job;
+    while (true) {
+        const res = await fetch(`${READER_JOBS_URL}${jobId}/`);
+        if (!res.ok) {
+            showReaderError("Could not find that reading job.");
+            return;
+        }
+        job = await res.json();
+
+        if (job.status === "failed") {
+            showReaderError(job.error || "Error processing file.");
+            return;
+        }
+        if (job.result_ready) break;
+        showPartialPages(job);
+        if (stalled([job.status, Object.keys(job.pages || {}).length])) return;
+        await new Promise(resolve => setTimeout(resolve, JOB_POLL_INTERVAL));
+    }
+
+    // 2. Text is ready — keep refreshing the audio playlist until done
+    OCR_TEXT = "";
+    status.textContent = "🔊 Preparing the audio…";
+    while (true) {
+        const res = await fetch(job.result_url);
+        const result = await res.json();
+        if (!res.ok) {
+            showReaderError(result.error || "Error processing file.");
+            return;
+        }
+        showReaderResult(result);
+        if (result.status === "done") {
+            readerJobDone = true;
+            status.hidden = true;
+            return;
+        }
+        if (stalled((result.audio_chunks || []).map(chunk => chunk.url))) return;
+        await new Promise(resolve => setTimeout(resolve, JOB_POLL_INTERVAL));
+    }
+}
+
+async function submitReaderForm(event) {
+    event.preventDefault();
+    const form = event.target;
+
+    stopSpeech();
+    document.getElementById("reader-error").hidden = true;
+    document.getElementById("reader-status").hidden = false;
+
+    try {
+        const res = await fetch(form.action || window.location.pathname, {
+            method: "POST",
+            headers: { "X-Requested-With": "XMLHttpRequest" },
+            body: new FormData(form),
+        });
+        const job = await res.json();
+        if (!res.ok) {
+            showReaderError(job.error || "Error uploading file.");
+            return;
+        }
+        history.replaceState(null, "", `?job=${job.job_id}`);
+        pollJob(job.job_id);
+    } catch (err) {
+        showReaderError("Could not upload the file. Please try again.");
+    }
+}
+
+
+// A prepared reading-pack document: everything is ready, nothing to poll
+async function loadDocument(url) {
+    const res = await fetch(url);
+    if (!res.ok) {
+        showReaderError("Could not find that document.");
+        return;
+    }
+    readerJobDone = true;
+    showReaderResult(await res.json());
+}
+
+
 // =======================
 // INIT
 // =======================
 window.onload = function () {
-    console.log("OCR_TEXT:", OCR_TEXT);
-    console.log("HARD_WORDS:", HARD_WORDS);
-    console.log("SYLLABLES:", SYLLABLES);
+    document.getElementById("readerForm").addEventListener("submit", submitReaderForm);
 
-    renderText();
+    if (READER_JOB_ID) {
+        pollJob(READER_JOB_ID);
+    } else if (READER_DOCUMENT_URL) {
+        loadDocument(READER_DOCUMENT_URL);
+    }
 };
@@ -1,3 +1,46 @@
-from django.contrib import admin
+from django.contrib import admin, messages
 
-# Register your models here.
+from .models import ReadingPack, ReadingPackItem, SharedDocument
+
+
+class ReadingPackItemInline(admin.TabularInline):
+    model = ReadingPackItem
+    extra = 0
+    raw_id_fields = ('document',)
+
+
+@admin.register(ReadingPack)
+class ReadingPackAdmin(admin.ModelAdmin):
+    list_display = ('name', 'status', 'documents_done', 'documents_total', 'created_by', 'updated_at')
+    list_filter = ('status',)
+    search_fields = ('name',)
+    readonly_fields = ('status', 'error', 'documents_done', 'documents_total', 'created_at', 'updated_at')
+    inlines = (ReadingPackItemInline,)
+    actions = ('prepare_packs',)
+
+    def save_model(self, request, obj, form, change):
+        if not obj.created_by_id:
+            obj.created_by = request.user
+        super().save_model(request, obj, form, change)
+
+    @admin.action(description='Prepare documents from the uploaded zip')
+    def prepare_packs(self, request, queryset):
+        from .ingest import submit_pack
+
+        queued = 0
+        for pack in queryset:
+            if not pack.archive:
+                self.message_user(request, f'"{pack}" has no zip uploaded.', messages.WARNING)
+                continue
+            submit_pack(pack)
+            queued += 1
+        if queued:
+            self.message_user(request, f'{queued} pack(s) queued; refresh to follow progress.')
+
+
+@admin.register(SharedDocument)
+class SharedDocumentAdmin(admin.ModelAdmin):
+    list_display = ('file_name', 'file_type', 'status', 'page_count', 'processing_time', 'updated_at')
+    list_filter = ('status', 'file_type')
+    search_fields = ('file_name', 'content_hash')
+    readonly_fields = ('content_hash', 'created_at', 'updated_at')
@@ -0,0 +1,300 @@
+"""
+Interchangeable text-to-speech providers.
+
+  gtts     — Google Translate TTS over the network (mp3)
+  offline  — pyttsx3 driving the local espeak/SAPI/NSSpeech engine (wav)
+
+TTS_BACKENDS sets the order backends are tried in. A backend that fails
+TTS_BACKEND_MAX_FAILURES times in a row is skipped for
+TTS_BACKEND_COOLDOWN seconds, so a slow or unreachable upstream costs one
+timeout per cooldown instead of one per request.
+
+pyttsx3 engines are expensive to create and not thread-safe, so the offline
+backend runs a single long-lived synthesis worker thread per process that
+owns a warm engine. Requests reach it through a bounded queue; when the
+queue is full the request falls through to the next backend instead of
+piling up behind the engine. A full queue is load, not a fault, so it
+does not count towards the cooldown. The worker writes to a file of its
+own and only moves it into place if the request is still waiting, so a
+request that timed out never leaves audio behind.
+"""
+
+import logging
+import os
+import queue
+import tempfile
+import threading
+import time
+
+from django.conf import settings
+
+from .cache import audio_cache, audio_key
+
+logger = logging.getLogger(__name__)
+
+
+class BackendUnavailable(Exception):
+    """The backend can't take this request right now; try the next one."""
+
+
+class BackendBusy(BackendUnavailable):
+    """The backend is working, just at capacity; not counted as a failure."""
+
+
+class TTSUnavailable(Exception):
+    """Every configured backend failed."""
+
+
+class TTSBackend:
+    name = ""
+    suffix = ".mp3"
+    # Part of the audio cache key, so backends never share cached files
+    voice = ""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._skip_until = 0.0
+        self._last_error = ""
+
+    def _synthesize(self, text, path, lang):
+        raise NotImplementedError
+
+    def synthesize(self, text, path, lang="en"):
+        """Write audio for `text` to `path`, tracking consecutive failures."""
+        try:
+            self._synthesize(text, path, lang)
+            if not os.path.exists(path) or os.path.getsize(path) == 0:
+                raise BackendUnavailable(f"{self.name} produced no audio")
+        except BackendBusy:
+            raise
+        except Exception as e:
+            with self._lock:
+                self._failures += 1
+                self._last_error = str(e)
+                if self._failures >= settings.TTS_BACKEND_MAX_FAILURES:
+                    self._skip_until = time.monotonic() + settings.TTS_BACKEND_COOLDOWN
+            raise
+        with self._lock:
+            self._failures = 0
+            self._skip_until = 0.0
+
+    def available(self):
+        return time.monotonic() >= self._skip_until
+
+    def health(self):
+        return {
+            "name": self.name,
+            "available": self.available(),
+            "consecutive_failures": self._failures,
+            "last_error": self._last_error,
+        }
+
+
+class GTTSBackend(TTSBackend):
+    name = "gtts"
+
+    def _synthesize(self, text, path, lang):
+        from gtts import gTTS
+
+        gTTS(text, lang=lang, timeout=settings.TTS_GTTS_TIMEOUT).save(path)
+
+
+class _Request:
+    def __init__(self, text, path, lang):
+        self.text = text
+        self.path = path
+        self.lang = lang
+        self.error = None
+        self.abandoned = False
+        self.done = threading.Event()
+        # Orders the worker's hand-over against the caller giving up
+        self.lock = threading.Lock()
+
+
+class OfflineBackend(TTSBackend):
+    name = "offline"
+    suffix = ".wav"
+    voice = "offline"
+
+    def __init__(self):
+        super().__init__()
+        self._queue = queue.Queue(maxsize=settings.TTS_OFFLINE_QUEUE_SIZE)
+        self._worker = None
+        self._engine_error = None
+        self._voices = {}
+        self._processed = 0
+
+    def start(self):
+        """Start the synthesis worker (idempotent); the engine warms up in it."""
+        with self._lock:
+            if self._worker is None:
+                self._worker = threading.Thread(
+                    target=self._run, name="tts-offline", daemon=True)
+                self._worker.start()
+
+    def _run(self):
+        try:
+            import pyttsx3
+            engine = pyttsx3.init()
+        except Exception as e:
+            logger.warning("Offline TTS engine unavailable: %s", e)
+            engine, self._engine_error = None, e
+
+        while True:
+            request = self._queue.get()
+            if request.abandoned:
+                continue
+            tmp_path = None
+            try:
+                if engine is None:
+                    raise BackendUnavailable(f"offline engine failed to start: {self._engine_error}")
+                self._select_voice(engine, request.lang)
+                fd, tmp_path = tempfile.mkstemp(
+                    dir=os.path.dirname(request.path) or ".", suffix=f".part{self.suffix}")
+                os.close(fd)
+                engine.save_to_file(request.text, tmp_path)
+                engine.runAndWait()
+                self._processed += 1
+            except Exception as e:
+                request.error = e
+            finally:
+                with request.lock:
+                    if tmp_path is not None:
+                        try:
+                            if request.abandoned or request.error is not None:
+                                os.remove(tmp_path)
+                            else:
+                                os.replace(tmp_path, request.path)
+                        except OSError as e:
+                            request.error = request.error or e
+                    request.done.set()
+
+    def _select_voice(self, engine, lang):
+        """Switch to the first installed voice for `lang`, if there is one."""
+        if lang not in self._voices:
+            self._voices[lang] = None
+            for voice in engine.getProperty("voices"):
+                languages = [
+                    l.decode("utf-8", "ignore") if isinstance(l, bytes) else str(l)
+                    for l in (getattr(voice, "languages", None) or [])
+                ]
+                if any(lang in l for l in languages) or voice.id.endswith(f"/{lang}"):
+                    self._voices[lang] = voice.id
+                    break
+        if self._voices[lang]:
+            engine.setProperty("voice", self._voices[lang])
+
+    def _synthesize(self, text, path, lang):
+        self.start()
+        request = _Request(text, path, lang)
+        try:
+            self._queue.put_nowait(request)
+        except queue.Full:
+            raise BackendBusy("offline TTS queue is full")
+        if not request.done.wait(settings.TTS_OFFLINE_TIMEOUT):
+            with request.lock:
+                # The worker may have finished while the lock was taken
+                if not request.done.is_set():
+                    request.abandoned = True
+                    raise BackendUnavailable("offline TTS timed out")
+        if request.error is not None:
+            raise request.error
+
+    def health(self):
+        health = super().health()
+        health.update({
+            "worker_alive": self._worker is not None and self._worker.is_alive(),
+            "engine_error": str(self._engine_error or ""),
+            "queued": self._queue.qsize(),
+            "queue_size": self._queue.maxsize,
+            "processed": self._processed,
+        })
+        return health
+
+
+BACKEND_CLASSES = {
+    GTTSBackend.name: GTTSBackend,
+    OfflineBackend.name: OfflineBackend,
+}
+
+_backends = None
+_backends_lock = threading.Lock()
+
+
+def get_backends():
+    """The configured backends, in fallback order (one instance per process)."""
+    global _backends
+    with _backends_lock:
+        if _backends is None:
+            unknown = [n for n in settings.TTS_BACKENDS if n not in BACKEND_CLASSES]
+            if unknown:
+                raise ValueError(f"Unknown TTS backend(s): {', '.join(unknown)}")
+            _backends = [BACKEND_CLASSES[n]() for n in settings.TTS_BACKENDS]
+    return _backends
+
+
+def _with_fallback(attempt):
+    """Call `attempt(backend)` on each available backend until one succeeds."""
+    errors = []
+    for backend in get_backends():
+        if not backend.available():
+            errors.append(f"{backend.name}: cooling down")
+            continue
+        try:
+            return attempt(backend)
+        except Exception as e:
+            logger.warning("TTS backend %s failed: %s", backend.name, e)
+            errors.append(f"{backend.name}: {e}")
+    raise TTSUnavailable("; ".join(errors) or "no TTS backends configured")
+
+
+def synthesize_cached(text, lang="en"):
+    """
+    Return the MEDIA_ROOT-relative name of the audio for `text`.
+
+    Audio from any backend already in the content cache is reused before
+    anything is synthesised.
+    """
+    for backend in get_backends():
+        key = audio_key(text, lang, backend.voice)
+        if audio_cache.get(key, backend.suffix) is not None:
+            return audio_cache.name_for(key, backend.suffix)
+
+    def attempt(backend):
+        key = audio_key(text, lang, backend.voice)
+        audio_cache.put_with(
+            key, lambda tmp: backend.synthesize(text, tmp, lang), backend.suffix)
+        return audio_cache.name_for(key, backend.suffix)
+
+    return _with_fallback(attempt)
+
+
+def synthesize_file(text, base_path, lang="en"):
+    """
+    Write audio for `text` next to `base_path` (no extension) and return the
+    full path; the extension depends on which backend produced it.
+    """
+    directory = os.path.dirname(base_path) or "."
+    os.makedirs(directory, exist_ok=True)
+
+    def attempt(backend):
+        path = base_path + backend.suffix
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=f".part{backend.suffix}")
+        os.close(fd)
+        try:
+            backend.synthesize(text, tmp_path, lang)
+            os.replace(tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        return path
+
+    return _with_fallback(attempt)
+
+
+def health():
+    return {
+        "order": list(settings.TTS_BACKENDS),
+        "backends": [backend.health() for backend in get_backends()],
+    }
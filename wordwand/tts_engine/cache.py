@@ -0,0 +1,192 @@
+"""
+Content-addressed disk cache for reader artifacts.
+
+Extracted text is keyed by a hash of the uploaded bytes and generated audio
+by a hash of the normalised text plus language/voice, so the same worksheet
+uploaded by a whole class is processed once and every child shares one mp3.
+Files live under MEDIA_ROOT/tts_cache/<kind>/<2-char prefix>/<key><suffix>.
+A hit bumps the file's mtime; when a cache grows past its byte budget the
+least recently used files are evicted first.
+
+Eviction is size-triggered: each cache keeps a running total of the bytes
+written by this process, re-scanned from disk every TTS_CACHE_SCAN_SECONDS
+(other processes write too), and the directory tree is only walked again
+when that total is over budget. Eviction then frees down to EVICT_TO of
+the budget, so the next few writes do not trigger it again.
+"""
+
+import hashlib
+import os
+import tempfile
+import threading
+import time
+
+from django.conf import settings
+
+CACHE_DIR = "tts_cache"
+
+# Share of the byte budget an eviction frees down to
+EVICT_TO = 0.9
+
+
+def hash_bytes(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def hash_file(path, chunk_size=1024 * 1024):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def audio_key(text, lang="en", voice=""):
+    """Cache key for the audio of an already-normalised text."""
+    return hash_bytes(f"{lang}\0{voice}\0{text}".encode("utf-8"))
+
+
+class ContentCache:
+    """A size-bounded LRU cache of files addressed by content hash."""
+
+    def __init__(self, kind, suffix, max_bytes):
+        self.kind = kind
+        self.suffix = suffix
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._evict_lock = threading.Lock()
+        # Running total of the cache's bytes; None until first scanned
+        self._bytes = None
+        self._scanned_at = 0.0
+
+    @property
+    def root(self):
+        return os.path.join(settings.MEDIA_ROOT, CACHE_DIR, self.kind)
+
+    def name_for(self, key, suffix=None):
+        """Storage name relative to MEDIA_ROOT (what FileFields store)."""
+        return f"{CACHE_DIR}/{self.kind}/{key[:2]}/{key}{suffix or self.suffix}"
+
+    def path_for(self, key, suffix=None):
+        return os.path.join(self.root, key[:2], f"{key}{suffix or self.suffix}")
+
+    def get(self, key, suffix=None):
+        """Return the path for `key` if cached (marking it as used), else None."""
+        path = self.path_for(key, suffix)
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        return path
+
+    def get_text(self, key):
+        path = self.get(key)
+        if path is None:
+            return None
+        with open(path, "r", encoding="utf-8") as f:
+            return f.read()
+
+    def put_text(self, key, text):
+        return self.put_with(key, lambda tmp: _write_text(tmp, text))
+
+    def put_with(self, key, writer, suffix=None):
+        """
+        Store the file produced by `writer(tmp_path)` under `key`.
+
+        The file is written to a temporary name and renamed into place, so
+        concurrent readers never see a partial artifact. `suffix` overrides
+        the cache's default file extension.
+        """
+        path = self.path_for(key, suffix)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(
+            dir=os.path.dirname(path), suffix=f".part{suffix or self.suffix}")
+        os.close(fd)
+        try:
+            writer(tmp_path)
+            size = os.path.getsize(tmp_path)
+            os.replace(tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        with self._lock:
+            if self._bytes is not None:
+                self._bytes += size
+        return path
+
+    def _scan(self):
+        """[(mtime, size, storage name, path)] for every file, and their total size."""
+        entries, total = [], 0
+        for dirpath, _, filenames in os.walk(self.root):
+            for filename in filenames:
+                if ".part" in filename:
+                    continue
+                path = os.path.join(dirpath, filename)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                key, suffix = os.path.splitext(filename)
+                entries.append((stat.st_mtime, stat.st_size, self.name_for(key, suffix), path))
+                total += stat.st_size
+        with self._lock:
+            self._bytes = total
+            self._scanned_at = time.monotonic()
+        return entries, total
+
+    def over_budget(self):
+        """Whether `evict()` has work to do, from the running total (no walk)."""
+        with self._lock:
+            stale = (self._bytes is None
+                     or time.monotonic() - self._scanned_at >= settings.TTS_CACHE_SCAN_SECONDS)
+        if stale:
+            self._scan()
+        with self._lock:
+            return self._bytes > self.max_bytes
+
+    def evict(self, in_use=None):
+        """
+        Delete least recently used files until the cache is back under
+        EVICT_TO of its budget.
+
+        `in_use(names)` is asked only about the files about to go and
+        returns the storage names among them that are still referenced;
+        those are kept. Returns the number of files removed.
+        """
+        with self._evict_lock:
+            entries, total = self._scan()
+            if total <= self.max_bytes:
+                return 0
+
+            target = self.max_bytes * EVICT_TO
+            entries.sort()
+            removed = next_entry = 0
+            while total > target and next_entry < len(entries):
+                # Just enough of the least recently used files to reach the target
+                batch, excess = [], total - target
+                while excess > 0 and next_entry < len(entries):
+                    batch.append(entries[next_entry])
+                    excess -= entries[next_entry][1]
+                    next_entry += 1
+                keep = in_use({name for _, _, name, _ in batch}) if in_use else set()
+                for _, size, name, path in batch:
+                    if name in keep:
+                        continue
+                    try:
+                        os.remove(path)
+                    except FileNotFoundError:
+                        pass
+                    total -= size
+                    removed += 1
+            with self._lock:
+                self._bytes = total
+            return removed
+
+
+def _write_text(path, text):
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(text)
+
+
+text_cache = ContentCache("text", ".txt", settings.TTS_TEXT_CACHE_MAX_BYTES)
+audio_cache = ContentCache("audio", ".mp3", settings.TTS_AUDIO_CACHE_MAX_BYTES)
@@ -0,0 +1,241 @@
+"""
+Page-level text extraction for the reader.
+
+PDF pages and multi-page TIFF frames are extracted concurrently on a
+process pool and yielded as soon as each one finishes, so the reader can
+show page 1 while later pages are still being OCR'd. PDF pages only fall
+back to OCR (of their embedded images) when they have no text layer.
+
+`source` is either a path or, for small uploads kept in memory, the file's
+bytes. PDF pages go to the pool either way, with the bytes sent along
+(at most READER_IN_MEMORY_MAX_BYTES per task): text-layer extraction is
+pure Python and would otherwise run one page after another on the job
+thread. Each worker parses a document once and keeps it for the next
+page. In-memory TIFF frames are decoded in the calling thread, which is
+quick, and only the frames are sent.
+
+Workers are started with the "spawn" method: the pool is driven from the
+reader's job threads, and forking a multi-threaded Django process is not
+safe. Worker functions therefore take everything they need as arguments
+and never touch Django settings or the database.
+"""
+
+import hashlib
+import io
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, as_completed
+
+import cv2
+import numpy as np
+from PIL import Image
+from PyPDF2 import PdfReader
+from django.conf import settings
+
+from .ocr import ocr_image
+
+logger = logging.getLogger(__name__)
+
+IMAGE_EXTENSIONS = {"png", "jpg", "jpeg", "bmp", "tiff"}
+
+_executor = None
+_executor_lock = threading.Lock()
+
+# Per worker process: the PdfReader for the document currently being processed
+_open_pdf = {}
+
+
+def get_executor():
+    """Return the shared page-extraction pool for this process."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = make_executor(settings.READER_PAGE_WORKERS)
+    return _executor
+
+
+def make_executor(max_workers):
+    return ProcessPoolExecutor(
+        max_workers=max_workers,
+        mp_context=multiprocessing.get_context("spawn"),
+    )
+
+
+class InlineExecutor(Executor):
+    """Runs tasks immediately in the calling thread (for code that is
+    already running inside a pool worker, e.g. batch ingestion)."""
+
+    def submit(self, fn, /, *args, **kwargs):
+        future = Future()
+        try:
+            future.set_result(fn(*args, **kwargs))
+        except BaseException as e:
+            future.set_exception(e)
+        return future
+
+
+# ---------------------------------------------------------------------------
+# Worker functions (run in the pool)
+# ---------------------------------------------------------------------------
+
+def _ocr(gray, tesseract_cmd):
+    text, timings = ocr_image(gray, tesseract_cmd)
+    logger.debug("OCR stage timings: %s", timings)
+    return text
+
+
+def _pdf_reader(source):
+    if isinstance(source, bytes):
+        key = hashlib.blake2b(source, digest_size=16).digest()
+    else:
+        # Upload names can be reused once a job is done, so key on mtime too
+        key = (source, os.stat(source).st_mtime_ns)
+    if key not in _open_pdf:
+        _open_pdf.clear()
+        _open_pdf[key] = PdfReader(_open(source))
+    return _open_pdf[key]
+
+
+def _ocr_encoded_images(index, images, tesseract_cmd):
+    """OCR a scanned page from its embedded (encoded) images."""
+    parts = []
+    for data in images:
+        buffer = np.frombuffer(data, dtype=np.uint8)
+        gray = cv2.imdecode(buffer, cv2.IMREAD_GRAYSCALE)
+        if gray is not None:
+            parts.append(_ocr(gray, tesseract_cmd))
+    return index, "\n".join(parts)
+
+
+def _ocr_frame(index, gray, tesseract_cmd):
+    return index, _ocr(gray, tesseract_cmd)
+
+
+def _extract_pdf_page(source, index, tesseract_cmd):
+    page = _pdf_reader(source).pages[index]
+    text = page.extract_text() or ""
+    if text.strip():
+        return index, text
+
+    # No text layer — OCR the scanned images on the page instead
+    return _ocr_encoded_images(index, [image.data for image in page.images], tesseract_cmd)
+
+
+def _extract_image_frame(file_path, index, tesseract_cmd):
+    with Image.open(file_path) as img:
+        img.seek(index)
+        gray = np.array(img.convert("L"))
+    return _ocr_frame(index, gray, tesseract_cmd)
+
+
+def _extract_image(source, tesseract_cmd):
+    if isinstance(source, bytes):
+        img = cv2.imdecode(np.frombuffer(source, dtype=np.uint8), cv2.IMREAD_COLOR)
+    else:
+        img = cv2.imread(source)
+    if img is None:
+        raise ValueError("Could not read image file.")
+    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+    return 0, _ocr(gray, tesseract_cmd)
+
+
+def _open(source):
+    """A path, or a file object over in-memory bytes, for PdfReader / PIL."""
+    return io.BytesIO(source) if isinstance(source, bytes) else source
+
+
+def _in_memory_frames(source):
+    """Pool tasks, (function, args), for the frames of an in-memory TIFF."""
+    tasks = []
+    with Image.open(_open(source)) as img:
+        for index in range(getattr(img, "n_frames", 1)):
+            img.seek(index)
+            tasks.append((_ocr_frame, (index, np.array(img.convert("L")))))
+    return tasks
+
+
+# ---------------------------------------------------------------------------
+# Public API
+# ---------------------------------------------------------------------------
+
+def count_pages(source, file_ext):
+    """Number of pages (or TIFF frames) the file will be split into."""
+    if file_ext == "pdf":
+        return len(PdfReader(_open(source)).pages)
+    if file_ext == "tiff":
+        with Image.open(_open(source)) as img:
+            return getattr(img, "n_frames", 1)
+    return 1
+
+
+def iter_pages(source, file_ext, executor=None, page_count=None):
+    """
+    Yield (page_index, text) pairs in completion order, not page order.
+
+    PDFs and multi-page TIFFs fan out one task per page; other files are a
+    single page. Pass `executor` to use a pool other than the shared one.
+    """
+    tesseract_cmd = settings.TESSERACT_CMD
+
+    if file_ext == "txt":
+        yield 0, _read_text_file(source)
+        return
+
+    if file_ext in IMAGE_EXTENSIONS and file_ext != "tiff":
+        yield _extract_image(source, tesseract_cmd)
+        return
+
+    if file_ext not in ("pdf", "tiff"):
+        raise ValueError(f"Unsupported file type: {file_ext}")
+
+    if file_ext == "tiff" and isinstance(source, bytes):
+        tasks = _in_memory_frames(source)
+    else:
+        task = _extract_pdf_page if file_ext == "pdf" else _extract_image_frame
+        if page_count is None:
+            page_count = count_pages(source, file_ext)
+        tasks = [(task, (source, i)) for i in range(page_count)]
+
+    if len(tasks) <= 1:
+        for func, args in tasks:
+            yield func(*args, tesseract_cmd)
+        return
+
+    executor = executor or get_executor()
+    futures = [executor.submit(func, *args, tesseract_cmd) for func, args in tasks]
+    try:
+        for future in as_completed(futures):
+            yield future.result()
+    finally:
+        for future in futures:
+            future.cancel()
+
+
+def extract_pages(source, file_ext, on_page=None, executor=None):
+    """
+    Extract every page and return their texts in page order.
+
+    `on_page(index, text, page_count)` is called as each page finishes.
+    """
+    page_count = count_pages(source, file_ext)
+    pages = [""] * page_count
+    for index, text in iter_pages(source, file_ext, executor=executor,
+                                  page_count=page_count):
+        pages[index] = text
+        if on_page is not None:
+            on_page(index, text, page_count)
+    return pages
+
+
+def _read_text_file(source):
+    if not isinstance(source, bytes):
+        with open(source, "rb") as f:
+            source = f.read()
+    for encoding in ("utf-8", "latin-1"):
+        try:
+            return source.decode(encoding)
+        except UnicodeDecodeError:
+            continue
+    return ""
@@ -0,0 +1,261 @@
+"""
+Batch ingestion of documents into shared reading packs.
+
+Teachers hand over folders (or zips) of worksheets at the start of term.
+Each document is hashed, matched to a SharedDocument by content hash and,
+unless it is already prepared, run through the full reader pipeline —
+extraction, hard-word analysis and chunked audio — on a process pool, one
+document per worker. The pool only computes; the database is written from
+the calling thread as results arrive.
+
+Re-running over the same files is cheap: prepared documents are skipped,
+and a document that failed half-way reuses whatever the text and audio
+caches already hold.
+
+Pool workers import this module before Django is set up, so models are
+only imported inside the functions that run in the calling process.
+"""
+
+import logging
+import multiprocessing
+import os
+import threading
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+
+from django.conf import settings
+from django.db import close_old_connections
+
+from .cache import hash_bytes
+from .pipeline import MAX_FILE_SIZE, SNIFF_BYTES, sniff_file_type
+
+logger = logging.getLogger(__name__)
+
+
+# ---------------------------------------------------------------------------
+# Sources
+# ---------------------------------------------------------------------------
+
+def iter_sources(path):
+    """
+    Yield (title, source) for every file in a directory tree or zip.
+
+    A source is ("file", path) or ("zip", archive path, member name); it is
+    small enough to send to a pool worker, which reads the bytes itself.
+    """
+    if os.path.isdir(path):
+        for dirpath, dirnames, filenames in os.walk(path):
+            dirnames.sort()
+            for filename in sorted(filenames):
+                if filename.startswith("."):
+                    continue
+                full_path = os.path.join(dirpath, filename)
+                yield os.path.relpath(full_path, path), ("file", full_path)
+    elif zipfile.is_zipfile(path):
+        with zipfile.ZipFile(path) as archive:
+            for info in sorted(archive.infolist(), key=lambda i: i.filename):
+                name = os.path.basename(info.filename)
+                if info.is_dir() or name.startswith(".") or info.filename.startswith("__MACOSX/"):
+                    continue
+                yield info.filename, ("zip", path, info.filename)
+    else:
+        raise ValueError(f"Not a directory or zip file: {path}")
+
+
+def read_source(source):
+    if source[0] == "zip":
+        with zipfile.ZipFile(source[1]) as archive:
+            return archive.read(source[2])
+    with open(source[1], "rb") as f:
+        return f.read()
+
+
+def _source_size(source):
+    if source[0] == "zip":
+        with zipfile.ZipFile(source[1]) as archive:
+            return archive.getinfo(source[2]).file_size
+    return os.path.getsize(source[1])
+
+
+# ---------------------------------------------------------------------------
+# Worker (runs in the ingestion pool)
+# ---------------------------------------------------------------------------
+
+def _init_worker():
+    import django
+    django.setup()
+
+
+def _prepare(source, file_type):
+    from .extraction import InlineExecutor, count_pages
+    from .pipeline import process_document
+
+    data = read_source(source)
+    # Parallelism is per document here, so pages are extracted in-process
+    output = process_document(data, file_type, executor=InlineExecutor())
+    output["page_count"] = count_pages(data, file_type)
+    return output
+
+
+def make_executor(max_workers):
+    return ProcessPoolExecutor(
+        max_workers=max_workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_init_worker,
+    )
+
+
+# ---------------------------------------------------------------------------
+# Ingestion
+# ---------------------------------------------------------------------------
+
+def ingest(path, pack=None, workers=None, progress=None):
+    """
+    Ingest every document under `path` (a directory or zip), adding each
+    to `pack` if given. `progress(event, title, detail)` is called for
+    "skipped", "prepared" and "failed" documents.
+
+    Returns a stats dict (counts, pages, elapsed seconds, docs/s, pages/s).
+    """
+    from .models import ReadingPack, ReadingPackItem, SharedDocument
+
+    def report(event, title, detail=""):
+        if progress is not None:
+            progress(event, title, detail)
+
+    stats = {"total": 0, "prepared": 0, "skipped": 0, "failed": 0, "pages": 0}
+    start = time.perf_counter()
+
+    # Hash and sniff in this process so prepared documents never reach the pool
+    todo = {}
+    for position, (title, source) in enumerate(iter_sources(path)):
+        stats["total"] += 1
+        if _source_size(source) > MAX_FILE_SIZE:
+            stats["failed"] += 1
+            report("failed", title, "file too large")
+            continue
+        data = read_source(source)
+        file_type = sniff_file_type(data[:SNIFF_BYTES])
+        if file_type is None:
+            stats["failed"] += 1
+            report("failed", title, "unsupported file type")
+            continue
+
+        document, _ = SharedDocument.objects.get_or_create(
+            content_hash=hash_bytes(data),
+            defaults={"file_name": os.path.basename(title), "file_type": file_type},
+        )
+        del data
+        if pack is not None:
+            ReadingPackItem.objects.get_or_create(
+                pack=pack, document=document,
+                defaults={"title": os.path.splitext(os.path.basename(title))[0],
+                          "position": position})
+
+        if document.status == SharedDocument.STATUS_DONE or document.pk in todo:
+            stats["skipped"] += 1
+            detail = "already prepared" if document.pk not in todo else f"same as {todo[document.pk][0]}"
+            report("skipped", title, detail)
+            continue
+        todo[document.pk] = (title, source, file_type)
+
+    if pack is not None:
+        pack.documents_total = stats["total"]
+        pack.documents_done = stats["skipped"]
+        pack.save(update_fields=["documents_total", "documents_done", "updated_at"])
+
+    if todo:
+        executor = make_executor(workers or settings.READER_PAGE_WORKERS)
+        try:
+            futures = {
+                executor.submit(_prepare, source, file_type): (pk, title)
+                for pk, (title, source, file_type) in todo.items()
+            }
+            for future in as_completed(futures):
+                pk, title = futures[future]
+                document = SharedDocument.objects.get(pk=pk)
+                try:
+                    output = future.result()
+                except Exception as e:
+                    document.status = SharedDocument.STATUS_FAILED
+                    document.error = str(e)
+                    document.save(update_fields=["status", "error", "updated_at"])
+                    stats["failed"] += 1
+                    report("failed", title, str(e))
+                    continue
+
+                document.status = SharedDocument.STATUS_DONE
+                document.error = ""
+                document.extracted_text = output["text"]
+                document.audio_chunks = [{
+                    "file": c["file"], "start_word": c["start_word"], "weights": c["weights"],
+                } for c in output["audio_chunks"]]
+                document.hard_words = output["unique_hard_words"]
+                document.syllables = output["syllables"]
+                document.hard_word_positions = output["positions"]
+                document.page_count = output["page_count"]
+                document.processing_time = output["processing_time"]
+                document.save()
+
+                stats["prepared"] += 1
+                stats["pages"] += document.page_count
+                if pack is not None:
+                    ReadingPack.objects.filter(pk=pack.pk).update(
+                        documents_done=pack.documents_done + stats["prepared"])
+                report("prepared", title,
+                       f"{document.page_count} pages, {document.processing_time}s")
+        finally:
+            executor.shutdown(cancel_futures=True)
+
+    elapsed = time.perf_counter() - start
+    stats.update({
+        "elapsed": elapsed,
+        "docs_per_sec": stats["prepared"] / elapsed if elapsed else 0.0,
+        "pages_per_sec": stats["pages"] / elapsed if elapsed else 0.0,
+    })
+    return stats
+
+
+# ---------------------------------------------------------------------------
+# Packs ingested in the background (admin action)
+# ---------------------------------------------------------------------------
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def submit_pack(pack):
+    """Queue a pack's archive for ingestion; packs are ingested one at a time."""
+    from .models import ReadingPack
+
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="pack-ingest")
+    pack.status = ReadingPack.STATUS_QUEUED
+    pack.error = ""
+    pack.save(update_fields=["status", "error", "updated_at"])
+    _executor.submit(ingest_pack, pack.pk)
+
+
+def ingest_pack(pack_id):
+    from .models import ReadingPack
+
+    close_old_connections()
+    try:
+        pack = ReadingPack.objects.get(pk=pack_id)
+        pack.status = ReadingPack.STATUS_RUNNING
+        pack.save(update_fields=["status", "updated_at"])
+        try:
+            stats = ingest(pack.archive.path, pack=pack)
+            pack.status = ReadingPack.STATUS_DONE
+            if stats["failed"]:
+                pack.error = f"{stats['failed']} of {stats['total']} documents failed"
+        except Exception as e:
+            logger.exception("Reading pack %s failed", pack_id)
+            pack.status = ReadingPack.STATUS_FAILED
+            pack.error = str(e)
+        pack.save(update_fields=["status", "error", "updated_at"])
+    finally:
+        close_old_connections()
@@ -0,0 +1,263 @@
+"""
+Background processing for reader uploads.
+
+The reader view creates a ReaderJob and hands its id to a process-local
+thread pool, together with the upload's bytes when the file is small enough
+to keep in memory; larger uploads are stored on the job and read from
+disk. OCR (tesseract) and gTTS spend most of their time in subprocesses
+and network I/O, so threads keep the WSGI workers free without pickling
+anything. Job state lives in the database so any worker process can
+answer the status and result endpoints.
+
+The pool dies with its process, so a running job touches `updated_at`
+after every page and audio chunk. The status endpoints pass a job that
+has been queued or running for READER_JOB_STALE_SECONDS without a sign of
+life to `recover_stale()`: a stored upload is queued again, and a job
+whose bytes were only in the lost process's memory fails (or finishes
+without audio, if its text was already published).
+"""
+
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.db.models import Q
+from django.utils import timezone
+
+from dashboard import activity
+
+from .cache import audio_cache, text_cache
+from .models import ReaderJob, SharedDocument, TTSRequest
+from .pipeline import analyse_text, extract_document
+from .speech import split_chunks, synthesize_chunks
+
+logger = logging.getLogger(__name__)
+
+# Number of audio files kept per user before older requests are rotated out
+KEEP_REQUESTS_PER_USER = 5
+
+# Audio file names checked for references per query
+REFERENCE_BATCH = 100
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.READER_JOB_WORKERS,
+                thread_name_prefix="reader-job",
+            )
+    return _executor
+
+
+def submit_job(job, data=None):
+    """
+    Queue a saved ReaderJob for processing and return it. `data` is the
+    upload's content when it was kept in memory instead of job.upload.
+    """
+    _get_executor().submit(run_job, job.pk, data)
+    return job
+
+
+def run_job(job_id, data=None):
+    """Process one queued job. Runs on a pool thread."""
+    close_old_connections()
+    try:
+        # Claimed with a conditional update: a job recovered elsewhere (failed,
+        # or queued again and already taken) is not run twice
+        if not ReaderJob.objects.filter(pk=job_id, status=ReaderJob.STATUS_QUEUED).update(
+                status=ReaderJob.STATUS_RUNNING, updated_at=timezone.now()):
+            return
+        job = ReaderJob.objects.select_related("user").get(pk=job_id)
+
+        def on_page(index, text, page_count):
+            job.pages[str(index)] = text
+            ReaderJob.objects.filter(pk=job.pk).update(
+                pages=job.pages, page_count=page_count, updated_at=timezone.now())
+
+        try:
+            start_time = time.time()
+            source = data if data is not None else job.upload.path
+            content_hash, text = extract_document(
+                source, job.file_type, on_page=on_page)
+            analysis = analyse_text(text)
+
+            # Publish the text and hard words before any audio exists, so
+            # the reader can show them while the chunks are synthesised
+            chunks = split_chunks(text)
+            tts_request = TTSRequest.objects.create(
+                user=job.user,
+                content_hash=content_hash,
+                extracted_text=text,
+                audio_chunks=[{**c, "file": ""} for c in chunks],
+                hard_words=analysis["unique_hard_words"],
+                syllables=analysis["syllables"],
+                hard_word_positions=analysis["positions"],
+                file_type=job.file_type,
+            )
+            job.result = tts_request
+            job.pages = {}
+            job.save(update_fields=["result", "pages", "updated_at"])
+
+            def on_chunk(index, chunk):
+                tts_request.audio_chunks[index]["file"] = chunk["file"]
+                TTSRequest.objects.filter(pk=tts_request.pk).update(
+                    audio_chunks=tts_request.audio_chunks)
+                ReaderJob.objects.filter(pk=job.pk).update(updated_at=timezone.now())
+
+            try:
+                synthesize_chunks(chunks, on_chunk=on_chunk)
+            except Exception as e:
+                # The text is still usable; the player falls back to
+                # browser speech for chunks without audio
+                logger.warning("Reader job %s: audio failed: %s", job_id, e)
+                job.error = f"Audio unavailable: {e}"
+
+            tts_request.processing_time = round(time.time() - start_time, 2)
+            tts_request.save(update_fields=["processing_time"])
+            job.status = ReaderJob.STATUS_DONE
+            activity.record(job.user_id, "reader", activity.reading_seconds(text))
+        except ValueError as e:
+            job.status = ReaderJob.STATUS_FAILED
+            job.error = str(e)
+        except Exception as e:
+            logger.exception("Reader job %s failed", job_id)
+            job.status = ReaderJob.STATUS_FAILED
+            job.error = f"Error processing file: {e}"
+        finally:
+            # Always clean up the upload
+            if job.upload:
+                job.upload.delete(save=False)
+
+        job.pages = {}
+        job.save(update_fields=[
+            "status", "error", "result", "upload", "pages", "updated_at"])
+
+        if job.status == ReaderJob.STATUS_DONE:
+            _rotate_user_requests(job.user)
+            _evict_caches()
+    finally:
+        close_old_connections()
+
+
+def recover_stale(job):
+    """
+    Re-queue or close a job nothing has worked on for READER_JOB_STALE_SECONDS
+    (its process most likely restarted). Returns the job as it now stands.
+    """
+    if job.status not in (ReaderJob.STATUS_QUEUED, ReaderJob.STATUS_RUNNING):
+        return job
+    now = timezone.now()
+    cutoff = now - timedelta(seconds=settings.READER_JOB_STALE_SECONDS)
+    if job.updated_at >= cutoff:
+        return job
+
+    # Conditional, so only one request acts on a stale job
+    stale = ReaderJob.objects.filter(pk=job.pk, status=job.status, updated_at__lt=cutoff)
+    if job.result_id is not None:
+        # The text was published; the player speaks chunks without audio itself
+        if stale.update(status=ReaderJob.STATUS_DONE, pages={}, updated_at=now,
+                        error="Audio unavailable: processing was interrupted"):
+            logger.warning("Reader job %s: stale while synthesising, closed", job.pk)
+            if job.upload:
+                job.upload.delete(save=False)
+                ReaderJob.objects.filter(pk=job.pk).update(upload="")
+    elif job.upload:
+        if stale.update(status=ReaderJob.STATUS_QUEUED, pages={}, updated_at=now):
+            logger.warning("Reader job %s: stale, queued again", job.pk)
+            submit_job(job)
+    elif stale.update(status=ReaderJob.STATUS_FAILED, pages={}, updated_at=now,
+                      error="Processing was interrupted. Please upload the file again."):
+        logger.warning("Reader job %s: stale and not stored, failed", job.pk)
+    job.refresh_from_db()
+    return job
+
+
+def _evict_caches():
+    """Trim the caches, only once one is over its budget (see cache.py)."""
+    if text_cache.over_budget():
+        text_cache.evict()
+    if audio_cache.over_budget():
+        audio_cache.evict(in_use=_referenced_audio)
+
+
+def _referenced_audio(names):
+    """The storage names among `names` that a request or prepared document still plays."""
+    names = set(names)
+    found = set()
+    ordered = sorted(names)
+    for i in range(0, len(ordered), REFERENCE_BATCH):
+        batch = ordered[i:i + REFERENCE_BATCH]
+        found.update(TTSRequest.objects.filter(audio_file__in=batch)
+                     .values_list("audio_file", flat=True))
+        # Chunk lists are JSON: match the file names (content hashes, so
+        # unique) in the text, then confirm on the parsed list
+        in_chunks = Q()
+        for name in batch:
+            in_chunks |= Q(audio_chunks__icontains=os.path.basename(name))
+        for tts_request in TTSRequest.objects.filter(in_chunks).only("audio_file", "audio_chunks"):
+            found.update(names.intersection(tts_request.audio_names()))
+        # Prepared reading-pack documents keep their audio too
+        for document in SharedDocument.objects.filter(in_chunks).only("audio_chunks"):
+            found.update(names.intersection(document.audio_names()))
+    return found
+
+
+def _rotate_user_requests(user):
+    """
+    Keep only the latest requests per user. Audio files are shared between
+    requests, so a file is only deleted once nothing else points at it.
+    """
+    old_requests = list(TTSRequest.objects.filter(
+        user=user).order_by('-created_at')[KEEP_REQUESTS_PER_USER:])
+    if not old_requests:
+        return
+
+    candidates = set()
+    for request_obj in old_requests:
+        candidates.update(request_obj.audio_names())
+        request_obj.delete()
+
+    for audio_name in candidates - _referenced_audio(candidates):
+        audio_file_path = os.path.join(settings.MEDIA_ROOT, audio_name)
+        if os.path.exists(audio_file_path):
+            os.remove(audio_file_path)
+
+
+def chunk_playlist(record):
+    """Audio chunks with media URLs ("url" is empty until synthesised)."""
+    return [{
+        "url": f"{settings.MEDIA_URL}{c['file']}" if c.get("file") else "",
+        "start_word": c["start_word"],
+        "weights": c["weights"],
+    } for c in record.audio_chunks]
+
+
+def reader_payload(record):
+    """The reader's result payload for a TTSRequest or SharedDocument."""
+    audio_file = getattr(record, "audio_file", None)
+    return {
+        "text": record.extracted_text,
+        "audio_url": audio_file.url if audio_file else "",
+        "audio_chunks": chunk_playlist(record),
+        "hard_words": record.hard_words,
+        "syllables": record.syllables,
+        "hard_word_positions": record.hard_word_positions,
+        "processing_time": record.processing_time,
+    }
+
+
+def job_result(job):
+    """Return the reader payload once the job has published its text."""
+    if job.result is None:
+        return {}
+    return reader_payload(job.result)
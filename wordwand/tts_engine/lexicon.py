@@ -0,0 +1,185 @@
+"""
+Precompiled pronunciation lexicon.
+
+Loading NLTK's cmudict and words corpora costs seconds and tens of MB per
+process. `python manage.py build_lexicon` compiles them once into a flat
+binary file that is opened with mmap: nothing is parsed at start-up, and
+every worker process shares the same pages through the OS page cache.
+
+File layout (little-endian):
+
+  header   MAGIC, entry count (u32)
+  index    one u32 record offset per entry, sorted by key bytes
+  records  key \\0 flags(u8) syllables \\0 phonemes \\0
+
+`syllables` is the hyphen-separated CMU split used by the reader and
+`phonemes` the first pronunciation (space-separated, with stress digits).
+"""
+
+import logging
+import mmap
+import os
+import struct
+import tempfile
+import threading
+from collections import namedtuple
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"WWLEX\x00\x01\x00"
+HEADER_SIZE = len(MAGIC) + 4
+_OFFSET = struct.Struct("<I")
+OFFSET_SIZE = _OFFSET.size
+
+# Membership flags
+IN_CMUDICT = 1
+IN_WORDS = 2
+
+Entry = namedtuple("Entry", "flags syllables phonemes")
+
+
+def syllabify(phonemes):
+    """Group CMU phonemes into syllables, each ending at a stressed vowel."""
+    syllables, current = [], []
+    for phoneme in phonemes:
+        current.append(phoneme.rstrip('012'))
+        if phoneme[-1].isdigit():
+            syllables.append(''.join(current))
+            current = []
+    if current:
+        syllables.append(''.join(current))
+    return '-'.join(syllables)
+
+
+# ---------------------------------------------------------------------------
+# Build
+# ---------------------------------------------------------------------------
+
+def _load_corpora():
+    import nltk
+    from nltk.corpus import cmudict, words as english_words
+
+    for corpus in ('cmudict', 'words'):
+        try:
+            nltk.data.find(f'corpora/{corpus}')
+        except LookupError:
+            nltk.download(corpus)
+    return cmudict.dict(), english_words.words()
+
+
+def build(path=None):
+    """Compile the NLTK corpora into a lexicon file; returns the entry count."""
+    path = path or settings.LEXICON_PATH
+    cmu, words = _load_corpora()
+
+    entries = {}
+    for word, pronunciations in cmu.items():
+        phonemes = pronunciations[0]
+        entries[word.lower()] = [IN_CMUDICT, syllabify(phonemes), ' '.join(phonemes)]
+    for word in words:
+        entry = entries.setdefault(word.lower(), [0, '', ''])
+        entry[0] |= IN_WORDS
+
+    keys = sorted(k.encode('utf-8') for k in entries)
+    offsets, records, position = [], [], HEADER_SIZE + OFFSET_SIZE * len(keys)
+    for key in keys:
+        flags, syllables, phonemes = entries[key.decode('utf-8')]
+        record = b''.join([
+            key, b'\0', bytes([flags]),
+            syllables.encode('ascii'), b'\0', phonemes.encode('ascii'), b'\0',
+        ])
+        offsets.append(position)
+        records.append(record)
+        position += len(record)
+
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.part')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(MAGIC)
+            f.write(len(keys).to_bytes(4, 'little'))
+            for offset in offsets:
+                f.write(_OFFSET.pack(offset))
+            f.writelines(records)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return len(keys)
+
+
+# ---------------------------------------------------------------------------
+# Lookup
+# ---------------------------------------------------------------------------
+
+class Lexicon:
+    """Read-only, memory-mapped view of a compiled lexicon file."""
+
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._mm[:len(MAGIC)] != MAGIC:
+            self._mm.close()
+            raise ValueError(f"Not a lexicon file (or an old format): {path}")
+        self._count = int.from_bytes(self._mm[len(MAGIC):HEADER_SIZE], 'little')
+
+    def __len__(self):
+        return self._count
+
+    def __contains__(self, word):
+        return self.lookup(word) is not None
+
+    def lookup(self, word):
+        """Return the Entry for a lower-case word, or None."""
+        key = word.encode('utf-8')
+        mm, unpack = self._mm, _OFFSET.unpack_from
+        lo, hi = 0, self._count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            offset, = unpack(mm, HEADER_SIZE + OFFSET_SIZE * mid)
+            end = mm.find(b'\0', offset)
+            candidate = mm[offset:end]
+            if candidate < key:
+                lo = mid + 1
+            elif candidate > key:
+                hi = mid
+            else:
+                flags = mm[end + 1]
+                syl_end = mm.find(b'\0', end + 2)
+                ph_end = mm.find(b'\0', syl_end + 1)
+                return Entry(
+                    flags,
+                    mm[end + 2:syl_end].decode('ascii'),
+                    mm[syl_end + 1:ph_end].decode('ascii'),
+                )
+        return None
+
+
+_lexicon = None
+_lexicon_lock = threading.Lock()
+
+
+def get_lexicon():
+    """
+    The process-wide lexicon, opened on first use. If the file has not been
+    built yet it is compiled now (slow, once) so the reader still works.
+    """
+    global _lexicon
+    if _lexicon is None:
+        with _lexicon_lock:
+            if _lexicon is None:
+                path = settings.LEXICON_PATH
+                if not os.path.exists(path):
+                    logger.warning(
+                        "Lexicon %s missing; building it now "
+                        "(run `manage.py build_lexicon` at deploy time)", path)
+                    build(path)
+                _lexicon = Lexicon(path)
+    return _lexicon
+
+
+def lookup(word):
+    return get_lexicon().lookup(word)
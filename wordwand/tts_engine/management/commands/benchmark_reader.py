@@ -0,0 +1,244 @@
+"""
+Management command: python manage.py benchmark_reader <benchmark> [options]
+
+Wall-clock benchmarks for the reader pipeline:
+  pdf <file>   page-parallel extraction vs worker count
+               (use a long mixed scanned/text PDF, e.g. 50 pages)
+  ocr <image>  raw tesseract vs the preprocessing engine, per stage
+  lexicon      cold start and peak RSS: NLTK corpora vs the compiled lexicon
+  analysis     hard-word analysis of a book (default: 200 generated pages)
+"""
+
+import json
+import os
+import subprocess
+import sys
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+
+# Run in a fresh interpreter so import cost and RSS aren't hidden by this one
+_LEXICON_PROBE = '''
+import json, sys, time
+sys.path.insert(0, sys.argv[2])
+words = sys.argv[3].split(",")
+start = time.perf_counter()
+if sys.argv[1] == "nltk":
+    from nltk.corpus import cmudict, words as english_words
+    cmu = cmudict.dict()
+    english = set(english_words.words())
+    lookup = cmu.get
+elif sys.argv[1] == "lexicon":
+    from tts_engine.lexicon import Lexicon
+    lookup = Lexicon(sys.argv[4]).lookup
+else:
+    lookup = lambda word: None
+load = time.perf_counter() - start
+start = time.perf_counter()
+for _ in range(20):
+    for word in words:
+        lookup(word)
+lookups = time.perf_counter() - start
+try:
+    import resource
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    rss = rss / 1024 if sys.platform == "darwin" else rss
+except ImportError:
+    rss = None
+print(json.dumps({"load": load, "lookup_us": lookups / (20 * len(words)) * 1e6, "rss_mb": rss}))
+'''
+
+_SAMPLE_WORDS = (
+    'the,reading,elephant,together,remember,dinosaur,because,umbrella,'
+    'beautiful,xylophone,wordwand,adventure,butterfly,through,knight'
+)
+
+
+def _worker_counts(value):
+    try:
+        return [int(n) for n in value.split(',') if n.strip()]
+    except ValueError:
+        raise CommandError(f'Invalid worker list: {value!r}')
+
+
+class Command(BaseCommand):
+    help = 'Benchmarks the reader pipeline (see module docstring)'
+
+    def add_arguments(self, parser):
+        sub = parser.add_subparsers(dest='benchmark', required=True)
+
+        pdf = sub.add_parser('pdf', help='Page-parallel PDF extraction')
+        pdf.add_argument('file', help='Path to the PDF to extract')
+        pdf.add_argument(
+            '--workers', type=_worker_counts,
+            default=None,
+            help='Comma-separated worker counts (default: 1,2,4,… up to the core count)')
+        pdf.add_argument('--repeat', type=int, default=3,
+                         help='Runs per worker count; the best time is reported')
+
+        ocr = sub.add_parser('ocr', help='OCR preprocessing stages')
+        ocr.add_argument('file', help='Path to a photo or scan')
+        ocr.add_argument('--threads', type=int, default=None,
+                         help='Region OCR threads (default: tts_engine.ocr.REGION_THREADS)')
+
+        analysis = sub.add_parser('analysis', help='Hard-word / syllable analysis')
+        analysis.add_argument('file', nargs='?', default=None,
+                              help='Plain-text book (default: generate one)')
+        analysis.add_argument('--pages', type=int, default=200,
+                              help='Pages to generate when no file is given')
+        analysis.add_argument('--repeat', type=int, default=3,
+                              help='Runs per variant; the best time is reported')
+
+        lexicon = sub.add_parser('lexicon', help='Lexicon cold start and memory')
+        lexicon.add_argument('--path', default=None,
+                             help='Compiled lexicon (default: settings.LEXICON_PATH)')
+
+    def handle(self, *args, **options):
+        getattr(self, f"_bench_{options['benchmark']}")(options)
+
+    # ─── PDF extraction ───────────────────────────────────────────────────────
+
+    def _bench_pdf(self, options):
+        from tts_engine.extraction import count_pages, extract_pages, make_executor
+
+        path = options['file']
+        if not os.path.exists(path):
+            raise CommandError(f'No such file: {path}')
+
+        workers = options['workers']
+        if not workers:
+            cores = os.cpu_count() or 1
+            workers = [1]
+            while workers[-1] * 2 <= cores:
+                workers.append(workers[-1] * 2)
+            if workers[-1] != cores:
+                workers.append(cores)
+
+        pages = count_pages(path, 'pdf')
+        self.stdout.write(f'{path}: {pages} pages, {os.cpu_count()} cores')
+        self.stdout.write(f'{"workers":>8} {"best (s)":>10} {"pages/s":>9} {"speedup":>8}')
+
+        baseline = None
+        for count in workers:
+            executor = make_executor(count)
+            try:
+                # Warm the pool so process start-up isn't timed
+                list(executor.map(abs, range(count)))
+                best = None
+                for _ in range(options['repeat']):
+                    start = time.perf_counter()
+                    extract_pages(path, 'pdf', executor=executor)
+                    elapsed = time.perf_counter() - start
+                    best = elapsed if best is None else min(best, elapsed)
+            finally:
+                executor.shutdown()
+
+            baseline = baseline or best
+            self.stdout.write(
+                f'{count:>8} {best:>10.2f} {pages / best:>9.1f} {baseline / best:>7.2f}x')
+
+    # ─── OCR preprocessing ────────────────────────────────────────────────────
+
+    def _bench_ocr(self, options):
+        import cv2
+        import pytesseract
+        from django.conf import settings
+        from tts_engine import ocr
+
+        img = cv2.imread(options['file'])
+        if img is None:
+            raise CommandError(f'Could not read image: {options["file"]}')
+        gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+        self.stdout.write(f'{options["file"]}: {gray.shape[1]}x{gray.shape[0]} px')
+
+        pytesseract.pytesseract.tesseract_cmd = settings.TESSERACT_CMD
+        start = time.perf_counter()
+        raw_text = pytesseract.image_to_string(gray)
+        raw = time.perf_counter() - start
+
+        threads = options['threads'] or ocr.REGION_THREADS
+        start = time.perf_counter()
+        text, timings = ocr.ocr_image(gray, settings.TESSERACT_CMD, threads=threads)
+        total = time.perf_counter() - start
+
+        for stage, seconds in timings.items():
+            self.stdout.write(f'  {stage:<10} {seconds:>8.3f}s')
+        self.stdout.write(f'  {"total":<10} {total:>8.3f}s  (raw tesseract {raw:.3f}s, '
+                          f'{raw / total:.2f}x)')
+        self.stdout.write(f'  words: raw {len(raw_text.split())}, preprocessed {len(text.split())}')
+
+    # ─── Text analysis ────────────────────────────────────────────────────────
+
+    def _bench_analysis(self, options):
+        import random
+        import re
+
+        from tts_engine import pipeline
+
+        if options['file']:
+            with open(options['file'], encoding='utf-8', errors='ignore') as f:
+                text = pipeline.clean_text(f.read())
+        else:
+            # ~300 words a page, drawn from a realistic mix of word lengths
+            vocabulary = _SAMPLE_WORDS.split(',') + sorted(pipeline.COMMON_WORDS)
+            vocabulary += [f'{w}{s}' for w in vocabulary for s in ('s', 'ed', 'ing', '.', ',')]
+            rng = random.Random(0)
+            text = ' '.join(rng.choice(vocabulary) for _ in range(options['pages'] * 300))
+        self.stdout.write(f'{len(text.split(" "))} words, {len(text) / 1024:.0f} KB')
+
+        def legacy(text):
+            words_raw = re.findall(r"\b[\w']+\b", text)
+            hard_words = [w.lower() for w in words_raw if pipeline.is_hard(
+                re.sub(r"[^\w]", "", w.lower()))]
+            unique = sorted(set(hard_words))
+            return hard_words, {w: pipeline.split_into_syllables(w) for w in unique}
+
+        def cold(text):
+            pipeline._hard_tokens.cache_clear()
+            pipeline._syllables.cache_clear()
+            return pipeline.analyse_text(text)
+
+        pipeline.lexicon.get_lexicon()  # opening the lexicon isn't analysis time
+        results = {}
+        for name, func in (('legacy', legacy), ('cold', cold), ('warm', pipeline.analyse_text)):
+            best = None
+            for _ in range(options['repeat']):
+                start = time.perf_counter()
+                func(text)
+                elapsed = time.perf_counter() - start
+                best = elapsed if best is None else min(best, elapsed)
+            results[name] = best
+
+        if pipeline.analyse_text(text)['hard_words'] != legacy(text)[0]:
+            raise CommandError('Analysis engine disagrees with the legacy hard-word list')
+        for name, best in results.items():
+            self.stdout.write(f'  {name:<8} {best:>8.3f}s  {results["legacy"] / best:>6.1f}x')
+
+    # ─── Lexicon ──────────────────────────────────────────────────────────────
+
+    def _bench_lexicon(self, options):
+        from django.conf import settings
+
+        path = options['path'] or settings.LEXICON_PATH
+        if not os.path.exists(path):
+            raise CommandError(f'No lexicon at {path}; run `manage.py build_lexicon` first')
+
+        results = {}
+        for mode in ('baseline', 'nltk', 'lexicon'):
+            output = subprocess.run(
+                [sys.executable, '-c', _LEXICON_PROBE, mode,
+                 str(settings.BASE_DIR), _SAMPLE_WORDS, path],
+                capture_output=True, text=True)
+            if output.returncode != 0:
+                raise CommandError(f'{mode} probe failed:\n{output.stderr}')
+            results[mode] = json.loads(output.stdout)
+
+        base_rss = results['baseline']['rss_mb']
+        self.stdout.write(f'{"":<10} {"load (s)":>9} {"lookup (µs)":>12} {"peak RSS (MB)":>14}')
+        for mode in ('nltk', 'lexicon'):
+            r = results[mode]
+            rss = '-' if r['rss_mb'] is None else f'{r["rss_mb"] - base_rss:+.1f}'
+            self.stdout.write(f'{mode:<10} {r["load"]:>9.3f} {r["lookup_us"]:>12.2f} {rss:>14}')
+        self.stdout.write('  RSS is relative to a bare interpreter; lexicon pages are '
+                          'file-backed and shared between workers via the page cache.')
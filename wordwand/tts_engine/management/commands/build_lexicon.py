@@ -0,0 +1,33 @@
+"""
+Management command: python manage.py build_lexicon [--output PATH]
+
+Compiles NLTK's cmudict and words corpora into the memory-mapped lexicon
+read by tts_engine.lexicon (settings.LEXICON_PATH by default). Run it at
+deploy time, after installing the NLTK data; the swap is atomic, so it is
+safe to rebuild while the site is running.
+"""
+
+import os
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = 'Compiles the CMU pronunciation lexicon for the reader'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', default=None,
+                            help='Lexicon file to write (default: settings.LEXICON_PATH)')
+
+    def handle(self, *args, **options):
+        from tts_engine.lexicon import build
+
+        path = options['output'] or settings.LEXICON_PATH
+        start = time.perf_counter()
+        count = build(path)
+        elapsed = time.perf_counter() - start
+        size = os.path.getsize(path)
+        self.stdout.write(self.style.SUCCESS(
+            f'✅  {count} entries, {size / 1024 / 1024:.1f} MB → {path} ({elapsed:.1f}s)'))
@@ -0,0 +1,67 @@
+"""
+Management command: python manage.py ingest_documents <dir or zip> [--pack NAME] [--workers N]
+
+Prepares a folder or zip of worksheets / story PDFs as shared documents
+(text, hard words, syllables and audio), optionally grouped into a
+reading pack. Safe to re-run: documents already prepared are skipped by
+content hash, so an interrupted run simply resumes.
+"""
+
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = 'Batch-ingests documents into shared reading packs'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Directory or zip file of documents')
+        parser.add_argument('--pack', default=None,
+                            help='Reading pack to add the documents to (created if missing)')
+        parser.add_argument('--workers', type=int, default=None,
+                            help='Ingestion processes (default: READER_PAGE_WORKERS)')
+
+    def handle(self, *args, **options):
+        from tts_engine.ingest import ingest
+        from tts_engine.models import ReadingPack
+
+        path = options['path']
+        if not os.path.exists(path):
+            raise CommandError(f'No such file or directory: {path}')
+
+        pack = None
+        if options['pack']:
+            pack, _ = ReadingPack.objects.get_or_create(name=options['pack'])
+            pack.status = ReadingPack.STATUS_RUNNING
+            pack.save(update_fields=['status', 'updated_at'])
+
+        styles = {'prepared': self.style.SUCCESS, 'skipped': str, 'failed': self.style.ERROR}
+        done = 0
+
+        def progress(event, title, detail):
+            nonlocal done
+            done += 1
+            self.stdout.write(styles[event](f'  [{done}] {event:<8} {title}  {detail}'))
+
+        try:
+            stats = ingest(path, pack=pack, workers=options['workers'], progress=progress)
+        except Exception as e:
+            if pack is not None:
+                pack.status, pack.error = ReadingPack.STATUS_FAILED, str(e)
+                pack.save(update_fields=['status', 'error', 'updated_at'])
+            if isinstance(e, ValueError):
+                raise CommandError(str(e))
+            raise
+
+        if pack is not None:
+            pack.status = ReadingPack.STATUS_DONE
+            pack.error = f'{stats["failed"]} documents failed' if stats['failed'] else ''
+            pack.save(update_fields=['status', 'error', 'updated_at'])
+
+        self.stdout.write(
+            f'{stats["total"]} documents: {stats["prepared"]} prepared, '
+            f'{stats["skipped"]} already prepared, {stats["failed"]} failed')
+        self.stdout.write(self.style.SUCCESS(
+            f'✅  {stats["pages"]} pages in {stats["elapsed"]:.1f}s — '
+            f'{stats["docs_per_sec"]:.2f} docs/s, {stats["pages_per_sec"]:.2f} pages/s'))
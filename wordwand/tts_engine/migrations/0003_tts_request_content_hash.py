@@ -0,0 +1,18 @@
+# Generated by Django 6.0.1 on 2026-10-18 10:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tts_engine', '0002_reader_job'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ttsrequest',
+            name='content_hash',
+            field=models.CharField(blank=True, db_index=True, max_length=64),
+        ),
+    ]
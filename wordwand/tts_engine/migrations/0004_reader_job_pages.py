@@ -0,0 +1,23 @@
+# Generated by Django 6.0.1 on 2026-10-18 11:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tts_engine', '0003_tts_request_content_hash'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='readerjob',
+            name='page_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='readerjob',
+            name='pages',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 6.0.1 on 2026-10-18 11:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tts_engine', '0004_reader_job_pages'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ttsrequest',
+            name='audio_chunks',
+            field=models.JSONField(blank=True, default=list),
+        ),
+    ]
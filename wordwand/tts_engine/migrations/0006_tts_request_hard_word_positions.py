@@ -0,0 +1,18 @@
+# Generated by Django 6.0.1 on 2026-10-18 14:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tts_engine', '0005_tts_request_audio_chunks'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ttsrequest',
+            name='hard_word_positions',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
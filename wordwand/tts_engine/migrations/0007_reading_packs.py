@@ -0,0 +1,73 @@
+# Generated by Django 6.0.1 on 2026-10-18 15:20
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tts_engine', '0006_tts_request_hard_word_positions'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SharedDocument',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('content_hash', models.CharField(max_length=64, unique=True)),
+                ('file_name', models.CharField(blank=True, max_length=255)),
+                ('file_type', models.CharField(blank=True, max_length=10)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('done', 'Done'), ('failed', 'Failed')], default='pending', max_length=10)),
+                ('error', models.TextField(blank=True)),
+                ('extracted_text', models.TextField(blank=True)),
+                ('audio_chunks', models.JSONField(blank=True, default=list)),
+                ('hard_words', models.JSONField(blank=True, default=list)),
+                ('syllables', models.JSONField(blank=True, default=dict)),
+                ('hard_word_positions', models.JSONField(blank=True, default=dict)),
+                ('page_count', models.PositiveIntegerField(default=0)),
+                ('processing_time', models.FloatField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ReadingPack',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=200)),
+                ('archive', models.FileField(blank=True, null=True, upload_to='reading_packs/')),
+                ('status', models.CharField(choices=[('queued', 'Queued'), ('running', 'Running'), ('done', 'Done'), ('failed', 'Failed')], default='queued', max_length=10)),
+                ('error', models.TextField(blank=True)),
+                ('documents_total', models.PositiveIntegerField(default=0)),
+                ('documents_done', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('created_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='reading_packs', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='ReadingPackItem',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('title', models.CharField(max_length=255)),
+                ('position', models.PositiveIntegerField(default=0)),
+                ('pack', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='items', to='tts_engine.readingpack')),
+                ('document', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='items', to='tts_engine.shareddocument')),
+            ],
+            options={
+                'ordering': ['position'],
+                'unique_together': {('pack', 'document')},
+            },
+        ),
+        migrations.AddField(
+            model_name='readingpack',
+            name='documents',
+            field=models.ManyToManyField(related_name='packs', through='tts_engine.ReadingPackItem', to='tts_engine.shareddocument'),
+        ),
+    ]
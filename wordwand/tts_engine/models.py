@@ -1,4 +1,5 @@
-from django.db import models
+import uuid
+
 from django.db import models
 from django.conf import settings
 
@@ -22,27 +23,213 @@ class TTSRequest(models.Model):
         blank=True
     )
 
+    # SHA-256 of the uploaded bytes (shared with the extraction cache)
+    content_hash = models.CharField(max_length=64, blank=True, db_index=True)
+
     # Extracted and cleaned text
     extracted_text = models.TextField()
 
-    # Generated audio file
+    # Generated audio file — may be a shared tts_cache/ artifact used by
+    # other requests, so never delete it without checking references
     audio_file = models.FileField(
         upload_to="tts_audio/",
         null=True,
         blank=True
     )
 
+    # Sentence-aligned audio playlist, in order:
+    # [{"file": "<media name>", "start_word": n, "weights": [...]}, ...]
+    # "file" is empty until that chunk has been synthesised
+    audio_chunks = models.JSONField(default=list, blank=True)
+
     # Hard words detected (stored as JSON)
     hard_words = models.JSONField(default=list, blank=True)
 
     # Syllable breakdown
     syllables = models.JSONField(default=dict, blank=True)
 
+    # Word index (data-index of the span) of every hard-word occurrence:
+    # {"word": [3, 17, ...]}
+    hard_word_positions = models.JSONField(default=dict, blank=True)
+
     # Metadata
     file_type = models.CharField(max_length=10, blank=True)
     processing_time = models.FloatField(null=True, blank=True)  # seconds
 
     created_at = models.DateTimeField(auto_now_add=True)
 
+    def audio_names(self):
+        """Every media file this request plays (whole-document and chunks)."""
+        names = [c["file"] for c in self.audio_chunks if c.get("file")]
+        if self.audio_file:
+            names.append(str(self.audio_file))
+        return names
+
     def __str__(self):
         return f"TTS Request by {self.user.username} on {self.created_at.strftime('%Y-%m-%d %H:%M')}"
+
+
+class ReaderJob(models.Model):
+    """
+    A reader upload waiting for, or going through, background processing.
+    The request worker only stores the upload and returns the job id; the
+    job pool fills in `result` (or `error`) once processing finishes.
+    """
+
+    STATUS_QUEUED = "queued"
+    STATUS_RUNNING = "running"
+    STATUS_DONE = "done"
+    STATUS_FAILED = "failed"
+    STATUS_CHOICES = [
+        (STATUS_QUEUED, "Queued"),
+        (STATUS_RUNNING, "Running"),
+        (STATUS_DONE, "Done"),
+        (STATUS_FAILED, "Failed"),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="reader_jobs"
+    )
+
+    # Upload kept on disk until the worker has processed it
+    upload = models.FileField(upload_to="tts_uploads/", null=True, blank=True)
+    file_name = models.CharField(max_length=255, blank=True)
+    file_type = models.CharField(max_length=10, blank=True)
+
+    status = models.CharField(
+        max_length=10, choices=STATUS_CHOICES, default=STATUS_QUEUED)
+    error = models.TextField(blank=True)
+
+    # Partial extraction results, streamed while the job is running:
+    # {"<page index>": "<text>"} — cleared once the job finishes
+    page_count = models.PositiveIntegerField(default=0)
+    pages = models.JSONField(default=dict, blank=True)
+
+    # Finished output (cleared if the request is rotated out)
+    result = models.ForeignKey(
+        TTSRequest,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="jobs"
+    )
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ["-created_at"]
+
+    def __str__(self):
+        return f"Reader job {self.id} ({self.status}) by {self.user.username}"
+
+    @property
+    def is_finished(self):
+        return self.status in (self.STATUS_DONE, self.STATUS_FAILED)
+
+
+class SharedDocument(models.Model):
+    """
+    A document prepared ahead of time by batch ingestion (see ingest.py),
+    shared by every child who opens it. Identified by the SHA-256 of its
+    bytes, so re-ingesting the same file is a no-op.
+    """
+
+    STATUS_PENDING = "pending"
+    STATUS_DONE = "done"
+    STATUS_FAILED = "failed"
+    STATUS_CHOICES = [
+        (STATUS_PENDING, "Pending"),
+        (STATUS_DONE, "Done"),
+        (STATUS_FAILED, "Failed"),
+    ]
+
+    content_hash = models.CharField(max_length=64, unique=True)
+    file_name = models.CharField(max_length=255, blank=True)
+    file_type = models.CharField(max_length=10, blank=True)
+    status = models.CharField(
+        max_length=10, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    error = models.TextField(blank=True)
+
+    # Same shape as the matching TTSRequest fields
+    extracted_text = models.TextField(blank=True)
+    audio_chunks = models.JSONField(default=list, blank=True)
+    hard_words = models.JSONField(default=list, blank=True)
+    syllables = models.JSONField(default=dict, blank=True)
+    hard_word_positions = models.JSONField(default=dict, blank=True)
+
+    page_count = models.PositiveIntegerField(default=0)
+    processing_time = models.FloatField(null=True, blank=True)  # seconds
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def audio_names(self):
+        return [c["file"] for c in self.audio_chunks if c.get("file")]
+
+    def __str__(self):
+        return f"{self.file_name or self.content_hash[:12]} ({self.status})"
+
+
+class ReadingPack(models.Model):
+    """
+    A named set of shared documents prepared for a class, e.g. from a zip
+    of worksheets uploaded at the start of term.
+    """
+
+    STATUS_QUEUED = "queued"
+    STATUS_RUNNING = "running"
+    STATUS_DONE = "done"
+    STATUS_FAILED = "failed"
+    STATUS_CHOICES = [
+        (STATUS_QUEUED, "Queued"),
+        (STATUS_RUNNING, "Running"),
+        (STATUS_DONE, "Done"),
+        (STATUS_FAILED, "Failed"),
+    ]
+
+    name = models.CharField(max_length=200)
+    created_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="reading_packs"
+    )
+
+    # Zip of documents, ingested by the admin action
+    archive = models.FileField(upload_to="reading_packs/", null=True, blank=True)
+
+    documents = models.ManyToManyField(
+        SharedDocument, through="ReadingPackItem", related_name="packs")
+
+    status = models.CharField(
+        max_length=10, choices=STATUS_CHOICES, default=STATUS_QUEUED)
+    error = models.TextField(blank=True)
+    documents_total = models.PositiveIntegerField(default=0)
+    documents_done = models.PositiveIntegerField(default=0)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ["-created_at"]
+
+    def __str__(self):
+        return self.name
+
+
+class ReadingPackItem(models.Model):
+    pack = models.ForeignKey(ReadingPack, on_delete=models.CASCADE, related_name="items")
+    document = models.ForeignKey(SharedDocument, on_delete=models.CASCADE, related_name="items")
+    title = models.CharField(max_length=255)
+    position = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        ordering = ["position"]
+        unique_together = ("pack", "document")
+
+    def __str__(self):
+        return f"{self.pack.name}: {self.title}"
@@ -0,0 +1,185 @@
+"""
+OCR preprocessing for photographed and scanned worksheets.
+
+Phone photos are often 12 MP with uneven lighting and a slight tilt, which
+makes tesseract both slow and inaccurate. Before OCR each image goes through:
+
+  1. resize   — scale so body text is about TARGET_TEXT_HEIGHT px tall
+                (what tesseract is tuned for at ~300 DPI), whatever the
+                camera resolution
+  2. threshold — adaptive (local) binarisation, robust to shadows
+  3. deskew   — rotate by the dominant text angle
+  4. regions  — find text blocks so tesseract only sees cropped regions,
+                which are then OCR'd in parallel
+
+Every stage is timed; `ocr_image` returns the timings with the text.
+Nothing here touches Django settings, so it is safe to call from the
+extraction process pool.
+"""
+
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import numpy as np
+import pytesseract
+
+TARGET_TEXT_HEIGHT = 30   # px, height of a typical lower-case letter + ascender
+MAX_SIDE = 4000           # images are capped at this size before analysis
+MIN_SCALE, MAX_SCALE = 0.2, 3.0
+MIN_REGION_AREA = 400     # px² after resizing; smaller blobs are noise
+REGION_PADDING = 8        # px kept around each detected block
+REGION_THREADS = 4        # tesseract runs as a subprocess, so threads scale
+MAX_REGIONS = 32          # past this, one full-page call beats per-region start-up
+
+# Each region is a block of text, not a full page
+REGION_CONFIG = "--psm 6"
+
+
+class Timer:
+    """Collects per-stage durations in seconds."""
+
+    def __init__(self):
+        self.timings = {}
+        self._last = time.perf_counter()
+
+    def lap(self, stage):
+        now = time.perf_counter()
+        self.timings[stage] = round(now - self._last, 4)
+        self._last = now
+
+
+# ---------------------------------------------------------------------------
+# Stages
+# ---------------------------------------------------------------------------
+
+def estimate_text_height(gray):
+    """Median height (px) of letter-sized connected components, or None."""
+    _, binary = cv2.threshold(
+        gray, 0, 255, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)
+    count, _, stats, _ = cv2.connectedComponentsWithStats(binary, connectivity=8)
+    if count <= 1:
+        return None
+
+    heights = stats[1:, cv2.CC_STAT_HEIGHT]
+    widths = stats[1:, cv2.CC_STAT_WIDTH]
+    # Letters are roughly as tall as they are wide; drop lines, dots and blobs
+    keep = (heights >= 4) & (widths >= 2) & (widths <= heights * 3) & (heights <= gray.shape[0] // 4)
+    if not keep.any():
+        return None
+    return float(np.median(heights[keep]))
+
+
+def resize_for_ocr(gray):
+    """Scale the image so its text is about TARGET_TEXT_HEIGHT px tall."""
+    height, width = gray.shape[:2]
+    if max(height, width) > MAX_SIDE:
+        factor = MAX_SIDE / max(height, width)
+        gray = cv2.resize(gray, None, fx=factor, fy=factor,
+                          interpolation=cv2.INTER_AREA)
+
+    text_height = estimate_text_height(gray)
+    if not text_height:
+        return gray
+
+    scale = min(max(TARGET_TEXT_HEIGHT / text_height, MIN_SCALE), MAX_SCALE)
+    if abs(scale - 1.0) < 0.1:
+        return gray
+    interpolation = cv2.INTER_AREA if scale < 1 else cv2.INTER_CUBIC
+    return cv2.resize(gray, None, fx=scale, fy=scale, interpolation=interpolation)
+
+
+def binarise(gray):
+    """Adaptive threshold: dark text on a white background."""
+    blurred = cv2.GaussianBlur(gray, (3, 3), 0)
+    return cv2.adaptiveThreshold(
+        blurred, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY, 31, 15)
+
+
+def deskew(binary):
+    """Rotate a binarised page so its text lines are horizontal."""
+    coords = cv2.findNonZero(255 - binary)
+    if coords is None or len(coords) < 50:
+        return binary
+
+    angle = cv2.minAreaRect(coords)[-1]
+    # minAreaRect reports angles in (0, 90]; map to the nearest skew
+    if angle > 45:
+        angle -= 90
+    if abs(angle) < 0.5 or abs(angle) > 15:
+        return binary
+
+    height, width = binary.shape[:2]
+    matrix = cv2.getRotationMatrix2D((width / 2, height / 2), angle, 1.0)
+    return cv2.warpAffine(
+        binary, matrix, (width, height),
+        flags=cv2.INTER_NEAREST, borderMode=cv2.BORDER_CONSTANT, borderValue=255)
+
+
+def find_text_regions(binary):
+    """Bounding boxes (x, y, w, h) of text blocks in reading order."""
+    ink = 255 - binary
+    # Smear letters into words and words into lines/blocks
+    kernel = cv2.getStructuringElement(
+        cv2.MORPH_RECT, (TARGET_TEXT_HEIGHT, TARGET_TEXT_HEIGHT // 2))
+    blocks = cv2.dilate(ink, kernel, iterations=2)
+    contours, _ = cv2.findContours(
+        blocks, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+
+    height, width = binary.shape[:2]
+    regions = []
+    for contour in contours:
+        x, y, w, h = cv2.boundingRect(contour)
+        if w * h < MIN_REGION_AREA or h < TARGET_TEXT_HEIGHT // 2:
+            continue
+        x0, y0 = max(x - REGION_PADDING, 0), max(y - REGION_PADDING, 0)
+        x1, y1 = min(x + w + REGION_PADDING, width), min(y + h + REGION_PADDING, height)
+        regions.append((x0, y0, x1 - x0, y1 - y0))
+
+    # Top-to-bottom, then left-to-right within roughly the same line
+    line = TARGET_TEXT_HEIGHT * 2
+    regions.sort(key=lambda r: (r[1] // line, r[0]))
+    return regions
+
+
+def preprocess(gray):
+    """Run every stage and return (binary image, regions, timings)."""
+    timer = Timer()
+    resized = resize_for_ocr(gray)
+    timer.lap("resize")
+    binary = binarise(resized)
+    timer.lap("threshold")
+    binary = deskew(binary)
+    timer.lap("deskew")
+    regions = find_text_regions(binary)
+    timer.lap("regions")
+    return binary, regions, timer.timings
+
+
+# ---------------------------------------------------------------------------
+# OCR
+# ---------------------------------------------------------------------------
+
+def ocr_image(gray, tesseract_cmd, threads=REGION_THREADS):
+    """
+    Preprocess a grayscale image and OCR its text regions in parallel.
+
+    Returns (text, timings) where timings maps stage name → seconds.
+    """
+    pytesseract.pytesseract.tesseract_cmd = tesseract_cmd
+    binary, regions, timings = preprocess(gray)
+
+    start = time.perf_counter()
+    if not regions or len(regions) > MAX_REGIONS:
+        text = pytesseract.image_to_string(binary)
+    else:
+        crops = [binary[y:y + h, x:x + w] for x, y, w, h in regions]
+        if len(crops) == 1 or threads <= 1:
+            parts = [pytesseract.image_to_string(c, config=REGION_CONFIG) for c in crops]
+        else:
+            with ThreadPoolExecutor(max_workers=min(threads, len(crops))) as pool:
+                parts = list(pool.map(
+                    lambda c: pytesseract.image_to_string(c, config=REGION_CONFIG), crops))
+        text = "\n".join(part.strip() for part in parts if part.strip())
+    timings["ocr"] = round(time.perf_counter() - start, 4)
+    return text, timings
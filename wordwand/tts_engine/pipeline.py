@@ -0,0 +1,211 @@
+import re
+import time
+from functools import lru_cache
+
+from . import lexicon
+from .cache import hash_bytes, hash_file, text_cache
+from .extraction import extract_pages
+from .speech import split_chunks, synthesize_chunks
+
+# ---------------------------------------------------------------------------
+# Constants
+# ---------------------------------------------------------------------------
+SUPPORTED_EXTENSIONS = {"png", "jpg", "jpeg", "bmp", "tiff", "pdf", "txt"}
+MAX_FILE_SIZE = 10 * 1024 * 1024  # 10 MB
+
+# Leading bytes read to identify an upload (see sniff_file_type)
+SNIFF_BYTES = 2048
+
+_SIGNATURES = (
+    (b"%PDF-", "pdf"),
+    (b"\x89PNG\r\n\x1a\n", "png"),
+    (b"\xff\xd8\xff", "jpg"),
+    (b"BM", "bmp"),
+    (b"II*\x00", "tiff"),
+    (b"MM\x00*", "tiff"),
+)
+
+# Per-process memo sizes for analyse_text (distinct words / hard words)
+WORD_CACHE_SIZE = 200_000
+SYLLABLE_CACHE_SIZE = 50_000
+
+COMMON_WORDS = {
+    'the', 'be', 'to', 'of', 'and', 'a', 'in', 'that', 'have', 'i',
+    'it', 'for', 'not', 'on', 'with', 'he', 'as', 'you', 'do', 'at',
+    'this', 'but', 'his', 'by', 'from', 'they', 'we', 'say', 'her', 'she',
+    'or', 'an', 'will', 'my', 'one', 'all', 'would', 'there', 'their', 'what',
+    'so', 'up', 'out', 'if', 'about', 'who', 'get', 'which', 'go', 'me',
+    'when', 'make', 'can', 'like', 'time', 'no', 'just', 'him', 'know', 'take',
+    'people', 'into', 'year', 'your', 'good', 'some', 'could', 'them', 'see', 'other',
+    'than', 'then', 'now', 'look', 'only', 'come', 'its', 'over', 'think', 'also',
+    'back', 'after', 'use', 'two', 'how', 'our', 'work', 'first', 'well', 'way',
+    'even', 'new', 'want', 'because', 'any', 'these', 'give', 'day', 'most', 'us',
+}
+
+# ---------------------------------------------------------------------------
+# Helpers
+# ---------------------------------------------------------------------------
+
+
+def split_into_syllables(word):
+    """Return a hyphen-separated syllable breakdown for a word."""
+    word = re.sub(r"[^\w]", "", word.lower().strip())
+    if not word:
+        return word
+
+    # CMU splits come from the precompiled lexicon (see lexicon.py)
+    entry = lexicon.lookup(word)
+    if entry is not None and entry.flags & lexicon.IN_CMUDICT:
+        return entry.syllables
+
+    # Fallback: simple vowel-boundary split
+    vowels = 'aeiouy'
+    syllables, current = [], []
+    for i, char in enumerate(word):
+        current.append(char)
+        if char in vowels and i < len(word) - 1 and word[i + 1] not in vowels:
+            syllables.append(''.join(current))
+            current = []
+    if current:
+        syllables.append(''.join(current))
+    return '-'.join(syllables) if len(syllables) > 1 else word
+
+
+def is_hard(word):
+    """Return True if a word is likely difficult for a child reader."""
+    word = re.sub(r"[^\w]", "", word.lower().strip())
+    if not word or len(word) <= 2 or word in COMMON_WORDS:
+        return False
+    vowels = 'aeiouy'
+    vowel_count = sum(1 for c in word if c in vowels)
+    return len(word) >= 6 or vowel_count >= 3 or (len(word) >= 4 and word not in COMMON_WORDS)
+
+
+def sniff_file_type(head):
+    """
+    Identify an upload from its first bytes (at least SNIFF_BYTES of them).
+
+    Returns one of SUPPORTED_EXTENSIONS ("jpg" for any JPEG), or None when
+    the content is not a file the reader can handle — whatever its name.
+    """
+    for signature, file_type in _SIGNATURES:
+        if head.startswith(signature):
+            return file_type
+
+    # Plain text: no NUL bytes and (almost) no other control characters
+    if not head or b"\x00" in head:
+        return None
+    controls = sum(1 for b in head if b < 32 and b not in b"\t\n\r\f")
+    return "txt" if controls <= len(head) // 100 else None
+
+
+def extract_text_from_file(source, file_ext, on_page=None, executor=None):
+    """
+    Extract plain text from an uploaded file (a path or its bytes).
+
+    PDF pages and TIFF frames are extracted in parallel; `on_page` is
+    called with (index, text, page_count) as each one finishes.
+    """
+    pages = extract_pages(source, file_ext, on_page=on_page, executor=executor)
+    return "\n".join(page.strip() for page in pages if page.strip())
+
+
+def clean_text(text):
+    """Normalise whitespace and punctuation spacing."""
+    text = re.sub(r'\s+', ' ', text)
+    text = re.sub(r'\s+([.,!?;:])', r'\1', text)
+    text = re.sub(r'([.,!?;:])(\w)', r'\1 \2', text)
+    return text.strip()
+
+
+# ---------------------------------------------------------------------------
+# Full reader pipeline
+# ---------------------------------------------------------------------------
+
+def extract_document(source, file_ext, on_page=None, executor=None):
+    """
+    Return (content_hash, cleaned text) for an uploaded file, given as a
+    path or, for uploads kept in memory, its bytes.
+
+    Extraction is cached by the hash of the uploaded bytes. Raises
+    ValueError when no readable text is found. `on_page` receives partial
+    page results while extraction is running (see extract_text_from_file).
+    """
+    if isinstance(source, bytes):
+        content_hash = hash_bytes(source)
+    else:
+        content_hash = hash_file(source)
+    text = text_cache.get_text(content_hash)
+    if text is None:
+        text = extract_text_from_file(
+            source, file_ext, on_page=on_page, executor=executor)
+        if not text or len(text.strip()) < 10:
+            raise ValueError("No readable text found in the file.")
+        text = clean_text(text)
+        text_cache.put_text(content_hash, text)
+    return content_hash, text
+
+
+_TOKEN = re.compile(r"\b[\w']+\b")
+
+
+@lru_cache(maxsize=WORD_CACHE_SIZE)
+def _hard_tokens(word):
+    """Lower-cased hard tokens in one space-separated word, in order."""
+    return tuple(
+        token for token in (t.lower() for t in _TOKEN.findall(word))
+        if is_hard(token)
+    )
+
+
+@lru_cache(maxsize=SYLLABLE_CACHE_SIZE)
+def _syllables(word):
+    return split_into_syllables(word)
+
+
+def analyse_text(text):
+    """
+    Hard words (every occurrence and unique), their syllables and the
+    positions of each hard word.
+
+    The text is walked once, word by word, in the same order the front-end
+    numbers its word spans (`text.split(" ")` on cleaned text), so
+    positions[word] lists data-index values. Classification and syllable
+    splits are memoised per process, so repeated words — within a book or
+    across uploads — are only analysed once.
+    """
+    hard_words, positions = [], {}
+    for index, word in enumerate(text.split(" ")):
+        for token in _hard_tokens(word):
+            hard_words.append(token)
+            positions.setdefault(token, []).append(index)
+    unique_hard_words = sorted(positions)
+    return {
+        "hard_words": hard_words,
+        "unique_hard_words": unique_hard_words,
+        "syllables": {w: _syllables(w) for w in unique_hard_words},
+        "positions": positions,
+    }
+
+
+def process_document(source, file_ext, on_page=None, on_chunk=None, executor=None):
+    """
+    Run extraction, hard-word analysis and chunked TTS for one file.
+
+    Returns a dict with the upload's content hash, the cleaned text, the
+    analysis (see analyse_text), the audio chunk playlist (see
+    speech.split_chunks) and the processing time. `executor` overrides
+    the page-extraction pool (see extraction.iter_pages).
+    """
+    start_time = time.time()
+    content_hash, text = extract_document(
+        source, file_ext, on_page=on_page, executor=executor)
+    output = analyse_text(text)
+    chunks = synthesize_chunks(split_chunks(text), on_chunk=on_chunk)
+    output.update({
+        "content_hash": content_hash,
+        "text": text,
+        "audio_chunks": chunks,
+        "processing_time": round(time.time() - start_time, 2),
+    })
+    return output
@@ -0,0 +1,123 @@
+"""
+Chunked, sentence-aligned speech synthesis for the reader.
+
+Instead of one TTS call for the whole document, cleaned text is split into
+sentence-aligned chunks that are synthesised concurrently and served as an
+ordered playlist, so playback starts as soon as chunk 1 exists.
+
+Chunks index words exactly as the front-end does — `text.split(" ")` on the
+output of `clean_text` — so each chunk's `start_word` is the data-index of
+its first word span. No backend returns timing data, so each word carries a
+weight (its spoken length estimate); the player spreads the real audio
+duration over those weights to drive word highlighting.
+"""
+
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from django.conf import settings
+
+from .backends import synthesize_cached
+
+# The first chunk is kept short so the first audio arrives quickly
+FIRST_CHUNK_CHARS = 120
+CHUNK_CHARS = 400
+
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.TTS_CHUNK_WORKERS,
+                thread_name_prefix="tts-chunk",
+            )
+    return _executor
+
+
+def word_weight(word):
+    """Rough relative speaking time for one word (letters + pauses)."""
+    weight = len(re.sub(r"[^\w]", "", word)) + 1
+    if word[-1:] in ".!?":
+        weight += 6
+    elif word[-1:] in ",;:":
+        weight += 3
+    return weight
+
+
+def split_chunks(text):
+    """
+    Split cleaned text into sentence-aligned chunks.
+
+    Returns a list of {"text", "start_word", "weights"} dicts in order.
+    A sentence longer than the chunk budget becomes a chunk of its own.
+    """
+    chunks = []
+    current, start_word, word_index = [], 0, 0
+
+    def flush():
+        if current:
+            chunk_text = " ".join(current)
+            words = chunk_text.split(" ")
+            chunks.append({
+                "text": chunk_text,
+                "start_word": start_word,
+                "weights": [word_weight(w) for w in words],
+            })
+
+    for sentence in _SENTENCE_END.split(text):
+        if not sentence:
+            continue
+        limit = FIRST_CHUNK_CHARS if not chunks else CHUNK_CHARS
+        length = sum(len(s) + 1 for s in current)
+        if current and length + len(sentence) > limit:
+            flush()
+            current, start_word = [], word_index
+        current.append(sentence)
+        word_index += len(sentence.split(" "))
+    flush()
+    return chunks
+
+
+def synthesize_audio(text, lang='en'):
+    """
+    Return the MEDIA_ROOT-relative name of the audio for `text`.
+
+    Audio is shared through the content cache, so identical texts are only
+    synthesised once; see backends.py for provider order and fallback.
+    """
+    return synthesize_cached(text, lang)
+
+
+def synthesize_chunks(chunks, on_chunk=None, lang='en'):
+    """
+    Synthesise every chunk concurrently (bounded by TTS_CHUNK_WORKERS).
+
+    Sets chunk["file"] to the MEDIA_ROOT-relative audio name and calls
+    `on_chunk(index, chunk)` in completion order. A failed chunk keeps an
+    empty "file" so the player can fall back to browser speech for it;
+    the first error is re-raised once every chunk has finished.
+    """
+    futures = {
+        _get_executor().submit(synthesize_audio, chunk["text"], lang): index
+        for index, chunk in enumerate(chunks)
+    }
+    error = None
+    for future in as_completed(futures):
+        index = futures[future]
+        try:
+            chunks[index]["file"] = future.result()
+        except Exception as e:
+            chunks[index]["file"] = ""
+            error = error or e
+        if on_chunk is not None:
+            on_chunk(index, chunks[index])
+    if error is not None:
+        raise error
+    return chunks
@@ -1,3 +1,341 @@
-from django.test import TestCase
+import datetime
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from . import backends, jobs, speech
+from .cache import ContentCache
+from .models import ReaderJob, TTSRequest
+from .pipeline import SNIFF_BYTES, sniff_file_type
+
+
+class StaleJobTests(TestCase):
+    """Jobs whose process went away are recovered by the status endpoints (jobs.recover_stale)."""
+
+    def setUp(self):
+        media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media, ignore_errors=True)
+        self.enterContext(override_settings(MEDIA_ROOT=media, READER_JOB_STALE_SECONDS=600))
+        self.submit = self.enterContext(mock.patch.object(jobs, 'submit_job'))
+        self.user = User.objects.create_user('reader', password='pw')
+        self.client.force_login(self.user)
+
+    def _job(self, status=ReaderJob.STATUS_RUNNING, age=601, upload=False, result=False):
+        job = ReaderJob(user=self.user, file_name='sheet.txt', file_type='txt', status=status)
+        if upload:
+            job.upload.save('sheet.txt', ContentFile(b'The cat sat.'), save=False)
+        if result:
+            job.result = TTSRequest.objects.create(user=self.user, extracted_text='The cat sat.')
+        job.save()
+        ReaderJob.objects.filter(pk=job.pk).update(
+            updated_at=timezone.now() - datetime.timedelta(seconds=age))
+        return job
+
+    def _status(self, job):
+        return self.client.get(reverse('reader_job_status', args=[job.pk])).json()
+
+    def test_recent_job_left_alone(self):
+        job = self._job(age=30)
+        self.assertEqual(self._status(job)['status'], ReaderJob.STATUS_RUNNING)
+        self.submit.assert_not_called()
+
+    def test_stale_job_in_memory_fails(self):
+        job = self._job(status=ReaderJob.STATUS_QUEUED)
+        payload = self._status(job)
+        self.assertEqual(payload['status'], ReaderJob.STATUS_FAILED)
+        self.assertIn('upload the file again', payload['error'])
+        response = self.client.get(reverse('reader_job_result', args=[job.pk]))
+        self.assertEqual(response.status_code, 422)
+        self.submit.assert_not_called()
+
+    def test_stale_stored_job_queued_again(self):
+        job = self._job(upload=True)
+        self.assertEqual(self._status(job)['status'], ReaderJob.STATUS_QUEUED)
+        self.submit.assert_called_once()
+        # Fresh again: a second poll does not queue it twice
+        self._status(job)
+        self.submit.assert_called_once()
+
+    def test_stale_job_with_text_finishes_without_audio(self):
+        job = self._job(upload=True, result=True)
+        payload = self._status(job)
+        self.assertEqual(payload['status'], ReaderJob.STATUS_DONE)
+        self.assertIn('Audio unavailable', payload['error'])
+        self.assertFalse(ReaderJob.objects.get(pk=job.pk).upload)
+
+    def test_recovered_job_not_run_twice(self):
+        job = self._job(status=ReaderJob.STATUS_QUEUED)
+        self._status(job)
+        # The lost pool's run, should it ever start, finds the job no longer queued
+        with mock.patch.object(jobs, 'close_old_connections'), \
+                mock.patch.object(jobs, 'extract_document') as extract:
+            jobs.run_job(job.pk)
+        extract.assert_not_called()
+        self.assertEqual(ReaderJob.objects.get(pk=job.pk).status, ReaderJob.STATUS_FAILED)
+
+
+class _Engine:
+    """Stands in for a pyttsx3 engine; runAndWait blocks until `release` is set."""
+
+    def __init__(self):
+        self.release = threading.Event()
+        self.started = threading.Event()
+        self.path = None
+
+    def getProperty(self, name):
+        return []
+
+    def save_to_file(self, text, path):
+        self.path = path
+
+    def runAndWait(self):
+        self.started.set()
+        self.release.wait(5)
+        with open(self.path, 'wb') as f:
+            f.write(b'RIFF')
+
+
+class OfflineBackendTests(TestCase):
+    """The offline worker under load and timeouts (backends.OfflineBackend)."""
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.dir, ignore_errors=True)
+        self.engine = _Engine()
+        self.addCleanup(self.engine.release.set)
+        self.enterContext(mock.patch.dict(
+            sys.modules, {'pyttsx3': mock.Mock(init=mock.Mock(return_value=self.engine))}))
+        self.enterContext(override_settings(
+            TTS_OFFLINE_QUEUE_SIZE=1, TTS_OFFLINE_TIMEOUT=5, TTS_BACKEND_MAX_FAILURES=1))
+        self.backend = backends.OfflineBackend()
+
+    def _path(self, name):
+        return os.path.join(self.dir, name)
+
+    def test_synthesises(self):
+        self.engine.release.set()
+        self.backend.synthesize('cat', self._path('cat.wav'))
+        self.assertEqual(os.listdir(self.dir), ['cat.wav'])
+        self.assertTrue(self.backend.available())
+
+    def test_full_queue_is_not_a_failure(self):
+        first = threading.Thread(target=self.backend.synthesize,
+                                 args=('one', self._path('one.wav')))
+        first.start()
+        self.assertTrue(self.engine.started.wait(5))
+        # One waits in the queue, the next finds it full
+        self.backend._queue.put_nowait(backends._Request('two', self._path('two.wav'), 'en'))
+        with self.assertRaises(backends.BackendBusy):
+            self.backend.synthesize('three', self._path('three.wav'))
+        self.assertEqual(self.backend.health()['consecutive_failures'], 0)
+        self.assertTrue(self.backend.available())
+        self.engine.release.set()
+        first.join()
+
+    def test_timed_out_request_leaves_no_file(self):
+        with override_settings(TTS_OFFLINE_TIMEOUT=0.1):
+            with self.assertRaises(backends.BackendUnavailable):
+                self.backend.synthesize('slow', self._path('slow.wav'))
+        self.assertFalse(self.backend.available())
+        self.engine.release.set()
+        # The worker takes a request queued behind it only once it is done
+        marker = backends._Request('x', self._path('x.wav'), 'en')
+        marker.abandoned = True
+        self.backend._queue.put(marker)
+        while self.backend._queue.qsize():
+            time.sleep(0.01)
+        self.assertEqual(os.listdir(self.dir), [])
+
+
+class ContentCacheTests(TestCase):
+    """Size-triggered LRU eviction of the content cache (cache.py)."""
+
+    def setUp(self):
+        media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media, ignore_errors=True)
+        self.enterContext(override_settings(MEDIA_ROOT=media, TTS_CACHE_SCAN_SECONDS=600))
+        self.cache = ContentCache('text', '.txt', max_bytes=100)
+        # Ten 20-byte files, oldest first
+        self.keys = [f'{i:02d}' * 32 for i in range(10)]
+        for age, key in enumerate(reversed(self.keys)):
+            path = self.cache.put_text(key, 'x' * 20)
+            os.utime(path, (time.time() - age - 10, time.time() - age - 10))
+
+    def _names(self, keys):
+        return {self.cache.name_for(key) for key in keys}
+
+    def test_evicts_least_recently_used_down_to_target(self):
+        self.assertTrue(self.cache.over_budget())
+        # 200 bytes, budget 100: down to EVICT_TO (90), so six files go
+        self.assertEqual(self.cache.evict(), 6)
+        self.assertEqual([key for key in self.keys if self.cache.get(key)], self.keys[6:])
+        self.assertFalse(self.cache.over_budget())
+
+    def test_in_use_files_are_kept(self):
+        asked = []
+
+        def in_use(names):
+            asked.append(set(names))
+            return names & self._names(self.keys[:2])
+
+        self.assertEqual(self.cache.evict(in_use=in_use), 6)
+        self.assertEqual([key for key in self.keys if self.cache.get(key)],
+                         self.keys[:2] + self.keys[8:])
+        # Asked only about the files about to go, never the whole cache
+        self.assertEqual(asked[0], self._names(self.keys[:6]))
+        self.assertTrue(all(len(names) < len(self.keys) for names in asked))
+
+    def test_get_marks_a_file_used(self):
+        self.cache.get(self.keys[0])
+        self.cache.evict()
+        self.assertIsNotNone(self.cache.get(self.keys[0]))
+        self.assertIsNone(self.cache.get(self.keys[1]))
+
+    def test_running_total_counts_writes(self):
+        self.cache.evict()
+        self.assertFalse(self.cache.over_budget())
+        # 80 bytes left; two more writes take it past 100
+        self.cache.put_text('fe' * 32, 'x' * 20)
+        self.cache.put_text('ff' * 32, 'x' * 20)
+        # Known without walking the tree again
+        with mock.patch.object(self.cache, '_scan') as scan:
+            self.assertTrue(self.cache.over_budget())
+        scan.assert_not_called()
+
+
+class SniffTests(TestCase):
+    """Uploads are identified by their content, not their name (pipeline.sniff_file_type)."""
+
+    def test_signatures(self):
+        self.assertEqual(sniff_file_type(b'%PDF-1.7\n...'), 'pdf')
+        self.assertEqual(sniff_file_type(b'\x89PNG\r\n\x1a\n' + bytes(20)), 'png')
+        self.assertEqual(sniff_file_type(b'\xff\xd8\xff\xe0' + bytes(20)), 'jpg')
+        self.assertEqual(sniff_file_type(b'II*\x00' + bytes(20)), 'tiff')
+        self.assertEqual(sniff_file_type('The cat sat.\n\tOn the mat. Café'.encode()), 'txt')
+
+    def test_not_readable(self):
+        self.assertIsNone(sniff_file_type(b''))
+        self.assertIsNone(sniff_file_type(b'MZ\x90\x00\x03' + bytes(SNIFF_BYTES)))
+        self.assertIsNone(sniff_file_type(bytes(range(1, 32)) * 10))
+
+    def test_upload_named_pdf_but_not_one(self):
+        User.objects.create_user('reader', password='pw')
+        self.client.login(username='reader', password='pw')
+        upload = SimpleUploadedFile('worksheet.pdf', b'MZ\x90\x00' + bytes(100))
+        response = self.client.post(reverse('reader'), {'file': upload},
+                                    HTTP_X_REQUESTED_WITH='XMLHttpRequest')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("isn't a file we can read", response.json()['error'])
+        self.assertFalse(ReaderJob.objects.exists())
+
+
+class SplitChunksTests(TestCase):
+    """Sentence-aligned audio chunks (speech.split_chunks)."""
+
+    TEXT = ('The cat sat on the mat. It was a sunny day! Did the dog come too? '
+            'Yes, the dog came. ' * 12).strip()
+
+    def test_chunks_cover_the_text_in_order(self):
+        chunks = speech.split_chunks(self.TEXT)
+        self.assertGreater(len(chunks), 2)
+        self.assertEqual(' '.join(chunk['text'] for chunk in chunks), self.TEXT)
+        words = self.TEXT.split(' ')
+        for chunk in chunks:
+            chunk_words = chunk['text'].split(' ')
+            # start_word is the reader's data-index of the chunk's first word
+            self.assertEqual(words[chunk['start_word']:chunk['start_word'] + len(chunk_words)],
+                             chunk_words)
+            self.assertEqual(len(chunk['weights']), len(chunk_words))
+
+    def test_sentence_aligned_and_first_chunk_short(self):
+        chunks = speech.split_chunks(self.TEXT)
+        self.assertLessEqual(len(chunks[0]['text']), speech.FIRST_CHUNK_CHARS)
+        for chunk in chunks:
+            self.assertLessEqual(len(chunk['text']), speech.CHUNK_CHARS)
+            self.assertTrue(chunk['text'].endswith(('.', '!', '?')))
+
+    def test_long_sentence_is_its_own_chunk(self):
+        long = ' '.join(['word'] * 200) + '.'
+        chunks = speech.split_chunks(f'Short one. {long} Short two.')
+        self.assertEqual([chunk['text'] for chunk in chunks], ['Short one.', long, 'Short two.'])
+
+
+class ReaderJobTests(TestCase):
+    """An upload through the reader view, run as a job (jobs.run_job)."""
+
+    def setUp(self):
+        media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media, ignore_errors=True)
+        self.enterContext(override_settings(MEDIA_ROOT=media))
+        # Run the job in the request, on the test's connection
+        self.enterContext(mock.patch.object(jobs, 'close_old_connections'))
+        self.submitted = []
+        self.enterContext(mock.patch(
+            'tts_engine.views.submit_job', side_effect=lambda job, data=None: self.submitted.append((job.pk, data))))
+        self.synthesised = []
+        self.enterContext(mock.patch.object(speech, 'synthesize_audio', side_effect=self._synthesise))
+        self.activity = self.enterContext(mock.patch.object(jobs.activity, 'record'))
+        self.user = User.objects.create_user('reader', password='pw')
+        self.client.force_login(self.user)
+
+    def _synthesise(self, text, lang='en'):
+        self.synthesised.append(text)
+        return f'tts_cache/audio/{len(self.synthesised):02d}.mp3'
+
+    def _upload(self, content, name='story.txt'):
+        response = self.client.post(reverse('reader'), {'file': SimpleUploadedFile(name, content)},
+                                    HTTP_X_REQUESTED_WITH='XMLHttpRequest')
+        self.assertEqual(response.status_code, 202)
+        payload = response.json()
+        self.assertEqual(payload['status'], ReaderJob.STATUS_QUEUED)
+        job_id, data = self.submitted[-1]
+        # Small uploads travel as bytes, never stored
+        self.assertEqual(data, content)
+        self.assertFalse(ReaderJob.objects.get(pk=job_id).upload)
+        jobs.run_job(job_id, data)
+        return payload
+
+    def test_done(self):
+        text = 'The elephant walked slowly. ' * 10
+        payload = self._upload(text.encode())
+        status = self.client.get(payload['status_url']).json()
+        self.assertEqual(status['status'], ReaderJob.STATUS_DONE)
+        self.assertEqual(status['pages'], {})
+
+        result = self.client.get(payload['result_url']).json()
+        self.assertEqual(result['text'], text.strip())
+        self.assertIn('elephant', result['hard_words'])
+        self.assertEqual(len(result['audio_chunks']), len(self.synthesised))
+        self.assertTrue(all(chunk['url'].endswith('.mp3') for chunk in result['audio_chunks']))
+        self.activity.assert_called_once()
+
+    def test_no_readable_text_fails(self):
+        payload = self._upload(b'hi')
+        self.assertEqual(self.client.get(payload['status_url']).json()['status'], ReaderJob.STATUS_FAILED)
+        response = self.client.get(payload['result_url'])
+        self.assertEqual(response.status_code, 422)
+        self.assertEqual(response.json()['error'], 'No readable text found in the file.')
+        self.activity.assert_not_called()
+
+    def test_audio_failure_keeps_the_text(self):
+        def fail(text, lang='en'):
+            raise backends.TTSUnavailable('gtts: cooling down')
+
+        speech.synthesize_audio.side_effect = fail
+        payload = self._upload(b'A story about a crocodile and a zebra.')
+        result = self.client.get(payload['result_url']).json()
+        self.assertEqual(result['status'], ReaderJob.STATUS_DONE)
+        self.assertIn('Audio unavailable', result['error'])
+        self.assertIn('crocodile', result['text'])
+        self.assertEqual({chunk['url'] for chunk in result['audio_chunks']}, {''})
@@ -3,8 +3,6 @@ import re
 import json
 import time
 import cv2
-import nltk
-from nltk.corpus import cmudict, words as english_words
 from gtts import gTTS
 from PyPDF2 import PdfReader
 from django.shortcuts import render
@@ -13,88 +11,16 @@ from django.conf import settings
 import pytesseract
 
 from .models import TTSRequest
+from .pipeline import MAX_FILE_SIZE, SUPPORTED_EXTENSIONS, is_hard, split_into_syllables
 
-# ---------------------------------------------------------------------------
-# NLTK setup — download once on first use
-# ---------------------------------------------------------------------------
-try:
-    nltk.data.find('corpora/cmudict')
-except LookupError:
-    nltk.download('cmudict')
-
-try:
-    nltk.data.find('corpora/words')
-except LookupError:
-    nltk.download('words')
-
-_cmu_dict = cmudict.dict()
-_english_words = set(english_words.words())
-
-# ---------------------------------------------------------------------------
-# Constants
-# ---------------------------------------------------------------------------
-SUPPORTED_EXTENSIONS = {"png", "jpg", "jpeg", "bmp", "tiff", "pdf", "txt"}
-MAX_FILE_SIZE = 10 * 1024 * 1024  # 10 MB
-
-COMMON_WORDS = {
-    'the', 'be', 'to', 'of', 'and', 'a', 'in', 'that', 'have', 'i',
-    'it', 'for', 'not', 'on', 'with', 'he', 'as', 'you', 'do', 'at',
-    'this', 'but', 'his', 'by', 'from', 'they', 'we', 'say', 'her', 'she',
-    'or', 'an', 'will', 'my', 'one', 'all', 'would', 'there', 'their', 'what',
-    'so', 'up', 'out', 'if', 'about', 'who', 'get', 'which', 'go', 'me',
-    'when', 'make', 'can', 'like', 'time', 'no', 'just', 'him', 'know', 'take',
-    'people', 'into', 'year', 'your', 'good', 'some', 'could', 'them', 'see', 'other',
-    'than', 'then', 'now', 'look', 'only', 'come', 'its', 'over', 'think', 'also',
-    'back', 'after', 'use', 'two', 'how', 'our', 'work', 'first', 'well', 'way',
-    'even', 'new', 'want', 'because', 'any', 'these', 'give', 'day', 'most', 'us',
-}
+# Word helpers and constants live in pipeline.py (backed by the precompiled
+# lexicon), so importing this module no longer loads the NLTK corpora.
 
 # ---------------------------------------------------------------------------
 # Helpers
 # ---------------------------------------------------------------------------
 
 
-def split_into_syllables(word):
-    """Return a hyphen-separated syllable breakdown for a word."""
-    word = re.sub(r"[^\w]", "", word.lower().strip())
-    if not word:
-        return word
-
-    if word in _cmu_dict:
-        phonemes = _cmu_dict[word][0]
-        syllables, current = [], []
-        for phoneme in phonemes:
-            current.append(phoneme.rstrip('012'))
-            if phoneme[-1].isdigit():
-                syllables.append(''.join(current))
-                current = []
-        if current:
-            syllables.append(''.join(current))
-        return '-'.join(syllables)
-
-    # Fallback: simple vowel-boundary split
-    vowels = 'aeiouy'
-    syllables, current = [], []
-    for i, char in enumerate(word):
-        current.append(char)
-        if char in vowels and i < len(word) - 1 and word[i + 1] not in vowels:
-            syllables.append(''.join(current))
-            current = []
-    if current:
-        syllables.append(''.join(current))
-    return '-'.join(syllables) if len(syllables) > 1 else word
-
-
-def is_hard(word):
-    """Return True if a word is likely difficult for a child reader."""
-    word = re.sub(r"[^\w]", "", word.lower().strip())
-    if not word or len(word) <= 2 or word in COMMON_WORDS:
-        return False
-    vowels = 'aeiouy'
-    vowel_count = sum(1 for c in word if c in vowels)
-    return len(word) >= 6 or vowel_count >= 3 or (len(word) >= 4 and word not in COMMON_WORDS)
-
-
 def extract_text_from_file(file_path, file_ext):
     """Extract plain text from an uploaded file."""
     text = ""
@@ -1,6 +1,11 @@
 from django.urls import path
-from .views import reader
+from . import views
 
 urlpatterns = [
-    path("reader/", reader, name="reader"),
+    path("reader/", views.reader, name="reader"),
+    path("reader/jobs/<uuid:job_id>/", views.reader_job_status, name="reader_job_status"),
+    path("reader/jobs/<uuid:job_id>/result/", views.reader_job_result, name="reader_job_result"),
+    path("reader/packs/<int:pack_id>/", views.reading_pack, name="reading_pack"),
+    path("reader/documents/<int:document_id>/", views.shared_document, name="shared_document"),
+    path("reader/tts/health/", views.tts_health, name="tts_health"),
 ]
@@ -1,246 +1,148 @@
-import nltk
-from nltk.corpus import cmudict, words as english_words
-from django.shortcuts import render
-from django.contrib.auth.decorators import login_required
 from django.conf import settings
-import pytesseract
-import cv2
-import os
-import re
-import json
-import time
-from PyPDF2 import PdfReader
-from gtts import gTTS
-from .models import TTSRequest
+from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib.auth.decorators import login_required
+from django.http import JsonResponse
+from django.shortcuts import get_object_or_404, redirect, render
+from django.urls import reverse
+
+from . import backends
+from .jobs import job_result, reader_payload, recover_stale, submit_job
+from .models import ReaderJob, ReadingPack, SharedDocument
+from .pipeline import MAX_FILE_SIZE, SNIFF_BYTES, SUPPORTED_EXTENSIONS, sniff_file_type
+
+
+def _job_payload(job):
+    return {
+        "job_id": str(job.id),
+        "status": job.status,
+        "error": job.error,
+        "page_count": job.page_count,
+        "pages": job.pages,
+        "result_ready": job.result_id is not None,
+        "status_url": reverse("reader_job_status", args=[job.id]),
+        "result_url": reverse("reader_job_result", args=[job.id]),
+    }
 
-# Download NLTK data if not already downloaded
-try:
-    nltk.data.find('corpora/cmudict')
-except LookupError:
-    nltk.download('cmudict')
-    nltk.download('words')
-
-d = cmudict.dict()
-english = set(english_words.words())
-
-COMMON_WORDS = {
-    'the', 'be', 'to', 'of', 'and', 'a', 'in', 'that', 'have', 'i',
-    'it', 'for', 'not', 'on', 'with', 'he', 'as', 'you', 'do', 'at',
-    'this', 'but', 'his', 'by', 'from', 'they', 'we', 'say', 'her', 'she',
-    'or', 'an', 'will', 'my', 'one', 'all', 'would', 'there', 'their', 'what',
-    'so', 'up', 'out', 'if', 'about', 'who', 'get', 'which', 'go', 'me',
-    'when', 'make', 'can', 'like', 'time', 'no', 'just', 'him', 'know', 'take',
-    'people', 'into', 'year', 'your', 'good', 'some', 'could', 'them', 'see', 'other',
-    'than', 'then', 'now', 'look', 'only', 'come', 'its', 'over', 'think', 'also',
-    'back', 'after', 'use', 'two', 'how', 'our', 'work', 'first', 'well', 'way',
-    'even', 'new', 'want', 'because', 'any', 'these', 'give', 'day', 'most', 'us'
-}
-
-
-def split_into_syllables(word):
-    word = word.lower().strip()
-    word = re.sub(r'[^\w\s]', '', word)
-
-    if word in d:
-        phonemes = d[word][0]
-        syllables = []
-        current = []
-
-        for phoneme in phonemes:
-            current.append(phoneme.rstrip('012'))
-            if phoneme[-1].isdigit():
-                syllables.append(''.join(current))
-                current = []
-
-        return '-'.join(syllables)
-
-    vowels = 'aeiouy'
-    syllables = []
-    current = []
-
-    for i, char in enumerate(word):
-        current.append(char)
-        if char in vowels and i < len(word) - 1:
-            next_char = word[i + 1]
-            if next_char not in vowels:
-                syllables.append(''.join(current))
-                current = []
-
-    if current:
-        syllables.append(''.join(current))
-
-    return '-'.join(syllables) if len(syllables) > 1 else word
-
-
-def is_hard(word):
-    if not word:
-        return False
-
-    word = word.lower().strip()
-    word = re.sub(r'[^\w\s]', '', word)
-
-    if len(word) <= 2:
-        return False
-
-    if word in COMMON_WORDS:
-        return False
-
-    vowels = 'aeiouy'
-    vowel_count = sum(1 for char in word if char in vowels)
-
-    if len(word) >= 6:
-        return True
-
-    if vowel_count >= 3:
-        return True
-
-    if len(word) >= 4 and word not in COMMON_WORDS:
-        return True
-
-    return False
-
-
-def extract_text_from_file(file_path, file_ext):
-    text = ""
-
-    if file_ext in ["png", "jpg", "jpeg", "bmp", "tiff"]:
-        img = cv2.imread(file_path)
-        if img is not None:
-            gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-            text = pytesseract.image_to_string(gray)
-        else:
-            raise ValueError("Could not read image file")
-
-    elif file_ext == "pdf":
-        reader = PdfReader(file_path)
-        for page in reader.pages:
-            page_text = page.extract_text()
-            if page_text:
-                text += page_text + "\n"
-
-    elif file_ext == "txt":
-        try:
-            with open(file_path, "r", encoding="utf-8") as f:
-                text = f.read()
-        except UnicodeDecodeError:
-            with open(file_path, "r", encoding="latin-1") as f:
-                text = f.read()
-
-    else:
-        raise ValueError(f"Unsupported file type: {file_ext}")
-
-    return text.strip()
 
+def _wants_json(request):
+    return request.headers.get("x-requested-with") == "XMLHttpRequest"
 
-def clean_text(text):
-    if not text:
-        return ""
-    text = re.sub(r'\s+', ' ', text)
-    text = re.sub(r'\s+([.,!?;:])', r'\1', text)
-    text = re.sub(r'([.,!?;:])(\w)', r'\1 \2', text)
-    return text.strip()
 
+# ---------------------------------------------------------------------------
+# Views
+# ---------------------------------------------------------------------------
 
 @login_required
 def reader(request):
-    text = ""
-    error = ""
-    audio_url = ""
-    hard_words = []
-    unique_hard_words = []
-    word_syllables = {}
-
-    if request.method == "POST" and request.FILES.get("file"):
-        start_time = time.time()
-
-        uploaded_file = request.FILES["file"]
-        file_name = uploaded_file.name
-
-        if uploaded_file.size > 10 * 1024 * 1024:
-            error = "File size too large. Maximum size is 10MB."
-            return render(request, "reader.html", {"error": error})
-
-        media_dir = settings.MEDIA_ROOT
-        os.makedirs(media_dir, exist_ok=True)
-
-        file_path = os.path.join(media_dir, file_name)
-
-        try:
-            with open(file_path, "wb+") as f:
-                for chunk in uploaded_file.chunks():
-                    f.write(chunk)
-
-            file_ext = file_name.split(".")[-1].lower()
-            supported_extensions = ["png", "jpg",
-                                    "jpeg", "bmp", "tiff", "pdf", "txt"]
-
-            if file_ext not in supported_extensions:
-                error = "Unsupported file type."
-                os.remove(file_path)
-                return render(request, "reader.html", {"error": error})
-
-            text = extract_text_from_file(file_path, file_ext)
-
-            if not text or len(text.strip()) < 10:
-                error = "No readable text found."
-                os.remove(file_path)
-                return render(request, "reader.html", {"error": error})
-
-            text = clean_text(text)
-
-            # Generate audio
-            tts = gTTS(text, lang='en')
-            audio_filename = f"speech_{os.path.splitext(file_name)[0]}_{os.urandom(4).hex()}.mp3"
-            audio_path = os.path.join(media_dir, audio_filename)
-            tts.save(audio_path)
-            audio_url = f"/media/{audio_filename}"
-
-            words_with_case = re.findall(r'\b[\w\']+\b', text)
-            words_lower = [w.lower() for w in words_with_case]
-
-            for i, word in enumerate(words_lower):
-                clean_word = re.sub(r'[^\w\s]', '', word)
-                if len(clean_word) <= 2:
-                    continue
-                if is_hard(clean_word):
-                    hard_words.append(words_with_case[i].lower())
-
-            unique_hard_words = sorted(list(set(hard_words)))
+    context = {
+        "error": "",
+        "job_id": request.GET.get("job", ""),
+        "document_url": "",
+    }
+    if request.GET.get("document", "").isdigit():
+        context["document_url"] = reverse("shared_document", args=[int(request.GET["document"])])
+
+    if request.method != "POST":
+        return render(request, "reader.html", context)
+
+    def fail(message):
+        if _wants_json(request):
+            return JsonResponse({"error": message}, status=400)
+        context["error"] = message
+        return render(request, "reader.html", context)
+
+    uploaded_file = request.FILES.get("file")
+    if not uploaded_file:
+        return fail("Please select a file.")
+
+    if uploaded_file.size > MAX_FILE_SIZE:
+        return fail("File too large. Maximum size is 10 MB.")
+
+    # Trust the content, not the name: identify the file from its first bytes
+    file_name = uploaded_file.name
+    uploaded_file.seek(0)
+    file_ext = sniff_file_type(uploaded_file.read(SNIFF_BYTES))
+    uploaded_file.seek(0)
+
+    if file_ext is None:
+        return fail(f"'{file_name}' isn't a file we can read. Allowed: {', '.join(sorted(SUPPORTED_EXTENSIONS))}.")
+
+    job = ReaderJob(user=request.user, file_name=file_name, file_type=file_ext)
+    if uploaded_file.size <= settings.READER_IN_MEMORY_MAX_BYTES:
+        # Small files go to the job pool as bytes, skipping the disk
+        data = uploaded_file.read()
+        job.save()
+        submit_job(job, data=data)
+    else:
+        # The storage backend adds a random suffix on collisions
+        job.upload.save(file_name, uploaded_file, save=False)
+        job.save()
+        submit_job(job)
 
-            for word in unique_hard_words:
-                word_syllables[word] = split_into_syllables(word)
+    if _wants_json(request):
+        return JsonResponse(_job_payload(job), status=202)
+    return redirect(f"{reverse('reader')}?job={job.id}")
 
-            processing_time = round(time.time() - start_time, 2)
 
-            # Save to database
-            TTSRequest.objects.create(
-                user=request.user,
-                extracted_text=text,
-                audio_file=f"tts_audio/{audio_filename}",
-                hard_words=unique_hard_words,
-                syllables=word_syllables,
-                file_type=file_ext,
-                processing_time=processing_time
-            )
+@login_required
+def reader_job_status(request, job_id):
+    job = recover_stale(get_object_or_404(ReaderJob, pk=job_id, user=request.user))
+    return JsonResponse(_job_payload(job))
 
-            os.remove(file_path)
 
-        except Exception as e:
-            error = f"Error processing file: {str(e)}"
-            if os.path.exists(file_path):
-                os.remove(file_path)
+@login_required
+def reader_job_result(request, job_id):
+    """
+    The text, hard words and audio playlist. Available as soon as the text
+    is extracted; audio chunks keep filling in until the job is done.
+    """
+    job = recover_stale(get_object_or_404(ReaderJob, pk=job_id, user=request.user))
+    if job.status == ReaderJob.STATUS_FAILED:
+        return JsonResponse(_job_payload(job), status=422)
+    if job.result_id is None:
+        return JsonResponse(_job_payload(job), status=202)
+    return JsonResponse({
+        "status": job.status,
+        "error": job.error,
+        **job_result(job),
+    })
+
+
+# ---------------------------------------------------------------------------
+# Reading packs (prepared ahead of time by batch ingestion)
+# ---------------------------------------------------------------------------
 
-    elif request.method == "POST":
-        error = "Please select a file."
+@login_required
+def reading_pack(request, pack_id):
+    pack = get_object_or_404(ReadingPack, pk=pack_id)
+    items = pack.items.select_related("document").filter(
+        document__status=SharedDocument.STATUS_DONE)
+    return JsonResponse({
+        "id": pack.id,
+        "name": pack.name,
+        "status": pack.status,
+        "documents": [{
+            "id": item.document_id,
+            "title": item.title,
+            "page_count": item.document.page_count,
+            "reader_url": f"{reverse('reader')}?document={item.document_id}",
+        } for item in items],
+    })
 
-    context = {
-        "text": text,
-        "error": error,
-        "audio_url": audio_url,
-        "hard_words": json.dumps(hard_words),
-        "unique_hard_words": json.dumps(unique_hard_words),
-        "syllables": json.dumps(word_syllables, ensure_ascii=False)
-    }
 
-    return render(request, "reader.html", context)
+@login_required
+def shared_document(request, document_id):
+    """A prepared document's reader payload — no processing on this path."""
+    document = get_object_or_404(
+        SharedDocument, pk=document_id, status=SharedDocument.STATUS_DONE)
+    return JsonResponse({
+        "status": "done",
+        "error": "",
+        **reader_payload(document),
+    })
+
+
+@staff_member_required
+def tts_health(request):
+    """Backend order, cooldown state and offline worker queue depth."""
+    return JsonResponse(backends.health())
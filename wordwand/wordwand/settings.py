@@ -71,6 +71,12 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # Take the write lock at BEGIN so concurrent game submissions wait
+        # for each other instead of failing with "database is locked"
+        'OPTIONS': {'transaction_mode': 'IMMEDIATE', 'timeout': 20},
+        # A file, not the default shared in-memory database, so the
+        # concurrency tests see the same locking as the real one
+        'TEST': {'NAME': BASE_DIR / 'test_db.sqlite3'},
     }
 }
 
@@ -103,6 +109,118 @@ MEDIA_ROOT = BASE_DIR / "media"
 TESSERACT_CMD = os.getenv('TESSERACT_CMD', r"C:\Program Files\Tesseract-OCR\tesseract.exe")
 GROQ_API_KEY = os.getenv("GROQ_API_KEY")
 
+# Chatbot — model provider: "openai" (the endpoint below) or "ollama" (a local
+# server, so messages stay on this machine); see chatbot/providers.py
+CHATBOT_PROVIDER = os.getenv('CHATBOT_PROVIDER', 'openai')
+
+# Chatbot — OpenAI-compatible chat completions endpoint (Groq by default)
+CHATBOT_API_URL = os.getenv('CHATBOT_API_URL', 'https://api.groq.com/openai/v1/chat/completions')
+CHATBOT_MODEL = os.getenv('CHATBOT_MODEL', 'llama-3.3-70b-versatile')
+# Chatbot — seconds to connect, and to wait for each streamed token
+CHATBOT_TIMEOUT = float(os.getenv('CHATBOT_TIMEOUT', '20'))
+
+# Chatbot — replies streamed at once per web process (and pooled connections);
+# past them messages are turned away at once. A queue holds a worker thread
+# per waiting message for up to the timeout, so only set one when the server
+# has threads to spare: MAX_CONCURRENT + QUEUE_SIZE must stay well below the
+# threads per process (gunicorn --threads), or a burst of chat ties up the site
+CHATBOT_MAX_CONCURRENT = int(os.getenv('CHATBOT_MAX_CONCURRENT', '4'))
+CHATBOT_QUEUE_SIZE = int(os.getenv('CHATBOT_QUEUE_SIZE', '0'))
+CHATBOT_QUEUE_TIMEOUT = float(os.getenv('CHATBOT_QUEUE_TIMEOUT', '2'))
+
+# Chatbot — local Ollama server: the model stays loaded this long after each
+# message (python manage.py chatbot_warm loads it); num_ctx must stay fixed or
+# Ollama reloads the model. With Ollama, set CHATBOT_MAX_CONCURRENT to the
+# server's OLLAMA_NUM_PARALLEL so concurrent messages are batched together
+CHATBOT_OLLAMA_URL = os.getenv('CHATBOT_OLLAMA_URL', 'http://127.0.0.1:11434')
+CHATBOT_OLLAMA_MODEL = os.getenv('CHATBOT_OLLAMA_MODEL', 'llama3.2:3b')
+CHATBOT_OLLAMA_KEEP_ALIVE = os.getenv('CHATBOT_OLLAMA_KEEP_ALIVE', '1h')
+CHATBOT_OLLAMA_NUM_CTX = int(os.getenv('CHATBOT_OLLAMA_NUM_CTX', '4096'))
+CHATBOT_OLLAMA_LOAD_TIMEOUT = float(os.getenv('CHATBOT_OLLAMA_LOAD_TIMEOUT', '120'))
+
+# Chatbot — answer cache (per web process): a repeated question, after exactly
+# the same conversation, is answered from memory for CHATBOT_CACHE_TTL seconds;
+# least recently used answers go past the size (0 = off)
+CHATBOT_CACHE_SIZE = int(os.getenv('CHATBOT_CACHE_SIZE', '500'))
+CHATBOT_CACHE_TTL = int(os.getenv('CHATBOT_CACHE_TTL', '86400'))
+# Chatbot — TF-IDF cosine similarity at which a differently worded question
+# reuses a cached answer (0 = exact matches only)
+CHATBOT_CACHE_SIMILARITY = float(os.getenv('CHATBOT_CACHE_SIMILARITY', '0.8'))
+
+# Reader — background job pool size (per web process)
+READER_JOB_WORKERS = int(os.getenv('READER_JOB_WORKERS', '4'))
+# Reader — a queued or running job untouched this long, seconds, is taken to
+# have lost its process (tts_engine/jobs.py recover_stale)
+READER_JOB_STALE_SECONDS = int(os.getenv('READER_JOB_STALE_SECONDS', '600'))
+
+# Reader — uploads up to this size are extracted straight from memory; larger
+# ones are spooled to a temp file by Django and stored until the job runs
+READER_IN_MEMORY_MAX_BYTES = int(os.getenv('READER_IN_MEMORY_MAX_BYTES', str(2 * 1024 * 1024)))
+FILE_UPLOAD_MAX_MEMORY_SIZE = READER_IN_MEMORY_MAX_BYTES
+
+# Reader — process pool for page-parallel PDF / TIFF extraction
+READER_PAGE_WORKERS = int(os.getenv('READER_PAGE_WORKERS', str(os.cpu_count() or 2)))
+
+# Reader — precompiled CMU lexicon (python manage.py build_lexicon), mmap'd by every worker
+LEXICON_PATH = os.getenv('LEXICON_PATH', str(BASE_DIR / 'tts_engine' / 'data' / 'lexicon.bin'))
+
+# TTS — backends tried in order ("gtts", "offline"); see tts_engine/backends.py
+TTS_BACKENDS = [b.strip() for b in os.getenv('TTS_BACKENDS', 'gtts,offline').split(',') if b.strip()]
+TTS_GTTS_TIMEOUT = float(os.getenv('TTS_GTTS_TIMEOUT', '10'))
+# A backend failing this many times in a row is skipped for the cooldown (seconds)
+TTS_BACKEND_MAX_FAILURES = int(os.getenv('TTS_BACKEND_MAX_FAILURES', '3'))
+TTS_BACKEND_COOLDOWN = float(os.getenv('TTS_BACKEND_COOLDOWN', '60'))
+# Offline (pyttsx3) worker — pending request limit and per-request wait (seconds)
+TTS_OFFLINE_QUEUE_SIZE = int(os.getenv('TTS_OFFLINE_QUEUE_SIZE', '16'))
+TTS_OFFLINE_TIMEOUT = float(os.getenv('TTS_OFFLINE_TIMEOUT', '30'))
+
+# Reader — concurrent TTS calls for sentence chunks (per web process)
+TTS_CHUNK_WORKERS = int(os.getenv('TTS_CHUNK_WORKERS', '4'))
+
+# Reader — content-addressed cache under MEDIA_ROOT/tts_cache (LRU, bytes)
+TTS_TEXT_CACHE_MAX_BYTES = int(os.getenv('TTS_TEXT_CACHE_MAX_BYTES', str(50 * 1024 * 1024)))
+TTS_AUDIO_CACHE_MAX_BYTES = int(os.getenv('TTS_AUDIO_CACHE_MAX_BYTES', str(1024 * 1024 * 1024)))
+# Reader — seconds between re-scans of the caches' size on disk (each process
+# also counts what it writes; eviction only runs once a cache is over budget)
+TTS_CACHE_SCAN_SECONDS = int(os.getenv('TTS_CACHE_SCAN_SECONDS', '600'))
+
+# Games — per-session cache of the progress summary (menu, game pages), seconds
+GAMES_PROGRESS_CACHE_TTL = int(os.getenv('GAMES_PROGRESS_CACHE_TTL', '300'))
+
+# Dashboard — per-session cache of the activity heatmap, seconds
+DASHBOARD_HEATMAP_CACHE_TTL = int(os.getenv('DASHBOARD_HEATMAP_CACHE_TTL', '300'))
+
+# Dashboard — activity capture (dashboard/activity.py): buffered time-on-task is
+# written to DailyActivity at least this often (0 = on every event), seconds,
+# or once this many events are waiting; both bound what a crash loses
+DASHBOARD_ACTIVITY_FLUSH_SECONDS = float(os.getenv('DASHBOARD_ACTIVITY_FLUSH_SECONDS', '30'))
+DASHBOARD_ACTIVITY_MAX_PENDING = int(os.getenv('DASHBOARD_ACTIVITY_MAX_PENDING', '5000'))
+
+# Dashboard — longest single event counted, seconds (a round left open is not practice)
+DASHBOARD_ACTIVITY_MAX_EVENT_SECONDS = float(os.getenv('DASHBOARD_ACTIVITY_MAX_EVENT_SECONDS', '600'))
+
+# Dashboard — listening speed used to credit finished reader documents
+DASHBOARD_READER_WORDS_PER_MINUTE = int(os.getenv('DASHBOARD_READER_WORDS_PER_MINUTE', '150'))
+
+# Games — trained level model (python manage.py train_difficulty_model), loaded
+# once per worker; without it levels follow the fixed EMA thresholds
+GAMES_DIFFICULTY_MODEL = os.getenv('GAMES_DIFFICULTY_MODEL', str(BASE_DIR / 'games' / 'data' / 'difficulty.joblib'))
+
+# Games — columnar attempt log for reports (python manage.py export_attempt_log)
+GAMES_ATTEMPT_LOG_DIR = os.getenv('GAMES_ATTEMPT_LOG_DIR', str(BASE_DIR / 'games' / 'data' / 'attempt_log'))
+# Games — attempts are exported once they are this many seconds old, so ones
+# still being committed (ids commit out of order) are never passed over
+GAMES_ATTEMPT_LOG_LAG_SECONDS = int(os.getenv('GAMES_ATTEMPT_LOG_LAG_SECONDS', '60'))
+
+# Games — raw attempts older than this many days are rolled up into daily
+# totals and deleted (python manage.py rollup_attempts)
+GAMES_ATTEMPT_RETENTION_DAYS = int(os.getenv('GAMES_ATTEMPT_RETENTION_DAYS', '180'))
+
+# Games — rounds per session bundle, and background threads per process that
+# build each child's next bundle when a session ends
+GAMES_BUNDLE_ROUNDS = int(os.getenv('GAMES_BUNDLE_ROUNDS', '20'))
+GAMES_BUNDLE_WORKERS = int(os.getenv('GAMES_BUNDLE_WORKERS', '2'))
+
 # Password Reset Token Expiration — 24 hours
 PASSWORD_RESET_TIMEOUT = 86400
 